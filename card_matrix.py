@@ -0,0 +1,310 @@
+# card_matrix.py – integer-interned leg IDs and a compact card × leg matrix
+#
+# Every PP / UD card row carries up to six leg ID strings, and the same few
+# hundred legs repeat across thousands of cards. This interns each distinct leg
+# ID once (LegInterner: string -> dense int32 code) and stores a card set as
+#
+#   legs     int32 (n, 6), each row sorted ascending, unused slots = PAD (-1)
+#            first – the canonical form, so identical leg sets compare equal
+#            whatever order the optimizer listed them in
+#   source   int16 (n,) index into sources ("PP", "UD", "prev:<run id>", ...)
+#   row      int32 (n,) row number within that source
+#
+# On top of it:
+#
+#   duplicates()     exact dedup: each row packs into two uint64 keys, grouped
+#                    by one lexsort, across sites and runs
+#   incidence()      leg -> card CSR (indptr, indices), built with one argsort
+#   sharing(q, k)    cards sharing >= k legs with q: gather q's postings from
+#                    the CSR and run-length count them after one sort
+#
+# 24 bytes per card for the matrix plus 24 for the CSR, so a few million cards
+# stay well under a gigabyte; queries touch only the postings of six legs.
+#
+# Run:  python card_matrix.py [--generation [RUN_ID]] [--against RUN_ID] [--k 4] [--leg ID]
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import CARD_SOURCES, LEG_ID_KEYS, card_leg_ids, load_cards
+
+MAX_LEGS = len(LEG_ID_KEYS)
+PAD = -1
+
+# keys(): 21 bits per leg code, three codes per uint64
+PACK_BITS = np.uint64(21)
+PACK_LIMIT = (1 << 21) - 1
+
+DEFAULT_K = 4
+
+
+class LegInterner:
+    """Leg ID string <-> dense int32 code; shared by every matrix built from it."""
+
+    def __init__(self):
+        self.ids = []
+        self.codes = {}
+
+    def __len__(self):
+        return len(self.ids)
+
+    def code(self, leg_id: str) -> int:
+        """Code for leg_id, assigning the next one on first sight."""
+        code = self.codes.get(leg_id)
+        if code is None:
+            code = self.codes[leg_id] = len(self.ids)
+            self.ids.append(sys.intern(leg_id))
+        return code
+
+    def lookup(self, leg_id: str) -> int:
+        """Code for leg_id, or PAD if it was never interned."""
+        return self.codes.get(leg_id, PAD)
+
+    def decode(self, codes):
+        return [self.ids[c] for c in codes if c != PAD]
+
+
+class CardMatrix:
+    """Canonical int32 (n, 6) leg matrix for a card set (see module comment)."""
+
+    def __init__(self, legs, source, row, sources, interner: LegInterner):
+        self.legs = legs
+        self.source = source
+        self.row = row
+        self.sources = sources
+        self.interner = interner
+        self._csr = None
+
+    def __len__(self):
+        return len(self.legs)
+
+    @classmethod
+    def from_leg_lists(cls, named_lists, interner: LegInterner = None):
+        """
+        Build from [(source name, iterable of leg ID lists)].
+
+        Cards with more than MAX_LEGS legs are rejected (ValueError).
+        """
+        interner = interner or LegInterner()
+        code = interner.code
+        flat, sizes, source, row, sources = [], [], [], [], []
+        for i, (name, leg_lists) in enumerate(named_lists):
+            sources.append(name)
+            count = 0
+            for ids in leg_lists:
+                if len(ids) > MAX_LEGS:
+                    raise ValueError(f"{name} card {count}: {len(ids)} legs (max {MAX_LEGS})")
+                flat.extend(code(leg_id) for leg_id in ids)
+                sizes.append(len(ids))
+                count += 1
+            source.append(np.full(count, i, dtype=np.int16))
+            row.append(np.arange(count, dtype=np.int32))
+
+        sizes = np.asarray(sizes, dtype=np.int64)
+        n = len(sizes)
+        legs = np.full((n, MAX_LEGS), PAD, dtype=np.int32)
+        # Scatter the flat codes right-aligned into their rows: pads end up first
+        row_of = np.repeat(np.arange(n), sizes)
+        starts = np.cumsum(sizes) - sizes
+        col_of = np.arange(len(flat)) - np.repeat(starts, sizes) + (MAX_LEGS - np.repeat(sizes, sizes))
+        legs[row_of, col_of] = np.asarray(flat, dtype=np.int32)
+        legs.sort(axis=1)
+
+        source = np.concatenate(source) if source else np.empty(0, dtype=np.int16)
+        row = np.concatenate(row) if row else np.empty(0, dtype=np.int32)
+        return cls(legs, source, row, sources, interner)
+
+    @classmethod
+    def from_cards(cls, named_cards, interner: LegInterner = None):
+        """Build from [(source name, card dicts)] as returned by slate_data.load_cards."""
+        return cls.from_leg_lists(
+            [(name, (card_leg_ids(card) for card in cards)) for name, cards in named_cards], interner
+        )
+
+    def keys(self):
+        """
+        Two uint64 keys per card; equal (hi, lo) <=> identical leg sets.
+
+        Codes + 1 (so PAD is 0) are packed 21 bits each, three per word, which
+        covers up to 2**21 - 1 distinct legs.
+        """
+        if len(self.interner) >= PACK_LIMIT:
+            raise ValueError(f"{len(self.interner)} distinct legs; key packing supports < {PACK_LIMIT}")
+        v = (self.legs.astype(np.int64) + 1).astype(np.uint64)
+        hi = (v[:, 0] << PACK_BITS * 2) | (v[:, 1] << PACK_BITS) | v[:, 2]
+        lo = (v[:, 3] << PACK_BITS * 2) | (v[:, 4] << PACK_BITS) | v[:, 5]
+        return hi, lo
+
+    def duplicates(self):
+        """
+        Exact duplicate groups.
+
+        Returns:
+            (inverse, counts): inverse[i] is card i's group; counts[g] is the size
+            of group g. Cards with counts[inverse[i]] > 1 have a twin.
+        """
+        n = len(self.legs)
+        if not n:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        hi, lo = self.keys()
+        order = np.lexsort((lo, hi))
+        hi, lo = hi[order], lo[order]
+        first = np.empty(n, dtype=bool)
+        first[0] = True
+        first[1:] = (hi[1:] != hi[:-1]) | (lo[1:] != lo[:-1])
+        inverse = np.empty(n, dtype=np.int64)
+        inverse[order] = np.cumsum(first) - 1
+        counts = np.diff(np.append(np.flatnonzero(first), n))
+        return inverse, counts
+
+    def duplicate_groups(self):
+        """Lists of card indexes sharing one leg set, largest group first."""
+        inverse, counts = self.duplicates()
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(counts)[:-1]
+        groups = [g for g in np.split(order, bounds) if len(g) > 1]
+        groups.sort(key=len, reverse=True)
+        return groups
+
+    def incidence(self):
+        """
+        Leg -> card CSR: the cards holding leg code c are
+        indices[indptr[c]:indptr[c + 1]], ascending.
+        """
+        if self._csr is None:
+            flat = self.legs.ravel()
+            keep = flat != PAD
+            leg_codes = flat[keep]
+            cards = np.repeat(np.arange(len(self.legs), dtype=np.int32), MAX_LEGS)[keep]
+            order = np.argsort(leg_codes, kind="stable")
+            counts = np.bincount(leg_codes, minlength=len(self.interner))
+            indptr = np.zeros(len(counts) + 1, dtype=np.int64)
+            np.cumsum(counts, out=indptr[1:])
+            self._csr = (indptr, cards[order])
+        return self._csr
+
+    def cards_with_leg(self, leg_id: str):
+        code = self.interner.lookup(leg_id)
+        if code == PAD or code >= len(self.interner):
+            return np.empty(0, dtype=np.int32)
+        indptr, indices = self.incidence()
+        if code + 1 >= len(indptr):
+            return np.empty(0, dtype=np.int32)
+        return indices[indptr[code]:indptr[code + 1]]
+
+    def shared_counts(self, codes):
+        """
+        Cards holding any of the given leg codes.
+
+        Returns:
+            (cards, counts): ascending card indexes and how many of the codes each
+            holds. Cost is a sort of the codes' postings, independent of n.
+        """
+        indptr, indices = self.incidence()
+        codes = [c for c in codes if c != PAD and c + 1 < len(indptr)]
+        if not codes:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int64)
+        postings = np.sort(np.concatenate([indices[indptr[c]:indptr[c + 1]] for c in codes]))
+        starts = np.flatnonzero(np.r_[True, postings[1:] != postings[:-1]])
+        return postings[starts], np.diff(np.append(starts, len(postings)))
+
+    def sharing(self, card: int, k: int = DEFAULT_K):
+        """
+        Cards (other than card) sharing at least k legs with card.
+
+        Returns:
+            (cards, shared) ordered by shared legs, most first
+        """
+        cards, counts = self.shared_counts(self.legs[card])
+        keep = (counts >= k) & (cards != card)
+        cards, counts = cards[keep], counts[keep]
+        order = np.argsort(-counts, kind="stable")
+        return cards[order], counts[order]
+
+    def leg_counts(self):
+        """Cards per leg code."""
+        indptr, _ = self.incidence()
+        return np.diff(indptr)
+
+    def describe(self, card: int) -> str:
+        return f"{self.sources[self.source[card]]}#{self.row[card]}"
+
+
+def load_named_cards(generation=None, against=None):
+    """[(source name, cards)] for the live CSVs (or a generation), plus a previous run."""
+    named = []
+    sources = CARD_SOURCES
+    if generation is not None or against is not None:
+        from snapshot_generations import Generation, GENERATIONS_DIR, current_generation
+
+    if generation is not None:
+        if generation == "current":
+            gen = current_generation()
+        else:
+            gen = Generation.open(os.path.join(GENERATIONS_DIR, generation))
+        if gen is None:
+            raise SystemExit(f"No generation {generation}")
+        sources = gen.sources(CARD_SOURCES)
+    for path, site in sources:
+        named.append((site, load_cards(path, site)))
+    if against is not None:
+        prev = Generation.open(os.path.join(GENERATIONS_DIR, against))
+        if prev is None:
+            raise SystemExit(f"No generation {against}")
+        for path, site in prev.sources(CARD_SOURCES):
+            named.append((f"{site}@{prev.run_id}", load_cards(path, site)))
+    return named
+
+
+def main(generation: str = None, against: str = None, k: int = DEFAULT_K, leg: str = None):
+    named = load_named_cards(generation, against)
+    started = time.perf_counter()
+    matrix = CardMatrix.from_cards(named)
+    build_ms = (time.perf_counter() - started) * 1000
+    print(f"{len(matrix)} cards over {len(matrix.interner)} distinct legs "
+          f"({', '.join(f'{name}={len(cards)}' for name, cards in named)}) built in {build_ms:.1f} ms; "
+          f"matrix {matrix.legs.nbytes / 1024:,.0f} KiB")
+    if not len(matrix):
+        return
+
+    started = time.perf_counter()
+    groups = matrix.duplicate_groups()
+    matrix.incidence()
+    print(f"Dedup + incidence in {(time.perf_counter() - started) * 1000:.1f} ms: "
+          f"{sum(len(g) - 1 for g in groups)} redundant cards in {len(groups)} duplicate groups")
+    cross = [g for g in groups if len(set(matrix.source[g])) > 1]
+    if cross:
+        print(f"  {len(cross)} groups span sources, e.g. "
+              + ", ".join(matrix.describe(i) for i in cross[0][:4]))
+
+    counts = matrix.leg_counts()
+    top = np.argsort(-counts, kind="stable")[:5]
+    print("Most-used legs: " + ", ".join(f"{matrix.interner.ids[c]} ({counts[c]})" for c in top))
+
+    started = time.perf_counter()
+    overlaps = [len(matrix.sharing(i, k)[0]) for i in range(min(len(matrix), 1000))]
+    per_query_us = (time.perf_counter() - started) * 1e6 / len(overlaps)
+    print(f"Cards sharing >= {k} legs: mean {np.mean(overlaps):.1f}, max {max(overlaps)} "
+          f"over the first {len(overlaps)} cards ({per_query_us:.0f} µs / query)")
+
+    if leg:
+        rows = matrix.cards_with_leg(leg)
+        print(f"Leg {leg}: {len(rows)} cards" + (f" – {', '.join(matrix.describe(i) for i in rows[:10])}"
+                                                  if len(rows) else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Interned card × leg matrix: dedup and leg-overlap report.")
+    parser.add_argument("--generation", nargs="?", const="current",
+                        help="Read a snapshot generation (default: CURRENT) instead of the live CSVs.")
+    parser.add_argument("--against", help="Also load this earlier generation, for cross-run duplicates.")
+    parser.add_argument("--k", type=int, default=DEFAULT_K, help=f"Shared-leg threshold (default: {DEFAULT_K}).")
+    parser.add_argument("--leg", help="List the cards holding this leg ID.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, generation=args.generation, against=args.against, k=args.k, leg=args.leg)
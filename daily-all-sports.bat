@@ -29,17 +29,33 @@ echo "=== NCAAF (Offseason) ==="
 node dist/run_optimizer.js --sports NCAAF --refresh-interval-minutes=1
 echo.
 
+echo "=== Leg Moves + Legs Push ==="
+python legs_diff.py --moves --repush --telegram
+echo.
+
+echo "=== Portfolio Kelly Caps ==="
+python kelly_portfolio.py
+echo "✅ Kelly stakes fit bankroll caps"
+echo.
+
+echo "=== Snapshot Generation ==="
+set SNAPSHOT_OK=1
+python snapshot_generations.py publish
+if errorlevel 1 set SNAPSHOT_OK=0
+echo.
+
 echo "=== Dashboard Update ==="
-copy underdog-cards.csv web-dashboard\public\data\ /Y
-copy prizepicks-cards.csv web-dashboard\public\data\ /Y
+python export_dashboard_shards.py
 echo "✅ Dashboard data updated"
 echo.
 
 echo "=== Google Sheets Push ==="
-python sheets_push_legs.py
-python sheets_push_underdog_legs.py  
-python sheets_push_cards.py
-echo "✅ Sheets updated"
+if "%SNAPSHOT_OK%"=="1" (
+  python sheets_publish.py --urgency --generation --dataset cards
+  echo "✅ Sheets updated"
+) else (
+  echo "❌ Snapshot publish failed – Sheets push skipped"
+)
 echo.
 
 echo "=== Quota Status ==="
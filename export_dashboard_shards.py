@@ -0,0 +1,212 @@
+# export_dashboard_shards.py – pre-aggregated JSON shards for the web dashboard
+#
+# Replaces copying the raw cards CSVs into web-dashboard/public/data. Cards are
+# split per Sport / site, numbers are parsed here instead of in the browser,
+# and every shard is written under a content-hashed name. Netlify compresses
+# responses itself, so no precompressed siblings are written.
+#
+# manifest.json maps each shard to its current file and carries the summary
+# figures (card count, selected, total stake, average / best EV) per shard and
+# for the whole slate; web-dashboard/src/App.tsx shows them above the table
+# without adding up the cards. Shards whose content did not change keep their
+# file name, so browser caches survive refreshes.
+#
+# Run:  python export_dashboard_shards.py [--out-dir DIR] [--dry-run]
+
+import argparse
+import hashlib
+import json
+import os
+from datetime import datetime
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import LEG_ID_KEYS, load_all_cards
+
+OUT_DIR = os.path.join("web-dashboard", "public", "data", "shards")
+MANIFEST_NAME = "manifest.json"
+
+# Fields the dashboard Card type reads (web-dashboard/src/types.ts), plus the
+# few extra columns the summary uses.
+DASHBOARD_CARD_FIELDS = [
+    "flexType",
+    "cardEv",
+    "winProbCash",
+    "avgProb",
+    "avgEdgePct",
+    "kellyStake",
+    "kellyFrac",
+    "kellyFinalFraction",
+    "selected",
+    "runTimestamp",
+]
+
+HASH_LENGTH = 12
+
+
+def to_dashboard_card(card):
+    out = {"sport": card["Sport"], "site": card["site"]}
+    for field in DASHBOARD_CARD_FIELDS:
+        if field in card:
+            out[field] = card[field]
+    if "kellyFrac" not in out:
+        out["kellyFrac"] = card.get("kellyFinalFraction", 0.0)
+    for key in LEG_ID_KEYS:
+        out[key] = card.get(key, "")
+    return out
+
+
+def summarize(cards):
+    """Summary figures (ShardSummary in web-dashboard/src/types.ts) for a list of dashboard cards."""
+    n = len(cards)
+    evs = [c.get("cardEv", 0.0) for c in cards]
+    return {
+        "cards": n,
+        "selected": sum(1 for c in cards if c.get("selected")),
+        "totalStake": round(sum(c.get("kellyStake", 0.0) for c in cards), 2),
+        "avgEv": round(sum(evs) / n, 6) if n else 0.0,
+        "maxEv": round(max(evs), 6) if n else 0.0,
+    }
+
+
+def build_shards(cards):
+    """Group cards into {"<Sport>/<site>": [dashboard cards]} sorted by kellyStake."""
+    shards = {}
+    for card in cards:
+        shards.setdefault(f"{card['Sport']}/{card['site']}", []).append(to_dashboard_card(card))
+    for rows in shards.values():
+        rows.sort(key=lambda c: c.get("kellyStake", 0.0), reverse=True)
+    return dict(sorted(shards.items()))
+
+
+def encode_shard(key: str, cards):
+    """Return (payload bytes, content hash) for one shard."""
+    sport, site = key.split("/", 1)
+    payload = json.dumps(
+        {"sport": sport, "site": site, "cards": cards},
+        separators=(",", ":"),
+        sort_keys=True,
+    ).encode("utf-8")
+    return payload, hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]
+
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def write_shard_file(out_dir: str, file_name: str, payload: bytes):
+    """Write one shard; return its byte size."""
+    _write_atomic(os.path.join(out_dir, file_name), payload)
+    return {"bytes": len(payload)}
+
+
+def _remove_shard_file(out_dir: str, file_name: str):
+    path = os.path.join(out_dir, file_name)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def load_manifest(out_dir: str):
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {"shards": {}, "retired": []}
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    manifest.setdefault("shards", {})
+    manifest.setdefault("retired", [])
+    return manifest
+
+
+def export(cards, out_dir: str = OUT_DIR, dry_run: bool = False):
+    """
+    Write changed shards and the manifest.
+
+    Files replaced in this run are kept for one more generation (listed under
+    "retired") so a browser holding the previous manifest never 404s.
+
+    Returns:
+        (manifest, number of shards rewritten)
+    """
+    previous = load_manifest(out_dir)
+    shards = build_shards(cards)
+
+    entries = {}
+    written = 0
+    for key, rows in shards.items():
+        payload, digest = encode_shard(key, rows)
+        sport, site = key.split("/", 1)
+        file_name = f"cards-{sport}-{site}.{digest}.json"
+        old = previous["shards"].get(key)
+        if old and old.get("hash") == digest and os.path.exists(os.path.join(out_dir, file_name)):
+            entries[key] = old
+            continue
+
+        written += 1
+        entry = {"file": file_name, "hash": digest, "summary": summarize(rows)}
+        if not dry_run:
+            os.makedirs(out_dir, exist_ok=True)
+            entry.update(write_shard_file(out_dir, file_name, payload))
+        entries[key] = entry
+
+    live_files = {e["file"] for e in entries.values()}
+    replaced = [
+        e["file"] for k, e in previous["shards"].items()
+        if e.get("file") not in live_files
+    ]
+
+    all_cards = [c for rows in shards.values() for c in rows]
+    manifest = {
+        "generatedAt": datetime.now().isoformat(timespec="seconds"),
+        "runTimestamp": max((c.get("runTimestamp", "") for c in all_cards), default=""),
+        "summary": summarize(all_cards),
+        "shards": entries,
+        "retired": replaced,
+    }
+
+    if dry_run:
+        return manifest, written
+
+    if written == 0 and not replaced and previous["shards"]:
+        # Nothing changed – leave manifest.json untouched so it stays cacheable.
+        return previous, 0
+
+    for file_name in previous["retired"]:
+        if file_name not in live_files:
+            _remove_shard_file(out_dir, file_name)
+
+    os.makedirs(out_dir, exist_ok=True)
+    _write_atomic(
+        os.path.join(out_dir, MANIFEST_NAME),
+        json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"),
+    )
+    return manifest, written
+
+
+def main(out_dir: str = OUT_DIR, dry_run: bool = False):
+    cards = load_all_cards()
+    print(f"Loaded {len(cards)} cards")
+
+    manifest, written = export(cards, out_dir=out_dir, dry_run=dry_run)
+    total = len(manifest["shards"])
+    print(f"{written} of {total} shard(s) changed{' (dry run)' if dry_run else ''}")
+    for key, entry in manifest["shards"].items():
+        print(f"  {key}: {entry['summary']['cards']} cards -> {entry['file']} ({entry.get('bytes', '-')} bytes)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export per-sport/per-site JSON shards for the web dashboard.")
+    parser.add_argument(
+        "--out-dir",
+        default=OUT_DIR,
+        help=f"Output directory for shards and manifest (default: {OUT_DIR}).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Build shards and report what would change; do not write files.",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, out_dir=args.out_dir, dry_run=args.dry_run)
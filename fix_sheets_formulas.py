@@ -3,23 +3,26 @@ fix_sheets_formulas.py — One-time script to repair:
   1) Cards sheet K1:N1 ARRAYFORMULA off-by-one (fixes K10:N10 blank)
   2) Calculator sheet #DIV/0! errors (text-to-number coercion)
 
-Run:  python fix_sheets_formulas.py [--dry-run]
+Run:  python fix_sheets_formulas.py [--dry-run] [--profile [--profile-out DIR]]
 """
 
 import argparse
 import os
 import time
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from profiling import add_profile_arguments, run_profiled
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 SPREADSHEET_ID = "193mGmiA_T3VFV8PO_wYMcFd4W-CLWLAdspNeSJ6Gllo"
 
 
 def get_sheets_service():
+    # Imported lazily so --dry-run / --help never load the Google client stack.
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -108,5 +111,6 @@ if __name__ == "__main__":
     )
     parser.add_argument("--dry-run", action="store_true",
                         help="Print formulas without writing to Sheets.")
+    add_profile_arguments(parser)
     args = parser.parse_args()
-    main(dry_run=args.dry_run)
+    run_profiled(args, main, dry_run=args.dry_run)
@@ -0,0 +1,248 @@
+# game_scheduler.py – game-time-driven refresh / push / alert loop per sport
+#
+# daily-all-sports.bat refreshes all six sports on one cadence, offseason ones
+# included, then pushes and alerts unconditionally. This keeps one timer per
+# sport in a heap instead, spaced by how soon that sport's next game locks
+# (gameTime in the current legs CSVs, bucketed like push_urgency.py):
+#
+#   next lock   < 30 min   < 2 h   < 6 h   < 24 h   later / none
+#   interval       2 min   5 min  15 min    1 h      4 h
+#
+# and pulled in so one refresh lands LOCK_LEAD_MINUTES before each lock. Timers
+# due within COALESCE_SECONDS of the earliest one fire together as one cycle:
+#
+#   node dist/run_optimizer.js --sports NBA,NHL --refresh-interval-minutes <interval>
+#   python snapshot_generations.py merge --sports NBA,NHL
+#   python kelly_portfolio.py
+#   python snapshot_generations.py publish
+#   python legs_diff.py --moves --repush
+#   python sheets_publish.py --urgency --generation --dataset cards --sport NBA --sport NHL
+#   python telegram_kelly.py --urgency --generation --sport NBA --sport NHL
+#
+# The optimizer rewrites its CSVs with only the sports it ran, so the merge
+# step carries every other sport's rows over from the CURRENT generation
+# before anything reads them: Kelly caps, the generation and every Sheets
+# target (filtered or not) always see the whole slate. Legs tabs go through
+# legs_diff.py, which only rewrites the rows that moved; cards tabs are pushed
+# for targets showing a fired sport.
+#
+# After each cycle the legs are re-read and every sport's timer is re-planned
+# (a timer only ever moves earlier outside its own fire). A sport whose refresh
+# returned no upcoming games backs off to the longest interval.
+#
+# Run:  python game_scheduler.py [--sports NBA,NHL] [--plan] [--dry-run] [--max-cycles N]
+
+import argparse
+import heapq
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+from profiling import add_profile_arguments, run_profiled
+from push_urgency import LOCK_BUCKET_LABELS, lock_bucket, minutes_to_lock, parse_game_time
+from slate_data import load_all_legs
+
+SPORTS = ["NBA", "NCAAB", "NHL", "NFL", "MLB", "NCAAF"]
+
+# Minutes between refreshes per lock bucket (push_urgency.LOCK_BUCKET_LABELS)
+REFRESH_MINUTES = [2, 5, 15, 60, 240]
+
+# Land one refresh this long before every lock
+LOCK_LEAD_MINUTES = 10
+
+# Timers due this close to the earliest one join its cycle
+COALESCE_SECONDS = 90
+
+
+def sport_lock_times(legs, now):
+    """Sport -> ascending future lock datetimes (distinct gameTime values)."""
+    by_sport = {}
+    for leg in legs:
+        lock = parse_game_time(leg.get("gameTime"))
+        if lock is not None and lock > now:
+            by_sport.setdefault(str(leg.get("Sport", "")).upper(), set()).add(lock)
+    return {sport: sorted(times) for sport, times in by_sport.items()}
+
+
+def plan_next(lock_times, now):
+    """
+    Next refresh for one sport.
+
+    Returns:
+        (due datetime, bucket) – bucket of the sport's next lock
+    """
+    upcoming = [t for t in lock_times if t > now]
+    next_lock = upcoming[0] if upcoming else None
+    bucket = lock_bucket(minutes_to_lock(next_lock, now))
+    due = now + timedelta(minutes=REFRESH_MINUTES[bucket])
+    for lock in upcoming:
+        lead = lock - timedelta(minutes=LOCK_LEAD_MINUTES)
+        if lead > now:
+            due = min(due, lead)
+            break
+    return due, bucket
+
+
+def cycle_commands(sports, refresh_minutes: int):
+    """(label, argv) steps for one coalesced cycle over sports."""
+    sport_flags = [arg for sport in sports for arg in ("--sport", sport)]
+    return [
+        ("optimizer", ["node", "dist/run_optimizer.js", "--sports", ",".join(sports),
+                       "--refresh-interval-minutes", str(refresh_minutes)]),
+        ("merge", [sys.executable, "snapshot_generations.py", "merge", "--sports", ",".join(sports)]),
+        ("kelly caps", [sys.executable, "kelly_portfolio.py"]),
+        ("snapshot", [sys.executable, "snapshot_generations.py", "publish"]),
+        ("legs", [sys.executable, "legs_diff.py", "--moves", "--repush"]),
+        ("sheets", [sys.executable, "sheets_publish.py", "--urgency", "--generation", "--dataset", "cards",
+                    *sport_flags]),
+        ("alerts", [sys.executable, "telegram_kelly.py", "--urgency", "--generation", *sport_flags]),
+    ]
+
+
+def run_commands(commands, dry_run: bool = False) -> bool:
+    """Run steps in order; stop at the first failure. True if every step succeeded."""
+    import subprocess
+
+    for label, argv in commands:
+        print(f"  [{label}] {' '.join(argv)}")
+        if dry_run:
+            continue
+        started = time.perf_counter()
+        result = subprocess.run(argv)
+        elapsed = time.perf_counter() - started
+        if result.returncode != 0:
+            print(f"  [{label}] FAILED (exit {result.returncode}) after {elapsed:.1f}s – skipping the rest")
+            return False
+        print(f"  [{label}] done in {elapsed:.1f}s")
+    return True
+
+
+class GameScheduler:
+    """
+    Heap of (due, sport) timers with lazy deletion: a sport's live timer is the
+    one matching self.due[sport]; re-planning pushes a new entry and older ones
+    are skipped when popped.
+    """
+
+    def __init__(self, sports, run_cycle, load_locks, clock=None, sleep=time.sleep):
+        self.sports = list(sports)
+        self.run_cycle = run_cycle      # (sports, refresh minutes) -> None
+        self.load_locks = load_locks    # now -> {sport: [lock datetimes]}
+        self.clock = clock or (lambda: datetime.now(timezone.utc))
+        self.sleep = sleep
+        self.locks = {}
+        self.due = {}
+        self.buckets = {}
+        self._heap = []
+        self._seq = 0
+
+    def schedule(self, sport: str, due):
+        self.due[sport] = due
+        heapq.heappush(self._heap, (due, self._seq, sport))
+        self._seq += 1
+
+    def replan(self, sport: str, now, fired: bool = False):
+        """Re-plan sport; outside its own fire a timer only moves earlier."""
+        due, bucket = plan_next(self.locks.get(sport, []), now)
+        self.buckets[sport] = bucket
+        if fired or sport not in self.due or due < self.due[sport]:
+            self.schedule(sport, due)
+
+    def next_batch(self):
+        """Sleep until the earliest live timer, then pop it plus every timer coalescing with it."""
+        while self._heap:
+            due, _, sport = self._heap[0]
+            if self.due.get(sport) != due:
+                heapq.heappop(self._heap)  # superseded
+                continue
+            wait = (due - self.clock()).total_seconds()
+            if wait > 0:
+                self.sleep(wait)
+                continue  # re-check: the clock may have jumped
+            break
+        if not self._heap:
+            return []
+
+        first_due = self._heap[0][0]
+        horizon = first_due + timedelta(seconds=COALESCE_SECONDS)
+        batch = []
+        while self._heap and self._heap[0][0] <= horizon:
+            due, _, sport = heapq.heappop(self._heap)
+            if self.due.get(sport) == due and sport not in batch:
+                batch.append(sport)
+                del self.due[sport]
+        return batch
+
+    def run(self, max_cycles: int = None, fire_all_first: bool = True):
+        now = self.clock()
+        self.locks = self.load_locks(now)
+        for sport in self.sports:
+            self.replan(sport, now)
+            if fire_all_first:
+                self.schedule(sport, now)
+
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            batch = self.next_batch()
+            if not batch:
+                return
+            now = self.clock()
+            refresh = min(REFRESH_MINUTES[self.buckets.get(s, len(REFRESH_MINUTES) - 1)] for s in batch)
+            print(f"\n{now:%Y-%m-%d %H:%M:%S} UTC – cycle {cycles + 1}: {', '.join(batch)}")
+            self.run_cycle(batch, refresh)
+            cycles += 1
+
+            now = self.clock()
+            fresh = self.load_locks(now)
+            for sport in batch:
+                # The refresh just ran for these: no legs now means no games
+                self.locks[sport] = fresh.get(sport, [])
+            for sport, times in fresh.items():
+                if sport not in batch:
+                    self.locks[sport] = times
+            for sport in self.sports:
+                self.replan(sport, now, fired=sport in batch)
+            print("  next: " + ", ".join(
+                f"{s} {self.due[s]:%H:%M} ({LOCK_BUCKET_LABELS[self.buckets[s]]})"
+                for s in sorted(self.sports, key=lambda s: self.due[s])
+            ))
+
+
+def main(sports=None, plan: bool = False, dry_run: bool = False, max_cycles: int = None):
+    sports = [s.strip().upper() for s in (sports or ",".join(SPORTS)).split(",") if s.strip()]
+
+    def load_locks(now):
+        return sport_lock_times(load_all_legs(), now)
+
+    if plan:
+        now = datetime.now(timezone.utc)
+        locks = load_locks(now)
+        print(f"{'sport':<6} {'games':>5} {'next lock (UTC)':>17} {'bucket':>7} {'next refresh':>13}")
+        for sport in sports:
+            times = locks.get(sport, [])
+            due, bucket = plan_next(times, now)
+            next_lock = f"{times[0]:%m-%d %H:%M}" if times else "-"
+            print(f"{sport:<6} {len(times):>5} {next_lock:>17} {LOCK_BUCKET_LABELS[bucket]:>7} "
+                  f"{'+' + str(round((due - now).total_seconds() / 60)) + ' min':>13}")
+        return
+
+    scheduler = GameScheduler(
+        sports,
+        run_cycle=lambda batch, refresh: run_commands(cycle_commands(batch, refresh), dry_run=dry_run),
+        load_locks=load_locks,
+    )
+    try:
+        scheduler.run(max_cycles=max_cycles)
+    except KeyboardInterrupt:
+        print("Scheduler stopped")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh, push and alert each sport as its games approach lock.")
+    parser.add_argument("--sports", help=f"Comma-separated sports (default: {','.join(SPORTS)}).")
+    parser.add_argument("--plan", action="store_true", help="Print each sport's next lock and refresh, then exit.")
+    parser.add_argument("--dry-run", action="store_true", help="Print each cycle's commands instead of running them.")
+    parser.add_argument("--max-cycles", type=int, help="Stop after this many cycles.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, sports=args.sports, plan=args.plan, dry_run=args.dry_run, max_cycles=args.max_cycles)
@@ -0,0 +1,313 @@
+# kelly_portfolio.py – bankroll-constrained Kelly rescaling across PP + UD cards
+#
+# Each card's kellyStake is sized on its own by the TS optimizer, so nothing
+# guarantees the selected cards fit the bankroll together. This stage loads the
+# combined PP + UD card set, applies
+#   • a total-exposure cap        (fraction of bankroll across all cards)
+#   • per-sport caps              (fraction of bankroll per Sport)
+#   • per-player caps             (fraction of bankroll per player, via leg overlap)
+# and rescales kellyStake / kellyFinalFraction with a vectorized multiplicative
+# projection, then writes the adjusted stakes back into the cards CSVs so the
+# Sheets push and Telegram alerts see them.
+#
+# The optimizer's original stake is kept in kellyStakeUnconstrained, and reruns
+# start from it, so the stage is idempotent.
+#
+# Only selected cards form the portfolio the caps are solved for. Unselected
+# cards are still pushed and alerted, so they are scaled too: each takes the
+# smallest haircut (after / before exposure) of the groups it belongs to, and
+# is never above any of those groups' caps.
+#
+# The CSVs are rewritten in their original column order, and a repeated column
+# name would be kept as is rather than collapsed. underdog-cards.csv kellyFrac
+# is left alone: it is the per-sport Kelly multiplier (getKellyFraction in
+# src/kelly_staking.ts) that the dashboard and alerts show, not a stake fraction.
+#
+# Run (after the optimizers, before push / alerts):
+#   python kelly_portfolio.py [--max-total 0.30] [--max-sport 0.15] [--max-player 0.05] [--dry-run]
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import (
+    CARD_SOURCES,
+    LEG_ID_KEYS,
+    LEG_SOURCES,
+    load_legs,
+    merge_row_dicts,
+    read_table,
+    row_dicts,
+    to_bool,
+    to_float,
+    write_table,
+)
+
+BANKROLL_PATH = os.path.join(".cache", "bankroll.json")
+DEFAULT_BANKROLL = 1000.0
+
+# Caps as fractions of bankroll
+DEFAULT_MAX_TOTAL_FRACTION = 0.30
+DEFAULT_MAX_SPORT_FRACTION = 0.15
+DEFAULT_MAX_PLAYER_FRACTION = 0.05
+
+# Projection passes: each pass keeps every cap satisfied and lets cards that
+# were shrunk by a since-relaxed group grow back toward their original stake.
+PROJECTION_ITERATIONS = 25
+PROJECTION_TOL = 1e-9
+
+UNCONSTRAINED_FIELD = "kellyStakeUnconstrained"
+PORTFOLIO_CAP_REASON = "PORTFOLIO_CAP"
+
+
+def load_bankroll(path: str = BANKROLL_PATH) -> float:
+    """Current bankroll from .cache/bankroll.json (written by bankroll_tracker)."""
+    if not os.path.exists(path):
+        return DEFAULT_BANKROLL
+    with open(path, encoding="utf-8") as f:
+        return float(json.load(f).get("bankroll", DEFAULT_BANKROLL))
+
+
+def leg_players(leg_sources=None):
+    """leg id -> lower-cased player name from the legs CSVs."""
+    players = {}
+    for path, site in leg_sources or LEG_SOURCES:
+        for leg in load_legs(path, site):
+            players.setdefault(leg["id"], leg.get("player", "").strip().lower())
+    return players
+
+
+def build_groups(sports, card_players, bankroll, max_total, max_sport, max_player):
+    """
+    Flatten every constraint into (card, group) membership pairs.
+
+    Returns:
+        card_idx, group_idx: int arrays of equal length, sorted by card
+        caps: dollar cap per group
+        labels: group label per group (for reporting)
+    """
+    labels = ["TOTAL"]
+    caps = [max_total * bankroll]
+    group_of = {}
+
+    def group(label, cap):
+        if label not in group_of:
+            group_of[label] = len(labels)
+            labels.append(label)
+            caps.append(cap)
+        return group_of[label]
+
+    card_idx = []
+    group_idx = []
+    for i, sport in enumerate(sports):
+        members = [0, group(f"SPORT:{sport}", max_sport * bankroll)]
+        for player in card_players[i]:
+            members.append(group(f"PLAYER:{player}", max_player * bankroll))
+        card_idx.extend([i] * len(members))
+        group_idx.extend(members)
+
+    return (
+        np.asarray(card_idx, dtype=np.int64),
+        np.asarray(group_idx, dtype=np.int64),
+        np.asarray(caps, dtype=np.float64),
+        labels,
+    )
+
+
+def project_stakes(stakes, card_idx, group_idx, caps, iterations=PROJECTION_ITERATIONS):
+    """
+    Rescale stakes so every group's exposure is within its cap.
+
+    Each pass computes group exposure with bincount, a per-group ratio
+    cap / exposure, and multiplies each card by the smallest ratio of the
+    groups it belongs to (np.minimum.reduceat over card-sorted pairs), never
+    exceeding the original stake. Since a card's factor is at most every
+    group ratio it touches, each pass leaves all groups at or under cap.
+    """
+    original = np.asarray(stakes, dtype=np.float64)
+    if original.size == 0:
+        return original.copy()
+
+    s = original.copy()
+    starts = np.flatnonzero(np.r_[True, card_idx[1:] != card_idx[:-1]])
+    for _ in range(iterations):
+        exposure = np.bincount(group_idx, weights=s[card_idx], minlength=caps.size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            ratio = np.where(exposure > 0, caps / exposure, np.inf)
+        factor = np.minimum.reduceat(ratio[group_idx], starts)
+        new = np.minimum(original, s * factor)
+        if np.max(np.abs(new - s)) <= PROJECTION_TOL:
+            s = new
+            break
+        s = new
+    return s
+
+
+def load_card_rows(card_sources=None):
+    """[(path, header, raw rows, row dicts)] for every cards CSV that exists."""
+    tables = []
+    for path, _ in card_sources or CARD_SOURCES:
+        header, raw = read_table(path)
+        if header:
+            tables.append((path, header, raw, row_dicts(header, raw)))
+    return tables
+
+
+def group_haircuts(before, after, card_idx, group_idx, selected, n_groups):
+    """after / before exposure of selected cards per group (1.0 where a group has none)."""
+    pairs = selected[card_idx]
+    exp_before = np.bincount(group_idx[pairs], weights=before[card_idx[pairs]], minlength=n_groups)
+    exp_after = np.bincount(group_idx[pairs], weights=after[card_idx[pairs]], minlength=n_groups)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(exp_before > 0, exp_after / exp_before, 1.0)
+
+
+def rescale(tables, bankroll, max_total, max_sport, max_player, players):
+    """
+    Compute adjusted stakes for every staked card across tables.
+
+    Cards are "selected" when the CSV has a selected column set to True; if a
+    CSV has no selected column, every card with a positive stake counts. The
+    caps are projected over selected cards; unselected ones get their groups'
+    haircut (see module comment).
+
+    Returns:
+        (refs, before, after, selected, card_idx, group_idx, caps, labels) where
+        refs are (table index, row dict) pairs aligned with before / after /
+        selected.
+    """
+    refs = []
+    before = []
+    selected = []
+    sports = []
+    card_players = []
+    for t, (_, header, _, rows) in enumerate(tables):
+        has_selected = "selected" in header
+        for row in rows:
+            stake = to_float(row.get(UNCONSTRAINED_FIELD) or row.get("kellyStake"))
+            if stake <= 0:
+                continue
+            refs.append((t, row))
+            before.append(stake)
+            selected.append(not has_selected or to_bool(row.get("selected")))
+            sports.append(row.get("Sport") or "UNK")
+            card_players.append({
+                players.get(row[k]) or f"leg:{row[k]}" for k in LEG_ID_KEYS if row.get(k)
+            })
+
+    card_idx, group_idx, caps, labels = build_groups(
+        sports, card_players, bankroll, max_total, max_sport, max_player
+    )
+    before = np.asarray(before, dtype=np.float64)
+    selected = np.asarray(selected, dtype=bool)
+    after = before.copy()
+    if not len(before):
+        return refs, before, after, selected, card_idx, group_idx, caps, labels
+
+    # Project the selected cards, renumbered 0..n_selected-1
+    position = np.cumsum(selected) - 1
+    pairs = selected[card_idx]
+    after[selected] = project_stakes(before[selected], position[card_idx[pairs]], group_idx[pairs], caps)
+
+    unselected_pairs = ~pairs
+    if unselected_pairs.any():
+        haircut = group_haircuts(before, after, card_idx, group_idx, selected, caps.size)
+        cards = card_idx[unselected_pairs]
+        groups = group_idx[unselected_pairs]
+        starts = np.flatnonzero(np.r_[True, cards[1:] != cards[:-1]])
+        owners = cards[starts]
+        factor = np.minimum.reduceat(haircut[groups], starts)
+        cap = np.minimum.reduceat(caps[groups], starts)
+        after[owners] = np.minimum(before[owners] * factor, cap)
+    return refs, before, after, selected, card_idx, group_idx, caps, labels
+
+
+def apply_to_rows(refs, before, after, bankroll):
+    """Write adjusted stakes into the row dicts; Kelly $ fields scale with the stake."""
+    for (_, row), orig, stake in zip(refs, before, after):
+        current = to_float(row.get("kellyStake"))
+        ratio = stake / current if current > 0 else 0.0
+        row.setdefault(UNCONSTRAINED_FIELD, "")
+        if not row[UNCONSTRAINED_FIELD]:
+            row[UNCONSTRAINED_FIELD] = f"{orig:.2f}"
+
+        row["kellyStake"] = f"{stake:.2f}"
+        row["kellyFinalFraction"] = f"{stake / bankroll:.6f}"
+        for field in ("kellyExpectedProfit", "kellyMaxWin"):
+            if field in row:
+                row[field] = f"{to_float(row[field]) * ratio:.2f}"
+
+        reasons = [
+            r for r in (row.get("kellyCapReasons") or "").split(";")
+            if r and r != PORTFOLIO_CAP_REASON
+        ]
+        if stake < orig - 1e-9:
+            reasons.append(PORTFOLIO_CAP_REASON)
+            row["kellyIsCapped"] = "True"
+        if "kellyCapReasons" in row:
+            row["kellyCapReasons"] = ";".join(reasons)
+
+
+def main(max_total: float = DEFAULT_MAX_TOTAL_FRACTION,
+         max_sport: float = DEFAULT_MAX_SPORT_FRACTION,
+         max_player: float = DEFAULT_MAX_PLAYER_FRACTION,
+         dry_run: bool = False):
+    bankroll = load_bankroll()
+    tables = load_card_rows()
+    players = leg_players()
+
+    started = time.perf_counter()
+    refs, before, after, selected, card_idx, group_idx, caps, labels = rescale(
+        tables, bankroll, max_total, max_sport, max_player, players
+    )
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    print(f"Bankroll ${bankroll:,.2f}; {int(selected.sum())} selected + {int((~selected).sum())} unselected "
+          f"staked cards; {len(labels)} constraint groups")
+    print(f"Selected stake ${before[selected].sum():,.2f} -> ${after[selected].sum():,.2f} "
+          f"(cap ${max_total * bankroll:,.2f}) in {elapsed_ms:.1f} ms")
+    print(f"Cards rescaled: {int(np.count_nonzero(after < before - 1e-9))}")
+
+    if selected.any():
+        pairs = selected[card_idx]
+        exposure = np.bincount(group_idx[pairs], weights=after[card_idx[pairs]], minlength=caps.size)
+        binding = np.flatnonzero(exposure >= caps * (1 - 1e-6))
+        for g in binding[:10]:
+            print(f"  binding {labels[g]}: ${exposure[g]:,.2f} / ${caps[g]:,.2f}")
+
+    if dry_run:
+        print("Dry run: cards CSVs not modified.")
+        return
+
+    apply_to_rows(refs, before, after, bankroll)
+    for path, header, raw, rows in tables:
+        if not rows:
+            continue
+        write_table(path, *merge_row_dicts(header, raw, rows))
+        print(f"Wrote adjusted stakes to {path}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rescale Kelly stakes to fit bankroll, sport and player caps.")
+    parser.add_argument("--max-total", type=float, default=DEFAULT_MAX_TOTAL_FRACTION,
+                        help=f"Max total stake as a fraction of bankroll (default: {DEFAULT_MAX_TOTAL_FRACTION}).")
+    parser.add_argument("--max-sport", type=float, default=DEFAULT_MAX_SPORT_FRACTION,
+                        help=f"Max stake per Sport as a fraction of bankroll (default: {DEFAULT_MAX_SPORT_FRACTION}).")
+    parser.add_argument("--max-player", type=float, default=DEFAULT_MAX_PLAYER_FRACTION,
+                        help=f"Max stake per player as a fraction of bankroll (default: {DEFAULT_MAX_PLAYER_FRACTION}).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Report the rescaling without rewriting the cards CSVs.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(
+        args,
+        main,
+        max_total=args.max_total,
+        max_sport=args.max_sport,
+        max_player=args.max_player,
+        dry_run=args.dry_run,
+    )
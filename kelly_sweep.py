@@ -0,0 +1,239 @@
+# kelly_sweep.py – what-if sweep of bankroll × Kelly multiplier × per-card cap
+#
+# The alert threshold in telegram_kelly.py is a fixed $50 while the bankroll in
+# .cache/bankroll.json moves, and seeing how stakes and the alert set change
+# under another bankroll or multiplier used to mean rerunning the optimizer.
+# The optimizer already writes each card's kellyCappedFraction (raw Kelly after
+# the raw cap), so every other setting is a closed form of that column
+# (src/kelly_mean_variance.ts):
+#
+#   fraction = min(kellyCappedFraction × multiplier, maxPerCardFraction)
+#   stake    = bankroll × fraction
+#
+# The sweep broadcasts that over the grid. fractions is an (M, C, N) array
+# (multipliers × caps × cards), and bankroll only scales it. Totals per grid
+# point are bankroll × a per-(M, C) sum. Alert counts (stake > threshold) come
+# from one sort per (M, C) plus a searchsorted of threshold / bankroll, so the
+# sweep itself never builds the full (B, M, C, N) stake tensor.
+#
+# --stakes-out writes that tensor (every card's stake at every grid point) to an
+# .npz with the grid axes, for slicing in a notebook; it is refused above
+# MAX_STAKE_TENSOR_MB, so narrow the grid first.
+#
+# Run:  python kelly_sweep.py [--bankrolls 1000:20000:50] [--multipliers 0.1:1.0:20]
+#                             [--caps 0.05] [--threshold 50] [--out sweep.csv] [--stakes-out stakes.npz]
+
+import argparse
+import csv
+import time
+
+import numpy as np
+
+from kelly_portfolio import load_bankroll
+from leg_calculator import PAYOUTS
+from profiling import add_profile_arguments, run_profiled
+from slate_data import load_all_cards
+
+DEFAULT_BANKROLLS = "1000:20000:50"
+DEFAULT_MULTIPLIERS = "0.1:1.0:20"
+DEFAULT_CAPS = "0.05"
+
+# DEFAULT_KELLY_CONFIG in src/kelly_mean_variance.ts
+DEFAULT_MIN_CARD_EV = 0.03
+DEFAULT_MAX_RAW_FRACTION = 0.10
+CURRENT_MULTIPLIER = 0.5
+CURRENT_CAP = 0.05
+
+# telegram_kelly.py alert threshold ($)
+DEFAULT_THRESHOLD = 50.0
+
+SITE_CODES = {"PrizePicks": "PP", "Underdog": "UD"}
+
+# Largest stake tensor --stakes-out will build
+MAX_STAKE_TENSOR_MB = 1024
+
+
+def parse_grid(spec: str):
+    """"a:b:n" -> n evenly spaced values from a to b; "x,y,z" -> those values."""
+    if ":" in spec:
+        start, stop, count = spec.split(":")
+        return np.linspace(float(start), float(stop), int(count))
+    return np.array([float(v) for v in spec.split(",") if v.strip()])
+
+
+def max_win_multiple(card) -> float:
+    """maxPayout − 1 for a card: kellyMaxWin / kellyStake, else the payout table."""
+    stake = card.get("kellyStake", 0.0)
+    if isinstance(stake, float) and stake > 0 and card.get("kellyMaxWin"):
+        return card["kellyMaxWin"] / stake
+    table = PAYOUTS.get(SITE_CODES.get(card.get("site"), card.get("site")), {}).get(card.get("flexType"))
+    return max(table.values()) - 1 if table else 0.0
+
+
+def card_arrays(cards, min_card_ev: float = DEFAULT_MIN_CARD_EV,
+                max_raw_fraction: float = DEFAULT_MAX_RAW_FRACTION):
+    """
+    (capped, card_ev, win_multiple) float64 arrays for cards that can be staked.
+
+    kellyCappedFraction is used when present; otherwise kellyRawFraction capped
+    at max_raw_fraction. Cards below min_card_ev, with no Kelly columns or a
+    non-positive fraction are dropped (the optimizer stakes them at zero).
+    """
+    capped, card_ev, win_mult = [], [], []
+    for card in cards:
+        if "kellyCappedFraction" in card:
+            fraction = card["kellyCappedFraction"]
+        elif "kellyRawFraction" in card:
+            fraction = min(card["kellyRawFraction"], max_raw_fraction)
+        else:
+            continue
+        ev = card.get("cardEv", 0.0)
+        if fraction <= 0 or ev < min_card_ev:
+            continue
+        capped.append(fraction)
+        card_ev.append(ev)
+        win_mult.append(max_win_multiple(card))
+    return np.asarray(capped), np.asarray(card_ev), np.asarray(win_mult)
+
+
+def fraction_tensor(capped, multipliers, caps):
+    """(M, C, N) final Kelly fractions for every multiplier / cap pair."""
+    return np.minimum(capped[None, None, :] * multipliers[:, None, None], caps[None, :, None])
+
+
+def stake_tensor(fractions, bankrolls):
+    """(B, M, C, N) dollar stakes. Memory is B × M × C × N × 8 bytes – slice the grid first."""
+    return bankrolls[:, None, None, None] * fractions[None]
+
+
+def sweep(capped, card_ev, win_mult, bankrolls, multipliers, caps, threshold: float = DEFAULT_THRESHOLD):
+    """
+    Per-grid-point totals, each a (B, M, C) array:
+
+      alerts           cards with stake > threshold
+      exposure         total stake
+      expected_profit  Σ stake × cardEv
+      max_win          Σ stake × (maxPayout − 1)
+    """
+    fractions = fraction_tensor(capped, multipliers, caps)
+    sum_f = fractions.sum(axis=-1)
+    sum_ev = fractions @ card_ev
+    sum_win = fractions @ win_mult
+    b = bankrolls[:, None, None]
+
+    # stake > threshold  <=>  fraction > threshold / bankroll
+    ordered = np.sort(fractions, axis=-1).reshape(-1, fractions.shape[-1])
+    cuts = threshold / bankrolls
+    above = np.stack([ordered.shape[1] - np.searchsorted(row, cuts, side="right") for row in ordered], axis=1)
+
+    return {
+        "alerts": above.reshape(len(bankrolls), len(multipliers), len(caps)),
+        "exposure": b * sum_f[None],
+        "expected_profit": b * sum_ev[None],
+        "max_win": b * sum_win[None],
+    }
+
+
+def write_stakes(path: str, capped, bankrolls, multipliers, caps):
+    """Save the (B, M, C, N) stake tensor with its grid axes; returns its size in MB."""
+    size_mb = len(bankrolls) * len(multipliers) * len(caps) * len(capped) * 8 / 2**20
+    if size_mb > MAX_STAKE_TENSOR_MB:
+        raise ValueError(f"stake tensor would be {size_mb:,.0f} MB (limit {MAX_STAKE_TENSOR_MB} MB); narrow the grid")
+    stakes = stake_tensor(fraction_tensor(capped, multipliers, caps), bankrolls)
+    np.savez(path, stakes=stakes, bankrolls=bankrolls, multipliers=multipliers, caps=caps)
+    return size_mb
+
+
+def write_csv(path: str, bankrolls, multipliers, caps, result, n_cards: int):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["bankroll", "kellyMultiplier", "maxPerCardFraction", "cards", "alerts",
+                         "totalExposure", "exposurePct", "expectedProfit", "maxWin"])
+        for i, bankroll in enumerate(bankrolls):
+            for j, mult in enumerate(multipliers):
+                for k, cap in enumerate(caps):
+                    exposure = result["exposure"][i, j, k]
+                    writer.writerow([
+                        f"{bankroll:.2f}", f"{mult:.4f}", f"{cap:.4f}", n_cards,
+                        int(result["alerts"][i, j, k]),
+                        f"{exposure:.2f}", f"{exposure / bankroll * 100:.2f}",
+                        f"{result['expected_profit'][i, j, k]:.2f}", f"{result['max_win'][i, j, k]:.2f}",
+                    ])
+
+
+def main(bankrolls: str = DEFAULT_BANKROLLS, multipliers: str = DEFAULT_MULTIPLIERS, caps: str = DEFAULT_CAPS,
+         threshold: float = DEFAULT_THRESHOLD, min_card_ev: float = DEFAULT_MIN_CARD_EV, out: str = None,
+         stakes_out: str = None):
+    bankroll_grid = parse_grid(bankrolls)
+    mult_grid = parse_grid(multipliers)
+    cap_grid = parse_grid(caps)
+
+    cards = load_all_cards()
+    capped, card_ev, win_mult = card_arrays(cards, min_card_ev=min_card_ev)
+    print(f"{len(capped)} of {len(cards)} cards have a stakeable Kelly fraction")
+    if not len(capped):
+        print("Nothing to sweep (cards CSVs need kellyCappedFraction or kellyRawFraction).")
+        return
+
+    started = time.perf_counter()
+    result = sweep(capped, card_ev, win_mult, bankroll_grid, mult_grid, cap_grid, threshold)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    points = len(bankroll_grid) * len(mult_grid) * len(cap_grid)
+    print(f"Swept {len(bankroll_grid)} bankrolls × {len(mult_grid)} multipliers × {len(cap_grid)} caps "
+          f"= {points} points over {len(capped)} cards in {elapsed_ms:.1f} ms")
+
+    # Current settings at the tracked bankroll, for reference
+    bankroll = load_bankroll()
+    current = sweep(capped, card_ev, win_mult, np.array([bankroll]),
+                    np.array([CURRENT_MULTIPLIER]), np.array([CURRENT_CAP]), threshold)
+    print(f"Current (bankroll ${bankroll:,.0f}, ×{CURRENT_MULTIPLIER}, cap {CURRENT_CAP:.0%}): "
+          f"{int(current['alerts'][0, 0, 0])} alerts > ${threshold:,.0f}, "
+          f"exposure ${current['exposure'][0, 0, 0]:,.2f}")
+
+    # Alert counts at a few bankrolls × multipliers for the first cap
+    rows = np.unique(np.linspace(0, len(bankroll_grid) - 1, min(6, len(bankroll_grid))).astype(int))
+    cols = np.unique(np.linspace(0, len(mult_grid) - 1, min(6, len(mult_grid))).astype(int))
+    print(f"\nAlerts (stake > ${threshold:,.0f}) at cap {cap_grid[0]:.0%}:")
+    print(f"  {'bankroll':>10} " + " ".join(f"{'×' + format(mult_grid[j], '.2f'):>8}" for j in cols))
+    for i in rows:
+        print(f"  {bankroll_grid[i]:>10,.0f} " + " ".join(f"{int(result['alerts'][i, j, 0]):>8}" for j in cols))
+
+    if out:
+        write_csv(out, bankroll_grid, mult_grid, cap_grid, result, len(capped))
+        print(f"\nWrote {points} grid points to {out}")
+
+    if stakes_out:
+        try:
+            size_mb = write_stakes(stakes_out, capped, bankroll_grid, mult_grid, cap_grid)
+        except ValueError as e:
+            raise SystemExit(f"Not writing {stakes_out}: {e}")
+        print(f"Wrote the {points} × {len(capped)} stake tensor ({size_mb:,.1f} MB) to {stakes_out}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="What-if sweep of bankroll × Kelly multiplier × per-card cap.")
+    parser.add_argument("--bankrolls", default=DEFAULT_BANKROLLS,
+                        help=f"start:stop:count or comma list (default: {DEFAULT_BANKROLLS}).")
+    parser.add_argument("--multipliers", default=DEFAULT_MULTIPLIERS,
+                        help=f"Kelly multipliers, start:stop:count or comma list (default: {DEFAULT_MULTIPLIERS}).")
+    parser.add_argument("--caps", default=DEFAULT_CAPS,
+                        help=f"maxPerCardFraction values (default: {DEFAULT_CAPS}).")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Alert threshold in dollars (default: {DEFAULT_THRESHOLD:g}).")
+    parser.add_argument("--min-card-ev", type=float, default=DEFAULT_MIN_CARD_EV,
+                        help=f"Cards below this EV are never staked (default: {DEFAULT_MIN_CARD_EV}).")
+    parser.add_argument("--out", help="Write every grid point to this CSV.")
+    parser.add_argument("--stakes-out", help="Write every card's stake at every grid point to this .npz.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(
+        args,
+        main,
+        bankrolls=args.bankrolls,
+        multipliers=args.multipliers,
+        caps=args.caps,
+        threshold=args.threshold,
+        min_card_ev=args.min_card_ev,
+        out=args.out,
+        stakes_out=args.stakes_out,
+    )
@@ -0,0 +1,278 @@
+# leg_calculator.py – local replacement for the Calculator tab
+#
+# Pricing an ad-hoc combo in Sheets means typing leg IDs into Calculator!B2:G2
+# and waiting for INDEX/MATCH against Legs plus AVERAGE(FILTER(...)) in rows
+# 11–19 to recalculate. This does the same thing in memory: the legs CSVs are
+# loaded into a dict keyed by leg id, and for up to six legs every slip type
+# (2P…6F) is priced for PrizePicks and Underdog with the i.i.d. binomial model
+# used by the TS engine (see PERF_NOTES.md). Binomial / payout results are
+# memoized in an LRU keyed on avgProb rounded to 4 decimals, exactly like the
+# engine cache, so repeated lookups are dictionary hits.
+#
+# CLI:   python leg_calculator.py <legId> [<legId> ...] [--json]
+# HTTP:  python leg_calculator.py --serve [--port 8765]
+#        GET /calc?legs=<id>,<id>,...
+
+import argparse
+import json
+import os
+from functools import lru_cache
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import LEG_SOURCES, load_legs
+
+MAX_LEGS = 6
+
+# avgProb rounding before lookup – matches card_ev.ts (4 decimals)
+PROB_DECIMALS = 4
+
+# Calculator rows 11–19, in sheet order
+STRUCTURES = ["2P", "3P", "3F", "4P", "4F", "5P", "5F", "6P", "6F"]
+
+# hits -> payout multiplier (src/engine_interface.ts PP_PAYOUTS)
+PP_PAYOUTS = {
+    "2P": {2: 3},
+    "3P": {3: 6},
+    "4P": {4: 10},
+    "5P": {5: 20},
+    "6P": {6: 37.5},
+    "3F": {3: 3, 2: 1},
+    "4F": {4: 6, 3: 1.5},
+    "5F": {5: 10, 4: 2, 3: 0.4},
+    "6F": {6: 25, 5: 2, 4: 0.4},
+}
+
+# hits -> payout multiplier (src/config/underdog_structures.ts, 2–6 picks)
+UD_PAYOUTS = {
+    "2P": {2: 3},
+    "3P": {3: 6},
+    "4P": {4: 10},
+    "5P": {5: 20},
+    "6P": {6: 35},
+    "3F": {3: 3, 2: 1},
+    "4F": {4: 6, 3: 1.5},
+    "5F": {5: 10, 4: 2.5},
+    "6F": {6: 25, 5: 2.6, 4: 0.25},
+}
+
+PAYOUTS = {"PP": PP_PAYOUTS, "UD": UD_PAYOUTS}
+
+DEFAULT_PORT = 8765
+
+
+def structure_picks(structure: str) -> int:
+    return int(structure[:-1])
+
+
+def binom_pmf(k: int, n: int, p: float) -> float:
+    """P(X = k) for X ~ Bin(n, p)."""
+    if k < 0 or k > n:
+        return 0.0
+    coeff = 1.0
+    for i in range(k):
+        coeff = coeff * (n - i) / (i + 1)
+    return coeff * p**k * (1 - p) ** (n - k)
+
+
+@lru_cache(maxsize=65536)
+def structure_metrics(site: str, structure: str, avg_prob: float):
+    """
+    (ev, winProbCash, winProbAny) for one slip type at a rounded avgProb.
+
+    EV = Σ_k BINOMDIST(k, n, p) × Payout(k) − 1, same as the Engine sheet.
+    """
+    payouts = PAYOUTS[site][structure]
+    n = structure_picks(structure)
+    expected_return = 0.0
+    win_prob_cash = 0.0
+    win_prob_any = 0.0
+    for k, multiplier in payouts.items():
+        prob = binom_pmf(k, n, avg_prob)
+        expected_return += prob * multiplier
+        if multiplier > 1:
+            win_prob_cash += prob
+        win_prob_any += prob
+    return expected_return - 1, win_prob_cash, win_prob_any
+
+
+class LegCalculator:
+    """In-memory leg index plus per-structure pricing."""
+
+    def __init__(self, sources=None):
+        self.sources = sources or LEG_SOURCES
+        self.legs = {}
+        self._mtimes = None
+        self.reload_if_changed()
+
+    def _current_mtimes(self):
+        return tuple(
+            os.path.getmtime(path) if os.path.exists(path) else None
+            for path, _ in self.sources
+        )
+
+    def reload_if_changed(self) -> bool:
+        """Rebuild the leg index when any legs CSV changed on disk."""
+        mtimes = self._current_mtimes()
+        if mtimes == self._mtimes:
+            return False
+        legs = {}
+        for path, site in self.sources:
+            for leg in load_legs(path, site):
+                legs.setdefault(leg["id"], leg)  # PP wins on id collisions
+        self.legs = legs
+        self._mtimes = mtimes
+        return True
+
+    def price(self, leg_ids):
+        """
+        Price a combo of up to MAX_LEGS leg IDs.
+
+        Each n-pick structure uses the first n legs, like Calculator rows
+        11–19; structures needing more legs than given are omitted.
+        """
+        if len(leg_ids) > MAX_LEGS:
+            raise ValueError(f"At most {MAX_LEGS} legs, got {len(leg_ids)}")
+
+        found = []
+        missing = []
+        for leg_id in leg_ids:
+            leg = self.legs.get(leg_id)
+            if leg is None:
+                missing.append(leg_id)
+            else:
+                found.append(leg)
+
+        probs = [leg.get("trueProb", 0.0) for leg in found]
+        structures = {site: [] for site in PAYOUTS}
+        for structure in STRUCTURES:
+            n = structure_picks(structure)
+            if n > len(probs):
+                continue
+            avg_prob = round(sum(probs[:n]) / n, PROB_DECIMALS)
+            for site in PAYOUTS:
+                ev, win_prob_cash, win_prob_any = structure_metrics(site, structure, avg_prob)
+                structures[site].append({
+                    "structure": structure,
+                    "avgProb": avg_prob,
+                    "ev": ev,
+                    "winProbCash": win_prob_cash,
+                    "winProbAny": win_prob_any,
+                })
+
+        return {
+            "legs": [
+                {
+                    "id": leg["id"],
+                    "site": leg["site"],
+                    "Sport": leg["Sport"],
+                    "player": leg.get("player", ""),
+                    "stat": leg.get("stat", ""),
+                    "line": leg.get("line", 0.0),
+                    "trueProb": leg.get("trueProb", 0.0),
+                }
+                for leg in found
+            ],
+            "missing": missing,
+            "avgProb": round(sum(probs) / len(probs), PROB_DECIMALS) if probs else None,
+            "structures": structures,
+        }
+
+
+def format_result(result) -> str:
+    lines = []
+    for leg in result["legs"]:
+        lines.append(
+            f"  {leg['id']:<14} {leg['Sport']:<6} {leg['player']:<24} "
+            f"{leg['stat']} {leg['line']}  p={leg['trueProb']:.4f}"
+        )
+    if result["missing"]:
+        lines.append(f"  not found: {', '.join(result['missing'])}")
+    if result["avgProb"] is not None:
+        lines.append(f"  avgProb (all legs): {result['avgProb']:.4f}")
+    lines.append("")
+    lines.append(f"  {'Slip':<5} {'avgProb':>8} {'PP EV%':>8} {'PP Win%':>8} {'UD EV%':>8} {'UD Win%':>8}")
+    for pp, ud in zip(result["structures"]["PP"], result["structures"]["UD"]):
+        lines.append(
+            f"  {pp['structure']:<5} {pp['avgProb']:>8.4f} {pp['ev'] * 100:>8.2f} "
+            f"{pp['winProbCash'] * 100:>8.2f} {ud['ev'] * 100:>8.2f} {ud['winProbCash'] * 100:>8.2f}"
+        )
+    return "\n".join(lines)
+
+
+def make_handler(calculator: LegCalculator):
+    # http.server is only needed for --serve; keep it off the CLI startup path.
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qs, urlparse
+
+    class CalcHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != "/calc":
+                self._send(404, {"error": "not found"})
+                return
+            raw = ",".join(parse_qs(url.query).get("legs", []))
+            leg_ids = [leg_id.strip() for leg_id in raw.split(",") if leg_id.strip()]
+            if not leg_ids:
+                self._send(400, {"error": "pass ?legs=<id>,<id>,..."})
+                return
+            calculator.reload_if_changed()
+            try:
+                self._send(200, calculator.price(leg_ids))
+            except ValueError as e:
+                self._send(400, {"error": str(e)})
+
+        def _send(self, status: int, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):  # keep the console quiet
+            pass
+
+    return CalcHandler
+
+
+def serve(host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+    from http.server import ThreadingHTTPServer
+
+    calculator = LegCalculator()
+    print(f"Indexed {len(calculator.legs)} legs; serving http://{host}:{port}/calc?legs=<id>,<id>")
+    server = ThreadingHTTPServer((host, port), make_handler(calculator))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def main(leg_ids, as_json: bool = False):
+    calculator = LegCalculator()
+    result = calculator.price(leg_ids)
+    if as_json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(format_result(result))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Price up to six legs for every PP / UD slip type.")
+    parser.add_argument("legs", nargs="*", help="Leg IDs (from the Legs / UD-Legs tabs).")
+    parser.add_argument("--json", action="store_true", help="Print the result as JSON.")
+    parser.add_argument("--serve", action="store_true", help="Run the HTTP endpoint instead of pricing once.")
+    parser.add_argument("--host", default="127.0.0.1", help="HTTP bind address (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"HTTP port (default: {DEFAULT_PORT}).")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(host=args.host, port=args.port)
+    elif not args.legs:
+        parser.error("pass leg IDs or --serve")
+    elif len(args.legs) > MAX_LEGS:
+        parser.error(f"at most {MAX_LEGS} legs")
+    else:
+        run_profiled(args, main, args.legs, as_json=args.json)
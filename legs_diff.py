@@ -0,0 +1,518 @@
+# legs_diff.py – keyed diff of the legs CSVs between refreshes (line / odds moves)
+#
+# prizepicks-legs.csv and underdog-legs.csv are overwritten on every refresh,
+# so a line or odds move is only visible by eyeballing the sheet. This keeps
+# the previous snapshot in .cache/legs-snapshot.json keyed by site + leg id and
+# diffs the current CSVs against it with dict lookups (linear in legs):
+#
+#   ADDED     leg id not in the previous snapshot
+#   REMOVED   leg id no longer in the CSV
+#   CHANGED   any of TRACKED_FIELDS moved; one move per field with old / new / delta
+#
+# Options:
+#   --moves     append the moves to the Moves tab (created with a header if missing)
+#   --repush    rewrite only the changed legs rows in place on every target in
+#               publish_targets.json that maps the legs / ud_legs dataset (rows
+#               located by the id column, the target's filter applied). A row
+#               counts as changed when any pushed cell differs, not just the
+#               tracked fields, so gameTime / IsWithin24h / runTimestamp never
+#               go stale. Added legs are appended; removals, a new row order
+#               (UD-Legs is sorted by legEv), a new tab or a missing snapshot
+#               force a full rewrite of that tab. daily-all-sports.bat uses this
+#               as its legs push and runs sheets_publish.py --dataset cards
+#   --telegram  send a digest of the biggest moves
+#   --watch N   poll the CSVs every N seconds and diff whenever they change, so
+#               detection latency is bounded by the refresh interval
+#
+# Run:  python legs_diff.py [--moves] [--repush [--targets publish_targets.json] [--target main]]
+#                           [--telegram] [--watch 30] [--dry-run]
+
+import argparse
+import csv
+import json
+import os
+import time
+from datetime import datetime
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import LEG_SOURCES, to_float
+
+SNAPSHOT_PATH = os.path.join(".cache", "legs-snapshot.json")
+
+# Fields whose change counts as a move
+TRACKED_FIELDS = ["line", "overOdds", "underOdds", "trueProb", "edge", "legEv"]
+
+# Kept in the snapshot so removed legs can still be described
+DESCRIBE_FIELDS = ["Sport", "player", "stat"]
+
+MOVE_TOLERANCE = 1e-9
+
+MOVES_TAB = "Moves"
+MOVES_HEADER = [
+    "DetectedAt", "Site", "Sport", "LegID", "Player", "Stat",
+    "Change", "Field", "Old", "New", "Delta",
+]
+
+# site -> publish_targets.json dataset holding its legs
+LEG_DATASETS = {"PP": "legs", "UD": "ud_legs"}
+
+# Telegram digest size
+DIGEST_MAX_MOVES = 10
+
+DEFAULT_WATCH_SECONDS = 30
+
+# Same default as sheets_publish.TARGETS_PATH (not imported: keeps startup light)
+TARGETS_PATH = "publish_targets.json"
+
+
+class RepushFailed(Exception):
+    """Some targets' legs tabs could not be re-pushed; the snapshot was not advanced."""
+
+
+def read_legs_csv(path: str):
+    """(header, rows) of a legs CSV as raw string lists; ([], []) if missing."""
+    if not os.path.exists(path):
+        return [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        return header, [row for row in reader if any(row)]
+
+
+def snapshot_legs(header, rows):
+    """leg id -> {field: raw value} for the tracked and descriptive fields."""
+    if "id" not in header:
+        return {}
+    id_idx = header.index("id")
+    fields = [(f, header.index(f)) for f in TRACKED_FIELDS + DESCRIBE_FIELDS if f in header]
+    legs = {}
+    for row in rows:
+        if id_idx < len(row) and row[id_idx]:
+            legs[row[id_idx]] = {f: row[i] if i < len(row) else "" for f, i in fields}
+    return legs
+
+
+def load_snapshot(path: str = SNAPSHOT_PATH):
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_snapshot(legs_by_site, path: str = SNAPSHOT_PATH, pushed=None):
+    """Write the snapshot; pushed: site -> {leg id: row key} of the rows last pushed to Sheets."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    snapshot = {"savedAt": datetime.now().isoformat(timespec="seconds"), "legs": legs_by_site}
+    if pushed is not None:
+        snapshot["pushed"] = pushed
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f)
+    os.replace(tmp_path, path)
+
+
+def diff_legs(old, new):
+    """
+    Compare two id -> fields maps.
+
+    Returns:
+        {"added": [ids], "removed": [ids], "changed": {id: [(field, old, new, delta)]}}
+    """
+    added = [leg_id for leg_id in new if leg_id not in old]
+    removed = [leg_id for leg_id in old if leg_id not in new]
+    changed = {}
+    for leg_id, fields in new.items():
+        before = old.get(leg_id)
+        if before is None:
+            continue
+        moves = []
+        for field in TRACKED_FIELDS:
+            if field not in fields:
+                continue
+            a, b = before.get(field, ""), fields[field]
+            if a == b:
+                continue
+            delta = to_float(b) - to_float(a)
+            if abs(delta) > MOVE_TOLERANCE or (a == "") != (b == ""):
+                moves.append((field, a, b, delta))
+        if moves:
+            changed[leg_id] = moves
+    return {"added": added, "removed": removed, "changed": changed}
+
+
+def pushed_values(tables):
+    """site -> legs rows as the push scripts send them (UD sorted by legEv)."""
+    import sheets_push_legs
+    import sheets_push_underdog_legs
+
+    modules = {"legs": sheets_push_legs, "ud_legs": sheets_push_underdog_legs}
+    return {
+        site: modules[dataset].csv_to_values(tables[site][0]) if tables[site][1] else []
+        for site, dataset in LEG_DATASETS.items() if site in tables
+    }
+
+
+def row_keys(header, rows):
+    """leg id -> the whole pushed row as one string, to spot any cell change."""
+    if "id" not in header:
+        return {}
+    id_idx = header.index("id")
+    return {row[id_idx]: "\x1f".join(str(v) for v in row) for row in rows if id_idx < len(row)}
+
+
+def repush_diff(diff, old_keys, new_keys):
+    """
+    diff with "changed" widened to every leg whose pushed row differs.
+
+    Moves keep their entries; legs whose row changed only outside
+    TRACKED_FIELDS map to []. Without previous keys every kept leg counts.
+    """
+    changed = dict(diff["changed"])
+    added = set(diff["added"])
+    for leg_id, key in new_keys.items():
+        if leg_id in changed or leg_id in added:
+            continue
+        if old_keys is None or old_keys.get(leg_id) != key:
+            changed[leg_id] = []
+    return {"added": diff["added"], "removed": diff["removed"], "changed": changed}
+
+
+def move_rows(site, diff, old, new, detected_at: str):
+    """Moves-tab rows for one site's diff."""
+    def describe(fields):
+        return [fields.get("Sport", ""), fields.get("player", ""), fields.get("stat", "")]
+
+    rows = []
+    for leg_id in diff["added"]:
+        sport, player, stat = describe(new[leg_id])
+        rows.append([detected_at, site, sport, leg_id, player, stat, "ADDED", "", "", "", ""])
+    for leg_id in diff["removed"]:
+        sport, player, stat = describe(old[leg_id])
+        rows.append([detected_at, site, sport, leg_id, player, stat, "REMOVED", "", "", "", ""])
+    for leg_id, moves in diff["changed"].items():
+        sport, player, stat = describe(new[leg_id])
+        for field, a, b, delta in moves:
+            rows.append([detected_at, site, sport, leg_id, player, stat, "CHANGED", field, a, b, round(delta, 6)])
+    return rows
+
+
+def format_digest(diffs, new_by_site, max_moves: int = DIGEST_MAX_MOVES) -> str:
+    """Telegram digest (parse_mode=HTML): counts per site plus the largest trueProb / line moves."""
+    from html import escape
+
+    lines = ["📈 LEG MOVES"]
+    ranked = []
+    for site, diff in diffs.items():
+        lines.append(
+            f"{escape(site)}: {len(diff['changed'])} changed, {len(diff['added'])} added, {len(diff['removed'])} removed"
+        )
+        for leg_id, moves in diff["changed"].items():
+            fields = new_by_site[site][leg_id]
+            for field, a, b, delta in moves:
+                if field in ("trueProb", "line"):
+                    # trueProb moves are ~0.01, line moves ~0.5–1: rank on a common scale
+                    weight = abs(delta) * (100 if field == "trueProb" else 1)
+                    ranked.append((weight, site, fields, field, a, b))
+    ranked.sort(key=lambda m: m[0], reverse=True)
+    if ranked:
+        lines.append("")
+    for _, site, fields, field, a, b in ranked[:max_moves]:
+        described = " ".join([site, fields.get("Sport", ""), fields.get("player", ""), fields.get("stat", "")])
+        lines.append(escape(f"{described}: {field} {a} → {b}"))
+    lines.append(f"\n⏰ {datetime.now().strftime('%I:%M %p')}")
+    return "\n".join(lines)
+
+
+def append_moves(service, spreadsheet_id: str, rows, execute):
+    from sheets_shards import ensure_tabs
+
+    ensure_tabs(service, spreadsheet_id, [MOVES_TAB], execute, header=MOVES_HEADER)
+    execute(
+        service.spreadsheets().values().append(
+            spreadsheetId=spreadsheet_id,
+            range=f"{MOVES_TAB}!A:K",
+            valueInputOption="RAW",
+            insertDataOption="INSERT_ROWS",
+            body={"values": rows},
+        )
+    )
+
+
+def target_diff(dataset: str, diff, old, rows, id_idx: int, row_filter):
+    """
+    The part of one site's diff a target shows.
+
+    Returns:
+        (rows passing the target's filter, diff restricted to those legs)
+    """
+    from sheets_publish import filter_rows
+
+    rows = filter_rows(dataset, rows, row_filter)
+    shown = {row[id_idx] for row in rows if id_idx < len(row)}
+    return rows, {
+        "added": [leg_id for leg_id in diff["added"] if leg_id in shown],
+        # Removed legs are gone from the CSV: filter on their snapshot Sport
+        "removed": [
+            leg_id for leg_id in diff["removed"]
+            if filter_rows(dataset, [[old[leg_id].get("Sport", "")]], row_filter)
+        ],
+        "changed": {leg_id: moves for leg_id, moves in diff["changed"].items() if leg_id in shown},
+    }
+
+
+def repush_changed(service, spreadsheet_id: str, tab: str, last_col: str, header, rows, diff, execute,
+                   full: bool = False):
+    """
+    Rewrite only the changed rows of one legs tab.
+
+    Returns "none", "partial" or "full" (full when asked to, when legs were
+    removed, since blanking rows in place would leave gaps, or when the sheet's
+    row order no longer matches rows plus the added legs at the end).
+    """
+    if not full and not diff["added"] and not diff["changed"] and not diff["removed"]:
+        return "none"
+
+    id_idx = header.index("id")
+    if not full and not diff["removed"]:
+        # Locate current sheet rows by the id column (B) – one read instead of a rewrite.
+        id_col = chr(ord("A") + id_idx)
+        sheet_ids = execute(
+            service.spreadsheets().values().get(spreadsheetId=spreadsheet_id, range=f"{tab}!{id_col}2:{id_col}")
+        ).get("values", [])
+        ids = [row[id_idx] for row in rows if id_idx < len(row)]
+        added = set(diff["added"])
+        full = ids != [r[0] if r else "" for r in sheet_ids] + [leg_id for leg_id in ids if leg_id in added]
+
+    if full or diff["removed"]:
+        # Write over the old rows first, then clear what is left below them
+        if rows:
+            execute(
+                service.spreadsheets().values().update(
+                    spreadsheetId=spreadsheet_id,
+                    range=f"{tab}!A2",
+                    valueInputOption="RAW",
+                    body={"values": rows},
+                )
+            )
+        execute(service.spreadsheets().values().clear(
+            spreadsheetId=spreadsheet_id, range=f"{tab}!A{len(rows) + 2}:{last_col}"))
+        return "full"
+
+    position = {r[0]: i + 2 for i, r in enumerate(sheet_ids) if r}
+    by_id = {row[id_idx]: row for row in rows if id_idx < len(row)}
+
+    data = []
+    appended = []
+    for leg_id in list(diff["changed"]) + diff["added"]:
+        row_number = position.get(leg_id)
+        if row_number is None:
+            appended.append(by_id[leg_id])
+        else:
+            data.append({"range": f"{tab}!A{row_number}:{last_col}{row_number}", "values": [by_id[leg_id]]})
+    if appended:
+        start = len(sheet_ids) + 2
+        data.append({"range": f"{tab}!A{start}", "values": appended})
+    execute(
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"valueInputOption": "RAW", "data": data},
+        )
+    )
+    return "partial"
+
+
+def repush_targets(diffs, tables, old_by_site, targets_path: str = TARGETS_PATH, names=None, values=None):
+    """
+    Re-push the legs tabs of every publish target mapping them.
+
+    diffs=None (no previous snapshot) rewrites every tab in full; values are
+    pushed_values(tables) when the caller already built them. Returns the
+    names of targets that failed; the others are still pushed.
+    """
+    from sheets_publish import DATASET_LAST_COLUMNS, RateLimiter, ensure_target_tabs, load_targets
+    from sheets_push_cards import _sheets_request_with_retry, get_sheets_service
+
+    targets = [t for t in load_targets(targets_path, names) if set(LEG_DATASETS.values()) & set(t.get("tabs", {}))]
+    if not targets:
+        print(f"No publish target in {targets_path} maps a legs dataset; nothing to re-push")
+        return []
+
+    service = get_sheets_service()
+    limiter = RateLimiter()
+
+    def execute(request):
+        limiter.acquire()
+        return _sheets_request_with_retry(request)
+
+    if values is None:
+        values = pushed_values(tables)
+
+    failed = []
+    for target in targets:
+        spreadsheet_id = target["spreadsheetId"]
+        mapped = [(site, dataset, target["tabs"][dataset])
+                  for site, dataset in LEG_DATASETS.items() if dataset in target["tabs"] and site in tables]
+        try:
+            created = ensure_target_tabs(service, spreadsheet_id, [tab for _, _, tab in mapped], execute)
+            for site, dataset, tab in mapped:
+                _, header, _ = tables[site]
+                id_idx = header.index("id") if "id" in header else 0
+                empty = {"added": [], "removed": [], "changed": {}}
+                rows, diff = target_diff(dataset, diffs[site] if diffs else empty, old_by_site.get(site, {}),
+                                         values[site], id_idx, target.get("filter"))
+                mode = repush_changed(service, spreadsheet_id, tab, DATASET_LAST_COLUMNS[dataset], header, rows,
+                                      diff, execute, full=diffs is None or tab in created)
+                print(f"Re-pushed {target['name']} {tab}: {mode}")
+        except Exception as e:
+            failed.append(target["name"])
+            print(f"FAILED {target['name']}: {e}")
+    return failed
+
+
+def run_diff(moves: bool = False, repush: bool = False, telegram: bool = False, dry_run: bool = False,
+             targets_path: str = TARGETS_PATH, names=None):
+    """
+    One diff pass over every legs CSV. Returns the per-site diffs (None on baseline).
+
+    Raises RepushFailed, without saving the snapshot, if a target's legs could
+    not be re-pushed, so the next pass retries the same moves.
+    """
+    previous = load_snapshot()
+    current = {}
+    tables = {}
+    for path, site in LEG_SOURCES:
+        header, rows = read_legs_csv(path)
+        tables[site] = (path, header, rows)
+        current[site] = snapshot_legs(header, rows)
+
+    values = pushed = None
+    if repush and not dry_run:
+        values = pushed_values(tables)
+        pushed = {site: row_keys(tables[site][1], rows) for site, rows in values.items()}
+
+    if previous is None:
+        print(f"No previous legs snapshot; saving baseline ({sum(len(v) for v in current.values())} legs)")
+        if not dry_run:
+            # Nothing to diff against: the sheets may be anything, so rewrite them
+            failed = repush_targets(None, tables, {}, targets_path, names, values=values) if repush else []
+            if failed:
+                raise RepushFailed(", ".join(failed))
+            save_snapshot(current, pushed=pushed)
+        return None
+
+    started = time.perf_counter()
+    old_by_site = previous.get("legs", {})
+    diffs = {site: diff_legs(old_by_site.get(site, {}), legs) for site, legs in current.items()}
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    detected_at = datetime.now().isoformat(timespec="seconds")
+    all_rows = []
+    for site, diff in diffs.items():
+        n_moves = sum(len(m) for m in diff["changed"].values())
+        print(f"{site}: {len(diff['changed'])} changed legs ({n_moves} field moves), "
+              f"{len(diff['added'])} added, {len(diff['removed'])} removed")
+        all_rows.extend(move_rows(site, diff, old_by_site.get(site, {}), current[site], detected_at))
+    print(f"Diffed against snapshot from {previous.get('savedAt', '?')} in {elapsed_ms:.1f} ms")
+
+    if dry_run:
+        for row in all_rows[:DIGEST_MAX_MOVES]:
+            print("  " + " | ".join(str(v) for v in row[1:]))
+        print("Dry run: snapshot, Sheets and Telegram untouched.")
+        return diffs
+
+    failed = []
+    if repush:
+        old_pushed = previous.get("pushed", {})
+        row_diffs = {
+            site: repush_diff(diff, old_pushed.get(site) if "pushed" in previous else None, pushed.get(site, {}))
+            for site, diff in diffs.items()
+        }
+        stale = sum(len(d["changed"]) - len(diffs[site]["changed"]) for site, d in row_diffs.items())
+        if stale:
+            print(f"{stale} more legs changed outside the tracked fields")
+        if any(d["added"] or d["removed"] or d["changed"] for d in row_diffs.values()):
+            failed = repush_targets(row_diffs, tables, old_by_site, targets_path, names, values=values)
+    if all_rows and moves:
+        from sheets_push_cards import SPREADSHEET_ID, _sheets_request_with_retry, get_sheets_service
+
+        append_moves(get_sheets_service(), SPREADSHEET_ID, all_rows, _sheets_request_with_retry)
+        print(f"Appended {len(all_rows)} rows to {MOVES_TAB}")
+
+    if telegram and any(d["changed"] or d["added"] or d["removed"] for d in diffs.values()):
+        from telegram_kelly import TelegramKellyAlerts
+
+        alerts = TelegramKellyAlerts()
+        if alerts.bot_token == 'YOUR_BOT_TOKEN' or alerts.chat_id == 'YOUR_CHAT_ID':
+            print("Telegram not configured (TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID); skipping digest")
+        else:
+            alerts.send_message(format_digest(diffs, current))
+
+    if failed:
+        raise RepushFailed(", ".join(failed))
+    save_snapshot(current, pushed=pushed if repush else previous.get("pushed"))
+    return diffs
+
+
+def _csv_mtimes():
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p, _ in LEG_SOURCES)
+
+
+def main(moves: bool = False, repush: bool = False, telegram: bool = False, dry_run: bool = False,
+         watch: float = 0, targets_path: str = TARGETS_PATH, names=None):
+    def run():
+        run_diff(moves=moves, repush=repush, telegram=telegram, dry_run=dry_run,
+                 targets_path=targets_path, names=names)
+
+    if not watch:
+        try:
+            run()
+        except RepushFailed as e:
+            raise SystemExit(f"Legs re-push failed for {e}; snapshot kept for the next run")
+        return
+
+    print(f"Watching {', '.join(p for p, _ in LEG_SOURCES)} every {watch:g}s (Ctrl+C to stop)")
+    last = None
+    try:
+        while True:
+            mtimes = _csv_mtimes()
+            if mtimes != last:
+                last = mtimes
+                print(f"\n[{datetime.now():%H:%M:%S}] legs CSVs changed")
+                try:
+                    run()
+                except RepushFailed as e:
+                    print(f"Legs re-push failed for {e}; retrying on the next change")
+                    last = None
+            time.sleep(watch)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Diff the legs CSVs against the previous refresh.")
+    parser.add_argument("--moves", action="store_true", help=f"Append moves to the {MOVES_TAB} tab.")
+    parser.add_argument("--repush", action="store_true",
+                        help="Rewrite only the changed legs rows on every publish target mapping them.")
+    parser.add_argument("--targets", default=TARGETS_PATH,
+                        help=f"Publish targets config for --repush (default: {TARGETS_PATH}).")
+    parser.add_argument("--target", action="append",
+                        help="Only re-push this target name (repeatable).")
+    parser.add_argument("--telegram", action="store_true", help="Send a Telegram digest of the moves.")
+    parser.add_argument("--watch", type=float, nargs="?", const=DEFAULT_WATCH_SECONDS, default=0,
+                        metavar="SECONDS",
+                        help=f"Poll the CSVs and diff on every change (default interval: {DEFAULT_WATCH_SECONDS}s).")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Print the diff; do not update the snapshot, Sheets or Telegram.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(
+        args,
+        main,
+        moves=args.moves,
+        repush=args.repush,
+        telegram=args.telegram,
+        dry_run=args.dry_run,
+        watch=args.watch,
+        targets_path=args.targets,
+        names=args.target,
+    )
@@ -0,0 +1,263 @@
+# profiling.py – shared --profile option for the Python entry points
+#
+# Wraps an entry point's main() with cProfile + tracemalloc and writes, per run:
+#   <script>_<runTimestamp>_<HHMMSS>.pstats      raw cProfile stats (snakeviz, pstats)
+#   <script>_<runTimestamp>_<HHMMSS>.txt         top-N functions by cumulative time
+#   <script>_<runTimestamp>_<HHMMSS>.mem.txt     peak-memory snapshot grouped by line
+#   <script>_<runTimestamp>_<HHMMSS>.collapsed   flamegraph.pl / speedscope input (optional)
+#
+# Usage inside a script:
+#   parser = argparse.ArgumentParser(...)
+#   add_profile_arguments(parser)
+#   args = parser.parse_args()
+#   run_profiled(args, main, dry_run=args.dry_run)
+#
+# cProfile / pstats / tracemalloc / threading are imported only when --profile
+# is given, so registering the option costs nothing at startup.
+
+import csv
+import os
+import re
+import sys
+from datetime import datetime
+
+PROFILE_DIR = "profiles"
+
+# Cards CSVs checked (in order) for the runTimestamp used to tag reports
+RUN_TIMESTAMP_SOURCES = ["prizepicks-cards.csv", "underdog-cards.csv"]
+
+# Frames kept per tracemalloc allocation; 1 is enough for grouping by line
+TRACEMALLOC_FRAMES = 1
+
+# Peak watcher: poll interval and growth needed before re-snapshotting
+PEAK_POLL_SECONDS = 0.05
+PEAK_GROWTH = 1.10
+
+COLLAPSED_MAX_DEPTH = 64
+
+# Call paths carrying less than this share of the profiled time are not walked
+# further; their time is folded into the caller's frame. This keeps the number
+# of paths bounded (the raw caller graph has exponentially many).
+COLLAPSED_MIN_FRACTION = 1e-4
+
+
+def add_profile_arguments(parser):
+    """Register --profile, --profile-out, --profile-top and --profile-collapsed."""
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Profile main() with cProfile + tracemalloc and write reports to --profile-out.",
+    )
+    parser.add_argument(
+        "--profile-out",
+        default=PROFILE_DIR,
+        metavar="DIR",
+        help=f"Directory for --profile reports (default: {PROFILE_DIR}).",
+    )
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=40,
+        help="Number of functions / lines in the text reports (default: 40).",
+    )
+    parser.add_argument(
+        "--profile-collapsed",
+        action="store_true",
+        help="Also write a flamegraph-ready collapsed-stack file.",
+    )
+
+
+def run_timestamp_tag() -> str:
+    """runTimestamp of the current optimizer output, safe for file names."""
+    for path in RUN_TIMESTAMP_SOURCES:
+        if not os.path.exists(path):
+            continue
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                ts = row.get("runTimestamp")
+                if ts:
+                    return re.sub(r"[^0-9A-Za-z-]", "", ts)
+    return datetime.now().strftime("%Y-%m-%dT%H%M%S")
+
+
+class _PeakSnapshotter:
+    """Background thread that keeps the tracemalloc snapshot taken nearest the peak."""
+
+    def __init__(self):
+        import threading
+
+        self.snapshot = None
+        self.snapshot_size = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+        self.capture()  # make sure short runs still get a snapshot
+
+    def capture(self):
+        import tracemalloc
+
+        current, _ = tracemalloc.get_traced_memory()
+        if self.snapshot is None or current > self.snapshot_size:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot_size = current
+
+    def _run(self):
+        import tracemalloc
+
+        while not self._stop.wait(PEAK_POLL_SECONDS):
+            current, _ = tracemalloc.get_traced_memory()
+            if current > self.snapshot_size * PEAK_GROWTH:
+                self.capture()
+
+
+def _func_label(func) -> str:
+    filename, lineno, name = func
+    if filename == "~":
+        return name  # builtins, e.g. "<built-in method builtins.len>"
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+
+def collapsed_stacks(stats):
+    """
+    Approximate collapsed stacks ("a;b;c <microseconds>") from a cProfile call
+    graph. cProfile only records caller->callee edges, so a callee's self time
+    is split across call paths in proportion to each edge's cumulative time.
+
+    Paths below COLLAPSED_MIN_FRACTION of the total (or past
+    COLLAPSED_MAX_DEPTH) end at their caller, which takes their time.
+    """
+    raw = stats.stats
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(func)
+    labels = {func: _func_label(func) for func in raw}
+    min_time = sum(entry[2] for entry in raw.values()) * COLLAPSED_MIN_FRACTION
+
+    lines = {}
+
+    def walk(func, stack, on_stack, scale):
+        _, _, tt, ct, _ = raw[func]
+        stack.append(labels[func])
+        on_stack.add(func)
+        own = tt * scale
+        if len(stack) >= COLLAPSED_MAX_DEPTH:
+            own = ct * scale  # the whole subtree, attributed here
+        else:
+            for child in callees.get(func, []):
+                if child in on_stack:
+                    continue  # recursion – already attributed on this path
+                child_ct = raw[child][3]
+                edge_ct = raw[child][4][func][3]
+                if child_ct <= 0 or edge_ct <= 0:
+                    continue
+                if edge_ct * scale < min_time:
+                    own += edge_ct * scale
+                else:
+                    walk(child, stack, on_stack, scale * edge_ct / child_ct)
+        own_us = int(own * 1e6)
+        if own_us > 0:
+            key = ";".join(stack)
+            lines[key] = lines.get(key, 0) + own_us
+        stack.pop()
+        on_stack.discard(func)
+
+    for func, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            walk(func, [], set(), 1.0)
+
+    return [f"{stack} {value}" for stack, value in sorted(lines.items())]
+
+
+def write_reports(profiler, peak, out_dir: str, prefix: str, top: int, collapsed: bool,
+                  peak_bytes: int, elapsed: float):
+    import io
+    import pstats
+    import tracemalloc
+
+    os.makedirs(out_dir, exist_ok=True)
+    base = os.path.join(out_dir, prefix)
+    written = []
+
+    profiler.dump_stats(base + ".pstats")
+    written.append(base + ".pstats")
+
+    stream = io.StringIO()
+    stats = pstats.Stats(profiler, stream=stream)
+    stream.write(f"# {prefix}  wall={elapsed:.3f}s\n")
+    stats.sort_stats("cumulative").print_stats(top)
+    with open(base + ".txt", "w", encoding="utf-8") as f:
+        f.write(stream.getvalue())
+    written.append(base + ".txt")
+
+    with open(base + ".mem.txt", "w", encoding="utf-8") as f:
+        f.write(f"# {prefix}\n")
+        f.write(f"peak traced memory: {peak_bytes / 1024:.1f} KiB\n")
+        f.write(f"snapshot taken at: {peak.snapshot_size / 1024:.1f} KiB\n\n")
+        if peak.snapshot is not None:
+            snapshot = peak.snapshot.filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, __file__),
+            ))
+            for stat in snapshot.statistics("lineno")[:top]:
+                f.write(f"{stat}\n")
+    written.append(base + ".mem.txt")
+
+    if collapsed:
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            f.write("\n".join(collapsed_stacks(pstats.Stats(profiler))) + "\n")
+        written.append(base + ".collapsed")
+
+    return written
+
+
+def run_profiled(args, func, *func_args, **func_kwargs):
+    """
+    Call func(*func_args, **func_kwargs), profiling it when args.profile is set.
+
+    Reports are written even if func raises; the exception is re-raised.
+    """
+    if not getattr(args, "profile", False):
+        return func(*func_args, **func_kwargs)
+    out_dir = getattr(args, "profile_out", None) or PROFILE_DIR
+
+    import cProfile
+    import time
+    import tracemalloc
+
+    script = os.path.splitext(os.path.basename(sys.argv[0] or "python"))[0]
+    prefix = f"{script}_{run_timestamp_tag()}_{datetime.now():%H%M%S}"
+
+    tracemalloc.start(TRACEMALLOC_FRAMES)
+    peak = _PeakSnapshotter()
+    peak.start()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    try:
+        profiler.enable()
+        return func(*func_args, **func_kwargs)
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        peak.stop()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        written = write_reports(
+            profiler,
+            peak,
+            out_dir,
+            prefix,
+            top=getattr(args, "profile_top", 40),
+            collapsed=getattr(args, "profile_collapsed", False),
+            peak_bytes=peak_bytes,
+            elapsed=elapsed,
+        )
+        print(f"Profile written ({elapsed:.3f}s wall, peak {peak_bytes / 1024:.1f} KiB):")
+        for path in written:
+            print(f"  {path}")
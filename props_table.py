@@ -0,0 +1,351 @@
+# props_table.py – streaming ingest of the per-prop JSON outputs into a compact table
+#
+# data/processed/props-with-ev.json and props-debug.json are one big JSON array
+# of flat prop objects. json.load materialises every object as a dict of boxed
+# Python values before anything can use them. This reads the array one element
+# at a time (JSONDecoder.raw_decode over a fixed-size read buffer) and folds
+# every BATCH_ROWS elements into typed columns:
+#
+#   string fields  -> int32 codes into a per-column vocabulary (sys.intern'd)
+#   numeric fields -> float32 (missing = NaN)
+#
+# The finished table can be persisted as one .npy per column plus meta.json
+# under .cache/props-table/<file stem>/ and reopened memory-mapped. A file whose
+# (size, mtime) still match the cached fingerprint is not read at all; if only
+# the mtime moved, a content hash decides whether to re-ingest.
+#
+# Leg IDs in the optimizer CSVs are prop IDs, so this is also where the fields
+# the legs CSVs drop (opponent, commenceTime, book) are looked up:
+# telegram_kelly.py /card shows them and game_keys_by_id() gives the
+# team-vs-opponent game of each leg.
+#
+# Run:  python props_table.py [--source data/processed/props-with-ev.json ...] [--force] [--no-persist]
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from array import array
+
+import numpy as np
+
+from profiling import add_profile_arguments, run_profiled
+
+PROPS_WITH_EV_JSON = os.path.join("data", "processed", "props-with-ev.json")
+PROPS_DEBUG_JSON = os.path.join("data", "processed", "props-debug.json")
+DEFAULT_SOURCES = [PROPS_WITH_EV_JSON, PROPS_DEBUG_JSON]
+
+CACHE_DIR = os.path.join(".cache", "props-table")
+
+STRING_FIELDS = [
+    "id",
+    "source",
+    "playerName",
+    "team",
+    "opponent",
+    "statType",
+    "commenceTime",
+    "bookKey",
+    "marketKey",
+]
+
+FLOAT_FIELDS = ["line", "impliedProb", "ev"]
+
+READ_CHUNK = 1 << 16
+
+# Records converted to columns per batch (bounds the dicts held at once)
+BATCH_ROWS = 4096
+
+_SEPARATORS = re.compile(r"[\s,]*")
+
+META_FILE = "meta.json"
+META_VERSION = 1
+
+
+def iter_json_array(path: str, chunk_size: int = READ_CHUNK):
+    """Yield the elements of a top-level JSON array without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        eof = False
+
+        def fill():
+            nonlocal buf, pos, eof
+            chunk = f.read(chunk_size)
+            if not chunk:
+                eof = True
+            buf = buf[pos:] + chunk
+            pos = 0
+
+        def skip_separators():
+            """Advance past whitespace and commas; refill as needed."""
+            nonlocal pos
+            while True:
+                pos = _SEPARATORS.match(buf, pos).end()
+                if pos < len(buf) or eof:
+                    return
+                fill()
+
+        skip_separators()
+        if pos >= len(buf):
+            return  # empty file
+        if buf[pos] != "[":
+            raise ValueError(f"{path}: expected a top-level JSON array")
+        pos += 1
+
+        while True:
+            skip_separators()
+            if pos >= len(buf):
+                raise ValueError(f"{path}: unterminated JSON array")
+            if buf[pos] == "]":
+                return
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                    break
+                except json.JSONDecodeError:
+                    if eof:
+                        raise
+                    fill()  # element straddles the buffer end
+            pos = end
+            yield value
+
+
+class PropsTable:
+    """
+    Column-oriented prop table.
+
+    codes[field]   int32 array of vocabulary indexes (string fields)
+    vocab[field]   list of distinct strings, in first-seen order
+    floats[field]  float32 array (numeric fields, NaN when missing)
+    """
+
+    def __init__(self, codes, vocab, floats, fingerprint=None):
+        self.codes = codes
+        self.vocab = vocab
+        self.floats = floats
+        self.fingerprint = fingerprint
+        self._lookup = {}
+
+    def __len__(self):
+        first = next(iter(self.codes.values()), None)
+        return 0 if first is None else len(first)
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from any iterable of prop dicts (e.g. iter_json_array)."""
+        code_cols = {f: array("i") for f in STRING_FIELDS}
+        float_cols = {f: array("f") for f in FLOAT_FIELDS}
+        vocab = {f: [] for f in STRING_FIELDS}
+        index = {f: {} for f in STRING_FIELDS}
+        nan = float("nan")
+
+        def flush(batch):
+            for field in STRING_FIELDS:
+                seen = index[field]
+                words = vocab[field]
+                for value in {rec.get(field) for rec in batch}:
+                    key = "" if value is None else str(value)
+                    if key not in seen:
+                        seen[key] = len(words)
+                        words.append(sys.intern(key))
+                    seen[value] = seen[key]  # raw value (None, int id) -> same code
+                code_cols[field].extend([seen[rec.get(field)] for rec in batch])
+            for field in FLOAT_FIELDS:
+                float_cols[field].extend([
+                    v if type(v) is float else float(v) if type(v) is int else nan
+                    for v in (rec.get(field) for rec in batch)
+                ])
+
+        batch = []
+        for rec in records:
+            batch.append(rec)
+            if len(batch) >= BATCH_ROWS:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+        codes = {f: np.frombuffer(col, dtype=np.int32).copy() for f, col in code_cols.items()}
+        floats = {f: np.frombuffer(col, dtype=np.float32).copy() for f, col in float_cols.items()}
+        return cls(codes, vocab, floats)
+
+    def nbytes(self) -> int:
+        """Bytes held by the column arrays (vocabularies excluded)."""
+        return sum(a.nbytes for a in self.codes.values()) + sum(a.nbytes for a in self.floats.values())
+
+    def column(self, field):
+        """Decoded column: list of strings, or the float32 array."""
+        if field in self.floats:
+            return self.floats[field]
+        values = self.vocab[field]
+        return [values[c] for c in self.codes[field]]
+
+    def row(self, i: int):
+        """One prop as a plain dict (strings decoded, floats as Python floats)."""
+        out = {f: self.vocab[f][self.codes[f][i]] for f in STRING_FIELDS}
+        for f in FLOAT_FIELDS:
+            out[f] = float(self.floats[f][i])
+        return out
+
+    def code_of(self, field: str, value: str):
+        """Vocabulary index of value in a string column, or None if absent."""
+        lookup = self._lookup.get(field)
+        if lookup is None:
+            lookup = self._lookup[field] = {v: i for i, v in enumerate(self.vocab[field])}
+        return lookup.get(value)
+
+    def where(self, field: str, value: str):
+        """Row indexes whose string field equals value."""
+        code = self.code_of(field, value)
+        if code is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.codes[field] == code)
+
+    def save(self, out_dir: str):
+        """Write columns then meta.json, each via tmp + os.replace (safe for open mmaps)."""
+        os.makedirs(out_dir, exist_ok=True)
+        for prefix, cols in (("code", self.codes), ("float", self.floats)):
+            for field, values in cols.items():
+                path = os.path.join(out_dir, f"{prefix}-{field}.npy")
+                with open(path + ".tmp", "wb") as f:
+                    np.save(f, values)
+                os.replace(path + ".tmp", path)
+        _write_meta(out_dir, {
+            "version": META_VERSION,
+            "rows": len(self),
+            "vocab": self.vocab,
+            "fingerprint": self.fingerprint,
+        })
+
+    @classmethod
+    def load(cls, out_dir: str, mmap: bool = True):
+        """Reopen a saved table; columns are memory-mapped unless mmap=False."""
+        with open(os.path.join(out_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+        mode = "r" if mmap else None
+        codes = {f: np.load(os.path.join(out_dir, f"code-{f}.npy"), mmap_mode=mode) for f in STRING_FIELDS}
+        floats = {f: np.load(os.path.join(out_dir, f"float-{f}.npy"), mmap_mode=mode) for f in FLOAT_FIELDS}
+        return cls(codes, meta["vocab"], floats, fingerprint=meta.get("fingerprint"))
+
+
+# Placeholder team names: a prop carrying one of these knows nothing about its game
+UNKNOWN_TEAMS = {"", "UNK", "N/A"}
+
+
+def known_team(name) -> bool:
+    return (name or "").strip().upper() not in UNKNOWN_TEAMS
+
+
+def game_key(team: str, opponent: str) -> str:
+    """Order-independent game key, built like getGameKey in src/run_optimizer.ts."""
+    return "_vs_".join(sorted((team, opponent)))
+
+
+def game_keys_by_id(table: PropsTable):
+    """
+    Prop id -> game key for every prop naming both its team and opponent.
+
+    Props with a placeholder team or opponent (UNK, blank) are left out, so
+    callers fall back to their own key instead of merging every such prop
+    into one UNK_vs_UNK game.
+    """
+    ids, teams, opponents = (table.vocab[f] for f in ("id", "team", "opponent"))
+    keys = {}
+    for i, t, o in zip(table.codes["id"].tolist(), table.codes["team"].tolist(), table.codes["opponent"].tolist()):
+        if known_team(teams[t]) and known_team(opponents[o]):
+            keys.setdefault(ids[i], game_key(teams[t], opponents[o]))
+    return keys
+
+
+def _write_meta(out_dir: str, meta):
+    tmp_path = os.path.join(out_dir, META_FILE + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, os.path.join(out_dir, META_FILE))
+
+
+def file_fingerprint(path: str, digest: bool = True):
+    st = os.stat(path)
+    fp = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if digest:
+        from slate_index import file_digest
+
+        fp["sha256"] = file_digest(path)
+    return fp
+
+
+def cache_dir_for(path: str, cache_root: str = CACHE_DIR) -> str:
+    return os.path.join(cache_root, os.path.splitext(os.path.basename(path))[0])
+
+
+def _cached_meta(out_dir: str):
+    try:
+        with open(os.path.join(out_dir, META_FILE), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get("version") == META_VERSION else None
+
+
+def load_props_table(path: str = PROPS_WITH_EV_JSON, persist: bool = True, force: bool = False,
+                     cache_root: str = CACHE_DIR):
+    """
+    PropsTable for a props JSON file, reusing the persisted copy when unchanged.
+
+    Returns:
+        (table, status) where status is "cached", "rehashed" or "ingested"
+    """
+    out_dir = cache_dir_for(path, cache_root)
+    meta = None if force or not persist else _cached_meta(out_dir)
+    cached = (meta or {}).get("fingerprint") or {}
+
+    if meta:
+        fp = file_fingerprint(path, digest=False)
+        if fp["size"] == cached.get("size") and fp["mtime_ns"] == cached.get("mtime_ns"):
+            return PropsTable.load(out_dir), "cached"
+        if fp["size"] == cached.get("size"):
+            fp = file_fingerprint(path)
+            if fp["sha256"] == cached.get("sha256"):
+                # Touched but identical: keep the columns, refresh the fingerprint.
+                meta["fingerprint"] = fp
+                _write_meta(out_dir, meta)
+                return PropsTable.load(out_dir), "rehashed"
+
+    table = PropsTable.from_records(iter_json_array(path))
+    if persist:
+        table.fingerprint = file_fingerprint(path)
+        table.save(out_dir)
+    return table, "ingested"
+
+
+def main(sources=None, persist: bool = True, force: bool = False):
+    for path in sources or DEFAULT_SOURCES:
+        if not os.path.exists(path):
+            print(f"WARNING: props file not found: {path}")
+            continue
+        started = time.perf_counter()
+        table, status = load_props_table(path, persist=persist, force=force)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        size_kib = os.path.getsize(path) / 1024
+        print(f"{path}: {len(table)} props, {status} in {elapsed_ms:.1f} ms "
+              f"({size_kib:,.0f} KiB JSON -> {table.nbytes() / 1024:,.0f} KiB columns)")
+        vocab_sizes = ", ".join(f"{f}={len(table.vocab[f])}" for f in ("playerName", "statType", "commenceTime"))
+        print(f"  distinct: {vocab_sizes}")
+        ev = table.floats["ev"]
+        if len(table) and not np.isnan(ev).all():
+            print(f"  ev: max {np.nanmax(ev):.4f}, props with ev > 0: {int(np.count_nonzero(ev > 0))}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest props JSON outputs into compact column tables.")
+    parser.add_argument("--source", action="append",
+                        help="Props JSON file (repeatable; default: props-with-ev.json and props-debug.json).")
+    parser.add_argument("--force", action="store_true", help="Re-ingest even if the cached table is current.")
+    parser.add_argument("--no-persist", action="store_true", help="Do not read or write the .cache/props-table copy.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, sources=args.source, persist=not args.no_persist, force=args.force)
@@ -0,0 +1,143 @@
+# push_urgency.py – time-to-lock ordering and a small priority scheduler for pushes
+#
+# A six-sport push can run long enough under the Sheets quota that legs tipping
+# off in minutes are written last. Rows are bucketed by minutes until their
+# game locks (a card locks with its earliest leg), rows whose game has already
+# started are dropped, and the earliest-locking chunk is committed first.
+#
+#   bucket 0   locks in < 30 min
+#   bucket 1   locks in < 2 h
+#   bucket 2   locks in < 6 h
+#   bucket 3   locks in < 24 h
+#   bucket 4   later, or no gameTime
+#
+# Used by sheets_publish.py --urgency and telegram_kelly.py --urgency.
+
+import heapq
+import time
+from datetime import datetime, timezone
+
+# Upper bound (minutes to lock) of each bucket, earliest first
+LOCK_BUCKET_MINUTES = [30, 120, 360, 1440]
+LOCK_BUCKET_LABELS = ["<30m", "<2h", "<6h", "<24h", "later"]
+LATER_BUCKET = len(LOCK_BUCKET_MINUTES)
+
+
+def parse_game_time(value):
+    """Timezone-aware datetime from a gameTime cell, or None if blank / unparseable."""
+    if not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(str(value).strip().replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def minutes_to_lock(lock_time, now):
+    if lock_time is None:
+        return None
+    return (lock_time - now).total_seconds() / 60
+
+
+def lock_bucket(minutes) -> int:
+    """Bucket index for minutes to lock (None -> LATER_BUCKET)."""
+    if minutes is None:
+        return LATER_BUCKET
+    for i, upper in enumerate(LOCK_BUCKET_MINUTES):
+        if minutes < upper:
+            return i
+    return LATER_BUCKET
+
+
+def leg_lock_times(legs):
+    """leg id -> lock datetime (None when the leg has no usable gameTime)."""
+    return {leg["id"]: parse_game_time(leg.get("gameTime")) for leg in legs}
+
+
+def card_lock_time(leg_ids, lock_times):
+    """Earliest lock among a card's legs; None if none of them has a gameTime."""
+    times = [lock_times.get(leg_id) for leg_id in leg_ids]
+    times = [t for t in times if t is not None]
+    return min(times) if times else None
+
+
+def urgency_chunks(items, lock_of, now=None):
+    """
+    Drop started items and group the rest by lock bucket, earliest bucket first.
+
+    Order inside a bucket is preserved, so e.g. UD legs stay legEv-sorted.
+
+    Returns:
+        (chunks, dropped) where chunks is [(bucket, items)]
+    """
+    now = now or datetime.now(timezone.utc)
+    buckets = {}
+    dropped = 0
+    for item in items:
+        minutes = minutes_to_lock(lock_of(item), now)
+        if minutes is not None and minutes <= 0:
+            dropped += 1
+            continue
+        buckets.setdefault(lock_bucket(minutes), []).append(item)
+    return sorted(buckets.items()), dropped
+
+
+class PushScheduler:
+    """
+    Runs submitted jobs lowest priority value first (ties in submit order).
+
+    With workers > 1, each worker pops the most urgent remaining job, so a
+    later chunk never starts before every earlier chunk has been picked up.
+    """
+
+    def __init__(self):
+        import threading  # keeps the ordering helpers cheap to import
+
+        self._heap = []
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    def submit(self, priority, label: str, func, *args, **kwargs):
+        with self._lock:
+            heapq.heappush(self._heap, (priority, self._seq, label, func, args, kwargs))
+            self._seq += 1
+
+    def _pop(self):
+        with self._lock:
+            return heapq.heappop(self._heap) if self._heap else None
+
+    def run(self, workers: int = 1):
+        """Run every job; returns [(label, error or None, seconds)] in completion order."""
+        import threading
+
+        results = []
+        results_lock = threading.Lock()
+
+        def worker():
+            while True:
+                job = self._pop()
+                if job is None:
+                    return
+                _, _, label, func, args, kwargs = job
+                started = time.perf_counter()
+                error = None
+                try:
+                    func(*args, **kwargs)
+                except Exception as e:
+                    error = e
+                with results_lock:
+                    results.append((label, error, time.perf_counter() - started))
+
+        if workers <= 1:
+            worker()
+            return results
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(workers)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results
@@ -0,0 +1,469 @@
+# sheets_publish.py – push one parsed snapshot to every configured spreadsheet
+#
+# The push scripts each hard-code SPREADSHEET_ID, so feeding a second sheet
+# (per-sport sheet, read-only partner sheet, ...) meant running the pipeline
+# again. This builds the Legs / UD-Legs / Cards_Data values once, then fans them
+# out to every target in publish_targets.json concurrently:
+#
+#   {
+#     "targets": [
+#       {
+#         "name": "main",
+#         "spreadsheetId": "...",
+#         "tabs": {"legs": "Legs", "ud_legs": "UD-Legs", "cards": "Cards_Data"},
+#         "filter": {"Sport": ["NBA"], "site": ["PP"]},   # optional
+#         "enabled": true                                  # optional
+#       }
+#     ]
+#   }
+#
+# A target only receives the datasets listed in its "tabs". Each target costs
+# one metadata read, one batchUpdate and one batchClear; all Sheets calls share
+# one rate limiter so extra targets cannot push the run over the per-user write
+# quota. Worker threads build their own API client (httplib2 is not
+# thread-safe) from credentials loaded once.
+#
+# New rows are written over the old ones and only the rows past the new end are
+# cleared afterwards, so a tab is never blank while a push is in flight.
+#
+# --urgency orders rows by time-to-lock instead (see push_urgency.py): legs and
+# cards whose game already started are dropped and the rows are committed
+# bucket by bucket through a PushScheduler, so legs locking in the next half
+# hour are live on every sheet before later slates. A target's leftover rows
+# are cleared once all of its chunks landed; if one failed they stay, so the
+# tab keeps the previous push's tail rather than a gap.
+#
+# --generation reads a complete snapshot generation (snapshot_generations.py)
+# instead of the live CSVs, so the next optimizer run can overwrite them while
+# this push is still parsing or publishing.
+#
+# --sport limits the run to targets that show that sport (targets without a
+# Sport filter always qualify); game_scheduler.py passes the sports that fired.
+#
+# --dataset limits every target to those datasets' tabs; the others are neither
+# cleared nor written. daily-all-sports.bat pushes only cards here because
+# legs_diff.py --repush already updated the changed legs rows on every target.
+#
+# Run:  python sheets_publish.py [--targets publish_targets.json] [--target main] [--sport NBA]
+#                                [--dataset cards] [--urgency] [--generation [RUN_ID]] [--dry-run]
+
+import argparse
+import json
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+import sheets_push_cards
+import sheets_push_legs
+import sheets_push_underdog_legs
+from profiling import add_profile_arguments, run_profiled
+from push_urgency import (
+    LOCK_BUCKET_LABELS,
+    PushScheduler,
+    card_lock_time,
+    parse_game_time,
+    urgency_chunks,
+)
+
+TARGETS_PATH = "publish_targets.json"
+
+# Sheets API: 60 write requests / minute / user. Stay a little under it.
+DEFAULT_REQUESTS_PER_MINUTE = 50
+DEFAULT_WORKERS = 4
+
+# Dataset -> last column cleared before writing (row 1 is left for headers).
+DATASET_LAST_COLUMNS = {
+    "legs": "P",      # Sport + 15 legs columns
+    "ud_legs": "Q",   # + IsNonStandardOdds
+    "cards": "AF",    # Cards_Data A–AF
+}
+
+# Column holding Sport / site in each dataset's rows. Legs rows carry no site
+# column; their site is fixed per dataset.
+SPORT_COLUMN = 0
+CARDS_SITE_COLUMN = 2
+DATASET_SITES = {"legs": "PP", "ud_legs": "UD"}
+
+# Legs rows: id and gameTime columns; Cards_Data rows: Leg1_ID..Leg6_ID (F–K)
+LEGS_ID_COLUMN = 1
+LEGS_GAME_TIME_COLUMN = 14
+CARDS_LEG_COLUMNS = range(5, 11)
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls at least 60 / per_minute seconds apart."""
+
+    def __init__(self, per_minute: int = DEFAULT_REQUESTS_PER_MINUTE):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_at = 0.0
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next_at - now
+            self._next_at = max(now, self._next_at) + self.interval
+        if wait > 0:
+            time.sleep(wait)
+
+
+def load_targets(path: str = TARGETS_PATH, names=None, sports=None, datasets=None):
+    """
+    Enabled targets from the config, optionally restricted to names, to
+    targets that show any of sports (no Sport filter = every sport) and to the
+    tabs of the given datasets (targets left without tabs are dropped).
+    """
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Publish targets not found: {path}")
+    with open(path, encoding="utf-8") as f:
+        targets = json.load(f).get("targets", [])
+    targets = [t for t in targets if t.get("enabled", True)]
+    if names:
+        targets = [t for t in targets if t.get("name") in names]
+    if sports:
+        wanted = _allowed(sports)
+
+        def shows(target):
+            shown = _allowed((target.get("filter") or {}).get("Sport"))
+            return shown is None or bool(shown & wanted)
+
+        targets = [t for t in targets if shows(t)]
+    if datasets:
+        targets = [dict(t, tabs={d: tab for d, tab in t.get("tabs", {}).items() if d in datasets}) for t in targets]
+        targets = [t for t in targets if t["tabs"]]
+    for t in targets:
+        unknown = set(t.get("tabs", {})) - set(DATASET_LAST_COLUMNS)
+        if unknown:
+            raise ValueError(f"Target {t.get('name')}: unknown dataset(s) {sorted(unknown)}")
+    return targets
+
+
+def build_snapshot(generation=None):
+    """Parse the CSVs (or a pinned generation's copies) once into dataset -> rows in Sheets order."""
+    resolve = generation.path if generation is not None else (lambda path: path)
+    snapshot = {}
+
+    for dataset, module in (("legs", sheets_push_legs), ("ud_legs", sheets_push_underdog_legs)):
+        path = resolve(module.CSV_PATH)
+        if os.path.exists(path):
+            snapshot[dataset] = module.csv_to_values(path)
+        else:
+            print(f"WARNING: CSV file not found: {path}")
+            snapshot[dataset] = []
+
+    pp_rows = sheets_push_cards.load_cards_from_csv(resolve(sheets_push_cards.PRIZEPICKS_CSV_PATH), "PP")
+    ud_rows = sheets_push_cards.load_cards_from_csv(resolve(sheets_push_cards.UNDERDOG_CSV_PATH), "UD")
+    snapshot["cards"] = sheets_push_cards.csv_to_values_split_and_reorder_unified(pp_rows, ud_rows)
+    return snapshot
+
+
+def _allowed(values):
+    return {str(v).upper() for v in values} if values else None
+
+
+def filter_rows(dataset: str, rows, row_filter):
+    """Rows of one dataset matching the target's {"Sport": [...], "site": [...]} filter."""
+    if not row_filter:
+        return rows
+    sports = _allowed(row_filter.get("Sport"))
+    sites = _allowed(row_filter.get("site"))
+
+    if sites is not None and dataset in DATASET_SITES:
+        if DATASET_SITES[dataset] not in sites:
+            return []
+        sites = None
+
+    out = []
+    for row in rows:
+        if sports is not None and str(row[SPORT_COLUMN] if row else "").upper() not in sports:
+            continue
+        if sites is not None and str(row[CARDS_SITE_COLUMN] if len(row) > CARDS_SITE_COLUMN else "").upper() not in sites:
+            continue
+        out.append(row)
+    return out
+
+
+def target_payload(target, snapshot):
+    """tab -> (dataset, rows) for one target."""
+    payload = {}
+    for dataset, tab in target.get("tabs", {}).items():
+        payload[tab] = (dataset, filter_rows(dataset, snapshot.get(dataset, []), target.get("filter")))
+    return payload
+
+
+def urgency_snapshot(snapshot, now=None):
+    """
+    Split every dataset into time-to-lock chunks.
+
+    Returns:
+        dataset -> ([(bucket, rows)], dropped row count)
+    """
+    now = now or datetime.now(timezone.utc)
+
+    def leg_lock(row):
+        return parse_game_time(row[LEGS_GAME_TIME_COLUMN]) if len(row) > LEGS_GAME_TIME_COLUMN else None
+
+    lock_times = {}
+    for dataset in ("legs", "ud_legs"):
+        for row in snapshot.get(dataset, []):
+            if len(row) > LEGS_ID_COLUMN:
+                lock_times.setdefault(row[LEGS_ID_COLUMN], leg_lock(row))
+
+    def card_lock(row):
+        return card_lock_time([row[i] for i in CARDS_LEG_COLUMNS if i < len(row) and row[i]], lock_times)
+
+    return {
+        dataset: urgency_chunks(rows, card_lock if dataset == "cards" else leg_lock, now)
+        for dataset, rows in snapshot.items()
+    }
+
+
+def target_chunks(target, urgent):
+    """
+    [(bucket, batchUpdate data)] for one target, earliest bucket first.
+
+    Each tab's chunks are written below the previous bucket's rows, so once
+    every chunk has landed the tab reads in time-to-lock order.
+    """
+    offsets = {}
+    by_bucket = {}
+    for dataset, tab in target.get("tabs", {}).items():
+        chunks, _ = urgent.get(dataset, ([], 0))
+        for bucket, rows in chunks:
+            rows = filter_rows(dataset, rows, target.get("filter"))
+            if not rows:
+                continue
+            start = 2 + offsets.get(tab, 0)
+            offsets[tab] = offsets.get(tab, 0) + len(rows)
+            by_bucket.setdefault(bucket, []).append({"range": f"{tab}!A{start}", "values": rows})
+    return sorted(by_bucket.items())
+
+
+def ensure_target_tabs(service, spreadsheet_id: str, tabs, execute):
+    """Create tabs missing from the spreadsheet (one metadata read, one batchUpdate)."""
+    from sheets_shards import _sheet_ids
+
+    existing = _sheet_ids(service, spreadsheet_id, execute)
+    missing = [t for t in tabs if t not in existing]
+    if missing:
+        execute(
+            service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={"requests": [{"addSheet": {"properties": {"title": t}}} for t in missing]},
+            )
+        )
+    return missing
+
+
+def prepare_target(service, target, execute):
+    """Create the target's missing tabs."""
+    return ensure_target_tabs(service, target["spreadsheetId"], list(target.get("tabs", {}).values()), execute)
+
+
+def chunk_ends(chunks):
+    """tab -> first row below everything the (bucket, data) chunks write."""
+    ends = {}
+    for _, data in chunks:
+        for d in data:
+            tab, cell = d["range"].rsplit("!", 1)
+            ends[tab] = max(ends.get(tab, 2), int(cell[1:]) + len(d["values"]))
+    return ends
+
+
+def tail_ranges(target, ends):
+    """Ranges below each mapped tab's new last row (the whole data area for a tab left empty)."""
+    return [
+        f"{tab}!A{ends.get(tab, 2)}:{DATASET_LAST_COLUMNS[dataset]}"
+        for dataset, tab in target.get("tabs", {}).items()
+    ]
+
+
+def clear_ranges(service, spreadsheet_id: str, ranges, execute):
+    if ranges:
+        execute(
+            service.spreadsheets().values().batchClear(
+                spreadsheetId=spreadsheet_id,
+                body={"ranges": ranges},
+            )
+        )
+
+
+def write_data(service, spreadsheet_id: str, data, execute):
+    if data:
+        execute(
+            service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={"valueInputOption": "RAW", "data": data},
+            )
+        )
+
+
+def publish_target(service, target, payload, execute):
+    """Rewrite every tab of one target in one batchUpdate, then clear the leftover rows in one batchClear."""
+    created = prepare_target(service, target, execute)
+    data = [{"range": f"{tab}!A2", "values": rows} for tab, (_, rows) in payload.items() if rows]
+    write_data(service, target["spreadsheetId"], data, execute)
+    ends = {tab: 2 + len(rows) for tab, (_, rows) in payload.items()}
+    clear_ranges(service, target["spreadsheetId"], tail_ranges(target, ends), execute)
+    return created
+
+
+def main(targets_path: str = TARGETS_PATH, names=None, dry_run: bool = False,
+         requests_per_minute: int = DEFAULT_REQUESTS_PER_MINUTE, workers: int = DEFAULT_WORKERS,
+         urgency: bool = False, generation: str = None, sports=None, datasets=None):
+    targets = load_targets(targets_path, names, sports, datasets)
+    if not targets:
+        print(f"No enabled publish targets in {targets_path}" + (f" for {', '.join(sports)}" if sports else ""))
+        return
+
+    started = time.perf_counter()
+    if generation is not None:
+        from snapshot_generations import pin
+
+        # Everything after the parse works from memory, so the pin only spans the read
+        with pin(None if generation == "current" else generation) as gen:
+            print(f"Pinned generation {gen.run_id}")
+            snapshot = build_snapshot(gen)
+    else:
+        snapshot = build_snapshot()
+    parse_ms = (time.perf_counter() - started) * 1000
+    print(f"Parsed snapshot in {parse_ms:.0f} ms: "
+          + ", ".join(f"{dataset}={len(rows)}" for dataset, rows in snapshot.items()))
+
+    if urgency:
+        urgent = urgency_snapshot(snapshot)
+        for dataset, (chunks, dropped) in urgent.items():
+            buckets = ", ".join(f"{LOCK_BUCKET_LABELS[b]}={len(rows)}" for b, rows in chunks)
+            print(f"  {dataset}: {dropped} started (dropped); {buckets or 'no rows'}")
+        plans = {t["name"]: target_chunks(t, urgent) for t in targets}
+        for t in targets:
+            summary = ", ".join(
+                f"{LOCK_BUCKET_LABELS[b]}={sum(len(d['values']) for d in data)}"
+                for b, data in plans[t["name"]]
+            )
+            print(f"  {t['name']} -> {t['spreadsheetId']}: {summary or 'no rows'}")
+    else:
+        payloads = {t["name"]: target_payload(t, snapshot) for t in targets}
+        for t in targets:
+            summary = ", ".join(f"{tab}={len(rows)}" for tab, (_, rows) in payloads[t["name"]].items())
+            print(f"  {t['name']} -> {t['spreadsheetId']}: {summary}")
+
+    if dry_run:
+        print("Dry run: skipping Sheets publish.")
+        return
+
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    from googleapiclient.discovery import build
+
+    creds = sheets_push_cards.load_credentials()
+    limiter = RateLimiter(requests_per_minute)
+    local = threading.local()
+
+    def execute(request):
+        limiter.acquire()
+        return sheets_push_cards._sheets_request_with_retry(request)
+
+    def service():
+        if not hasattr(local, "service"):
+            local.service = build("sheets", "v4", credentials=creds, cache_discovery=False)
+        return local.service
+
+    def run(target):
+        t0 = time.perf_counter()
+        if urgency:
+            created = prepare_target(service(), target, execute)
+        else:
+            created = publish_target(service(), target, payloads[target["name"]], execute)
+        return created, time.perf_counter() - t0
+
+    def write_chunk(spreadsheet_id, data):
+        write_data(service(), spreadsheet_id, data, execute)
+
+    failed = []
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(targets)))) as pool:
+        futures = {pool.submit(run, t): t["name"] for t in targets}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                created, elapsed = future.result()
+            except Exception as e:
+                failed.append(name)
+                print(f"FAILED {name}: {e}")
+                continue
+            note = f" (created {', '.join(created)})" if created else ""
+            print(f"{'Prepared' if urgency else 'Published'} {name} in {elapsed:.1f}s{note}")
+
+    failed_chunks = []
+    if urgency:
+        # Every target's earliest bucket is committed before any target's next one.
+        scheduler = PushScheduler()
+        chunk_targets = {}
+        for i, t in enumerate(targets):
+            if t["name"] in failed:
+                continue
+            for bucket, data in plans[t["name"]]:
+                label = f"{t['name']} {LOCK_BUCKET_LABELS[bucket]}"
+                chunk_targets[label] = t["name"]
+                scheduler.submit((bucket, i), label, write_chunk, t["spreadsheetId"], data)
+        for label, error, elapsed in scheduler.run(workers=min(workers, len(targets))):
+            if error is not None:
+                failed_chunks.append(label)
+                print(f"FAILED {label}: {error}")
+            else:
+                print(f"Committed {label} in {elapsed:.1f}s")
+
+        incomplete = set(failed) | {chunk_targets[label] for label in failed_chunks}
+        for t in targets:
+            if t["name"] in incomplete:
+                print(f"Kept {t['name']}'s old rows past the new end: a chunk failed")
+                continue
+            try:
+                ranges = tail_ranges(t, chunk_ends(plans[t["name"]]))
+                clear_ranges(service(), t["spreadsheetId"], ranges, execute)
+            except Exception as e:
+                failed_chunks.append(f"{t['name']} tail")
+                print(f"FAILED {t['name']} tail clear: {e}")
+
+    print(f"Published {len(targets) - len(failed)}/{len(targets)} target(s) "
+          f"in {time.perf_counter() - started:.1f}s")
+    if failed or failed_chunks:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Push one parsed snapshot to every publish target.")
+    parser.add_argument("--targets", default=TARGETS_PATH,
+                        help=f"Publish targets config (default: {TARGETS_PATH}).")
+    parser.add_argument("--target", action="append",
+                        help="Only publish to this target name (repeatable).")
+    parser.add_argument("--sport", action="append",
+                        help="Only publish to targets that show this sport (repeatable).")
+    parser.add_argument("--dataset", action="append", choices=sorted(DATASET_LAST_COLUMNS),
+                        help="Only publish this dataset's tabs (repeatable; default: every mapped tab).")
+    parser.add_argument("--requests-per-minute", type=int, default=DEFAULT_REQUESTS_PER_MINUTE,
+                        help=f"Shared Sheets request budget across targets (default: {DEFAULT_REQUESTS_PER_MINUTE}).")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                        help=f"Targets published concurrently (default: {DEFAULT_WORKERS}).")
+    parser.add_argument("--urgency", action="store_true",
+                        help="Drop started games and commit rows earliest-locking chunk first.")
+    parser.add_argument("--generation", nargs="?", const="current",
+                        help="Read a pinned snapshot generation (default: CURRENT) instead of the live CSVs.")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Parse and filter the snapshot; do not touch Sheets.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(
+        args,
+        main,
+        targets_path=args.targets,
+        names=args.target,
+        dry_run=args.dry_run,
+        requests_per_minute=args.requests_per_minute,
+        workers=args.workers,
+        urgency=args.urgency,
+        generation=args.generation,
+        sports=args.sport,
+        datasets=args.dataset,
+    )
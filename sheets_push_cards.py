@@ -5,11 +5,7 @@ import csv
 import os
 import time
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
-from googleapiclient.errors import HttpError
+from profiling import add_profile_arguments, run_profiled
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
@@ -68,10 +64,12 @@ UNIFIED_CSV_HEADER_FIELDS = [
 _sheets_service = None
 
 
-def get_sheets_service():
-    global _sheets_service
-    if _sheets_service is not None:
-        return _sheets_service
+def load_credentials():
+    """OAuth credentials from token.json, refreshing or re-authorizing as needed."""
+    # Imported lazily so --dry-run / --help never load the Google client stack.
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
 
     creds = None
     if os.path.exists("token.json"):
@@ -86,7 +84,17 @@ def get_sheets_service():
             creds = flow.run_local_server(port=0)
         with open("token.json", "w", encoding="utf-8") as token:
             token.write(creds.to_json())
-    _sheets_service = build("sheets", "v4", credentials=creds)
+    return creds
+
+
+def get_sheets_service():
+    global _sheets_service
+    if _sheets_service is not None:
+        return _sheets_service
+
+    from googleapiclient.discovery import build
+
+    _sheets_service = build("sheets", "v4", credentials=load_credentials())
     return _sheets_service
 
 
@@ -275,6 +283,8 @@ def csv_to_values_split_and_reorder_unified(pp_rows, ud_rows):
 
 def _sheets_request_with_retry(request):
     """Execute a Sheets API request with exponential backoff on 5xx / 429."""
+    from googleapiclient.errors import HttpError
+
     last_error = None
     for attempt in range(SHEETS_RETRIES):
         try:
@@ -291,7 +301,7 @@ def _sheets_request_with_retry(request):
         raise last_error
 
 
-def main(dry_run: bool = False):
+def main(dry_run: bool = False, shard_by: str = "none", archive_after_days: int = 7):
     # Load PrizePicks cards
     pp_rows = load_cards_from_csv(PRIZEPICKS_CSV_PATH, "PP")
     
@@ -313,6 +323,10 @@ def main(dry_run: bool = False):
     values = csv_to_values_split_and_reorder_unified(pp_rows, ud_rows)
     print(f"Converted {len(values)} rows to Sheets format")
 
+    if shard_by != "none":
+        push_sharded(values, shard_by, archive_after_days, dry_run=dry_run)
+        return
+
     if dry_run:
         print("Dry run: skipping Sheets clear/update.")
         return
@@ -349,6 +363,34 @@ def main(dry_run: bool = False):
         print(f"First row preview: Sport={sport}, site={site}, flexType={flex_type}")
 
 
+def push_sharded(values, shard_by: str, archive_after_days: int, dry_run: bool = False):
+    """Push rows to per-sport / per-date shard tabs instead of Cards_Data."""
+    import sheets_shards
+
+    shards = sheets_shards.route_rows(values, shard_by)
+    print(f"Routed {len(values)} rows into {len(shards)} shard(s) (shard-by: {shard_by})")
+
+    if dry_run:
+        for tab, rows in shards.items():
+            print(f"  {tab}: {len(rows)} rows")
+        print("Dry run: skipping Sheets shard push.")
+        return
+
+    service = get_sheets_service()
+    state = sheets_shards.load_shard_state()
+    sheets_shards.push_shards(service, SPREADSHEET_ID, shards, _sheets_request_with_retry, state=state)
+    sheets_shards.rotate_shards(
+        service,
+        SPREADSHEET_ID,
+        state,
+        _sheets_request_with_retry,
+        archive_after_days,
+        keep=set(shards),
+    )
+    sheets_shards.write_index_tab(service, SPREADSHEET_ID, state, _sheets_request_with_retry)
+    sheets_shards.save_shard_state(state)
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Push card data from CSV to Cards_Data sheet.")
     parser.add_argument(
@@ -356,5 +398,24 @@ if __name__ == "__main__":
         action="store_true",
         help="Only parse CSV and report row count; do not clear or update Sheets.",
     )
+    parser.add_argument(
+        "--shard-by",
+        choices=["none", "sport", "date", "sport-date"],
+        default="none",
+        help="Route rows to Cards_<key> shard tabs instead of Cards_Data (default: none).",
+    )
+    parser.add_argument(
+        "--archive-after-days",
+        type=int,
+        default=7,
+        help="With --shard-by, archive shard tabs not pushed for this many days (default: 7).",
+    )
+    add_profile_arguments(parser)
     args = parser.parse_args()
-    main(dry_run=args.dry_run)
+    run_profiled(
+        args,
+        main,
+        dry_run=args.dry_run,
+        shard_by=args.shard_by,
+        archive_after_days=args.archive_after_days,
+    )
@@ -1,12 +1,10 @@
 # sheets_push_legs.py (LEGS)
 
+import argparse
 import os
 import csv
 
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
-from googleapiclient.discovery import build
+from profiling import add_profile_arguments, run_profiled
 
 SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
 
@@ -20,6 +18,12 @@ CSV_PATH = "prizepicks-legs.csv"
 
 
 def get_sheets_service():
+    # Imported lazily so --dry-run / --help never load the Google client stack.
+    from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from google_auth_oauthlib.flow import InstalledAppFlow
+    from googleapiclient.discovery import build
+
     creds = None
     if os.path.exists("token.json"):
         creds = Credentials.from_authorized_user_file("token.json", SCOPES)
@@ -52,12 +56,16 @@ def csv_to_values(path: str):
     return rows
 
 
-def main():
+def main(dry_run: bool = False):
     if not os.path.exists(CSV_PATH):
         raise FileNotFoundError(f"CSV not found: {CSV_PATH}")
 
-    service = get_sheets_service()
     values = csv_to_values(CSV_PATH)
+    if dry_run:
+        print(f"Dry run: parsed {len(values)} rows from {CSV_PATH}; skipping Sheets clear/update.")
+        return
+
+    service = get_sheets_service()
     body = {"values": values}
 
     # Clear the whole Legs area before pushing new rows.
@@ -88,4 +96,12 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Push prizepicks-legs.csv to the Legs tab.")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only parse CSV and report row count; do not clear or update Sheets.",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, dry_run=args.dry_run)
@@ -0,0 +1,342 @@
+# sheets_shards.py – route Cards_Data rows into per-sport / per-date shard tabs
+#
+# Cards_Data is a single flat tab that is cleared every run. Keeping more than
+# one slate there eventually runs into the per-spreadsheet cell limit and slows
+# every range formula down. This module splits the unified card rows into
+# shard tabs (Cards_NBA, Cards_2026-02-14, Cards_NBA_2026-02-14, ...), keeps a
+# small Shard_Index tab describing where every shard lives, and rolls shards
+# that have not been pushed for a while into gzip CSVs under archive/shards/.
+#
+# Each push only touches the shards present in the current run (one batchClear
+# + one batchUpdate), so push and recalculation time stay flat as history
+# accumulates.
+#
+# Run standalone to rotate old shards without pushing:
+#   python sheets_shards.py --archive-after-days 7 [--dry-run]
+
+import argparse
+import csv
+import gzip
+import json
+import os
+from datetime import datetime, timedelta
+
+from profiling import add_profile_arguments, run_profiled
+
+SHARD_MODES = ("none", "sport", "date", "sport-date")
+
+SHARD_TAB_PREFIX = "Cards"
+SHARD_INDEX_TAB = "Shard_Index"
+
+# Local record of every shard ever written (tab -> metadata).
+SHARD_STATE_PATH = os.path.join(".cache", "shard-index.json")
+
+# Rotated shards are written here as <tab>-<lastPushDate>.csv.gz
+ARCHIVE_DIR = os.path.join("archive", "shards")
+
+# Same width as Cards_Data (A–AF).
+SHARD_LAST_COLUMN = "AF"
+
+# Header row written to row 1 of a newly created shard tab.
+SHARD_HEADER = [
+    "Sport", "Date", "Card_ID", "Slip", "Legs",
+    "Leg1_ID", "Leg2_ID", "Leg3_ID", "Leg4_ID", "Leg5_ID", "Leg6_ID",
+    "AvgProb", "AvgEdge%", "CardEV%", "WinProbCash", "KellyStake",
+    "PlayerBlock", "selected", "portfolioRank", "efficiencyScore",
+    "kellyMeanReturn", "kellyVariance", "kellyRawFraction",
+    "kellyCappedFraction", "kellyFinalFraction", "kellyExpectedProfit",
+    "kellyMaxWin", "kellyRiskAdjustment", "kellyIsCapped", "kellyCapReasons",
+    "runTimestamp",
+]
+
+INDEX_HEADER = ["Shard", "Sport", "Date", "Rows", "LastPush", "Location"]
+
+
+def _row_sport(row) -> str:
+    return (row[0] if row else "") or "UNK"
+
+
+def _row_date(row) -> str:
+    # Column B is runTimestamp, e.g. "2026-02-14T15:00:00 ET"
+    ts = row[1] if len(row) > 1 else ""
+    return ts[:10] if ts else "undated"
+
+
+def shard_tab_name(row, shard_by: str) -> str:
+    """Return the shard tab a Cards_Data-format row belongs to."""
+    if shard_by == "sport":
+        return f"{SHARD_TAB_PREFIX}_{_row_sport(row)}"
+    if shard_by == "date":
+        return f"{SHARD_TAB_PREFIX}_{_row_date(row)}"
+    if shard_by == "sport-date":
+        return f"{SHARD_TAB_PREFIX}_{_row_sport(row)}_{_row_date(row)}"
+    raise ValueError(f"Unknown shard mode: {shard_by}")
+
+
+def route_rows(values, shard_by: str):
+    """
+    Group Cards_Data-format rows (see csv_to_values_split_and_reorder_unified)
+    by shard tab, preserving row order inside each shard.
+
+    Returns:
+        Dict of tab name -> list of rows
+    """
+    shards = {}
+    for row in values:
+        shards.setdefault(shard_tab_name(row, shard_by), []).append(row)
+    return shards
+
+
+def load_shard_state(path: str = SHARD_STATE_PATH):
+    if not os.path.exists(path):
+        return {"shards": {}, "lastRotation": ""}
+    with open(path, encoding="utf-8") as f:
+        state = json.load(f)
+    state.setdefault("shards", {})
+    state.setdefault("lastRotation", "")
+    return state
+
+
+def save_shard_state(state, path: str = SHARD_STATE_PATH):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _sheet_ids(service, spreadsheet_id: str, execute):
+    """Map tab title -> sheetId for the spreadsheet."""
+    meta = execute(
+        service.spreadsheets().get(
+            spreadsheetId=spreadsheet_id,
+            fields="sheets.properties(sheetId,title)",
+        )
+    )
+    return {
+        s["properties"]["title"]: s["properties"]["sheetId"]
+        for s in meta.get("sheets", [])
+    }
+
+
+def ensure_tabs(service, spreadsheet_id: str, tabs, execute, header=None):
+    """Create any missing tabs in one batchUpdate; write header to new ones."""
+    existing = _sheet_ids(service, spreadsheet_id, execute)
+    missing = [t for t in tabs if t not in existing]
+    if not missing:
+        return []
+
+    execute(
+        service.spreadsheets().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={"requests": [{"addSheet": {"properties": {"title": t}}} for t in missing]},
+        )
+    )
+    if header:
+        execute(
+            service.spreadsheets().values().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={
+                    "valueInputOption": "RAW",
+                    "data": [{"range": f"{t}!A1", "values": [header]} for t in missing],
+                },
+            )
+        )
+    print(f"Created {len(missing)} shard tab(s): {', '.join(missing)}")
+    return missing
+
+
+def push_shards(service, spreadsheet_id: str, shards, execute, state=None, now=None):
+    """
+    Push routed rows to their shard tabs.
+
+    Only the shards present in this run are cleared and rewritten; older shards
+    are left untouched. Uses one batchClear and one batchUpdate regardless of
+    the number of shards.
+    """
+    if not shards:
+        return state
+
+    state = state if state is not None else load_shard_state()
+    now = now or datetime.now()
+
+    ensure_tabs(service, spreadsheet_id, list(shards), execute, header=SHARD_HEADER)
+
+    execute(
+        service.spreadsheets().values().batchClear(
+            spreadsheetId=spreadsheet_id,
+            body={"ranges": [f"{tab}!A2:{SHARD_LAST_COLUMN}" for tab in shards]},
+        )
+    )
+    execute(
+        service.spreadsheets().values().batchUpdate(
+            spreadsheetId=spreadsheet_id,
+            body={
+                "valueInputOption": "RAW",
+                "data": [
+                    {"range": f"{tab}!A2", "values": rows}
+                    for tab, rows in shards.items()
+                ],
+            },
+        )
+    )
+
+    pushed_at = now.isoformat(timespec="seconds")
+    for tab, rows in shards.items():
+        state["shards"][tab] = {
+            "sport": _row_sport(rows[0]),
+            "date": _row_date(rows[0]),
+            "rows": len(rows),
+            "lastPush": pushed_at,
+            "location": "sheet",
+        }
+        print(f"  {tab}: {len(rows)} rows")
+
+    print(f"Pushed {sum(len(r) for r in shards.values())} rows to {len(shards)} shard tab(s)")
+    return state
+
+
+def write_index_tab(service, spreadsheet_id: str, state, execute):
+    """Rewrite Shard_Index with one row per known shard (sheet or archive)."""
+    ensure_tabs(service, spreadsheet_id, [SHARD_INDEX_TAB], execute)
+    values = [INDEX_HEADER]
+    for tab, info in sorted(state["shards"].items()):
+        values.append([
+            tab,
+            info.get("sport", ""),
+            info.get("date", ""),
+            info.get("rows", 0),
+            info.get("lastPush", ""),
+            info.get("location", ""),
+        ])
+
+    execute(
+        service.spreadsheets().values().clear(
+            spreadsheetId=spreadsheet_id,
+            range=f"{SHARD_INDEX_TAB}!A:F",
+        )
+    )
+    execute(
+        service.spreadsheets().values().update(
+            spreadsheetId=spreadsheet_id,
+            range=f"{SHARD_INDEX_TAB}!A1",
+            valueInputOption="RAW",
+            body={"values": values},
+        )
+    )
+
+
+def stale_shards(state, archive_after_days: int, now=None, keep=()):
+    """Return shard tabs still on the sheet whose last push is too old."""
+    now = now or datetime.now()
+    cutoff = now - timedelta(days=archive_after_days)
+    stale = []
+    for tab, info in state["shards"].items():
+        if info.get("location") != "sheet" or tab in keep:
+            continue
+        try:
+            last_push = datetime.fromisoformat(info.get("lastPush", ""))
+        except ValueError:
+            continue
+        if last_push < cutoff:
+            stale.append(tab)
+    return sorted(stale)
+
+
+def archive_shard_values(tab: str, values, last_push: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Write a shard's values to a gzip CSV and return the archive path."""
+    os.makedirs(archive_dir, exist_ok=True)
+    stamp = last_push[:10].replace("-", "") or "undated"
+    path = os.path.join(archive_dir, f"{tab}-{stamp}.csv.gz")
+    with gzip.open(path, "wt", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(values)
+    return path
+
+
+def rotate_shards(service, spreadsheet_id: str, state, execute, archive_after_days: int,
+                  now=None, keep=(), dry_run: bool = False):
+    """
+    Move shards not pushed for archive_after_days into archive/shards/ and
+    delete their tabs. Runs at most once per day (tracked in the state file).
+
+    Returns:
+        List of archive paths written
+    """
+    now = now or datetime.now()
+    today = now.date().isoformat()
+    if state.get("lastRotation") == today:
+        return []
+
+    stale = stale_shards(state, archive_after_days, now=now, keep=keep)
+    if not stale:
+        state["lastRotation"] = today
+        return []
+
+    print(f"Rotating {len(stale)} shard(s) older than {archive_after_days} days: {', '.join(stale)}")
+    if dry_run:
+        return []
+
+    resp = execute(
+        service.spreadsheets().values().batchGet(
+            spreadsheetId=spreadsheet_id,
+            ranges=[f"{tab}!A1:{SHARD_LAST_COLUMN}" for tab in stale],
+        )
+    )
+    sheet_ids = _sheet_ids(service, spreadsheet_id, execute)
+
+    written = []
+    for tab, value_range in zip(stale, resp.get("valueRanges", [])):
+        info = state["shards"][tab]
+        path = archive_shard_values(tab, value_range.get("values", []), info.get("lastPush", ""))
+        info["location"] = path.replace(os.sep, "/")
+        written.append(path)
+
+    delete_requests = [
+        {"deleteSheet": {"sheetId": sheet_ids[tab]}} for tab in stale if tab in sheet_ids
+    ]
+    if delete_requests:
+        execute(
+            service.spreadsheets().batchUpdate(
+                spreadsheetId=spreadsheet_id,
+                body={"requests": delete_requests},
+            )
+        )
+
+    state["lastRotation"] = today
+    print(f"Archived {len(written)} shard(s) to {ARCHIVE_DIR}")
+    return written
+
+
+def main(archive_after_days: int = 7, dry_run: bool = False):
+    from sheets_push_cards import SPREADSHEET_ID, _sheets_request_with_retry, get_sheets_service
+
+    state = load_shard_state()
+    if dry_run:
+        stale = stale_shards(state, archive_after_days)
+        print(f"Dry run: {len(stale)} shard(s) would be archived: {', '.join(stale) or '-'}")
+        return
+
+    service = get_sheets_service()
+    # Standalone runs always rotate, regardless of the once-per-day marker.
+    state["lastRotation"] = ""
+    rotate_shards(service, SPREADSHEET_ID, state, _sheets_request_with_retry, archive_after_days)
+    write_index_tab(service, SPREADSHEET_ID, state, _sheets_request_with_retry)
+    save_shard_state(state)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Archive stale Cards shard tabs and refresh Shard_Index.")
+    parser.add_argument(
+        "--archive-after-days",
+        type=int,
+        default=7,
+        help="Archive shards whose last push is older than this many days (default: 7).",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only report which shards would be archived; do not touch Sheets.",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, archive_after_days=args.archive_after_days, dry_run=args.dry_run)
@@ -0,0 +1,377 @@
+# slate_api.py – indexed read-only HTTP API over the current cards and legs
+#
+# The dashboard and local scripts re-read the CSVs for every filtered question
+# ("NBA 5F cards over 8% EV", "cards containing leg X"). This loads the current
+# snapshot once into column arrays with secondary indexes:
+#
+#   Sport / site / flexType / leg id  -> sorted int arrays of card rows
+#   Sport / site                      -> sorted int arrays of leg rows
+#
+# and answers queries by intersecting index arrays, masking numeric columns and
+# slicing a pre-serialized JSON fragment per row. Every response carries an
+# ETag derived from the snapshot hash + request, so unchanged polls get a 304,
+# and bodies are gzip'd when the client accepts it (the gzip variant's ETag
+# gets a -gz suffix, so the two encodings never share a strong validator).
+#
+# A snapshot reads each CSV's bytes once and both hashes and parses those same
+# bytes, so its hash always names exactly the data it serves. A watcher thread
+# fingerprints the CSVs (mtime/size, then sha256) and builds a new snapshot off
+# to the side; the server swaps the reference in one assignment, so in-flight
+# requests finish on the snapshot they started with.
+#
+# Endpoints (all GET, JSON):
+#   /meta
+#   /cards?sport=NBA&site=PP&flexType=5F&leg=<id>&minEv=0.05&selected=1&sort=-cardEv&limit=50&offset=0
+#   /legs?sport=NBA&site=UD&player=<substring>&minEdge=0.02&sort=-legEv&limit=50&offset=0
+#
+# Run:  python slate_api.py [--host 127.0.0.1] [--port 8766] [--poll 5]
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import CARD_SOURCES, LEG_SOURCES, card_leg_ids, load_cards, load_legs
+from slate_index import file_digest
+
+DEFAULT_PORT = 8766
+DEFAULT_POLL_SECONDS = 5.0
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 1000
+
+# Bodies smaller than this are sent uncompressed
+GZIP_MIN_BYTES = 1024
+
+CARD_FIELDS = [
+    "Sport", "site", "flexType", "cardEv", "winProbCash", "winProbAny", "avgProb", "avgEdgePct",
+    "kellyStake", "kellyFinalFraction", "kellyExpectedProfit", "kellyMaxWin", "selected", "runTimestamp",
+]
+CARD_NUMERIC = ["cardEv", "winProbCash", "avgProb", "avgEdgePct", "kellyStake"]
+
+LEG_FIELDS = [
+    "Sport", "site", "id", "player", "team", "stat", "line", "overOdds", "underOdds",
+    "trueProb", "edge", "legEv", "gameTime",
+]
+LEG_NUMERIC = ["line", "trueProb", "edge", "legEv"]
+
+EMPTY = np.empty(0, dtype=np.int64)
+
+
+def _index(values):
+    """value -> sorted int64 array of row positions."""
+    groups = {}
+    for i, value in enumerate(values):
+        groups.setdefault(value, []).append(i)
+    return {value: np.asarray(rows, dtype=np.int64) for value, rows in groups.items()}
+
+
+def _fragment(row, fields):
+    return json.dumps({f: row.get(f) for f in fields if f in row}, default=str)
+
+
+class Table:
+    """Rows as pre-serialized JSON fragments plus numeric columns and indexes."""
+
+    def __init__(self, rows, fields, numeric, indexed):
+        self.size = len(rows)
+        self.fragments = [_fragment(r, fields) for r in rows]
+        self.columns = {
+            f: np.asarray([r.get(f, 0.0) if isinstance(r.get(f), float) else 0.0 for r in rows], dtype=np.float64)
+            for f in numeric
+        }
+        self.indexes = {f: _index([str(r.get(f, "")).upper() for r in rows]) for f in indexed}
+        # Ascending order per numeric column, for unfiltered sorted scans
+        self.orders = {f: np.argsort(col, kind="stable") for f, col in self.columns.items()}
+
+    def lookup(self, field: str, value: str):
+        return self.indexes[field].get(value.upper(), EMPTY)
+
+    def select(self, candidates, minimums, sort: str, offset: int, limit: int):
+        """
+        Filter candidate rows (None = all) by numeric minimums, sort, page.
+
+        Returns:
+            (total matches, list of JSON fragments)
+        """
+        desc = sort.startswith("-")
+        key = sort.lstrip("-+")
+        if key not in self.columns:
+            raise ValueError(f"cannot sort by {key!r}; sortable: {', '.join(self.columns)}")
+
+        if candidates is None and not minimums:
+            order = self.orders[key][::-1] if desc else self.orders[key]
+            return self.size, [self.fragments[i] for i in order[offset:offset + limit]]
+
+        rows = np.arange(self.size) if candidates is None else candidates
+        for field, minimum in minimums.items():
+            rows = rows[self.columns[field][rows] >= minimum]
+        values = self.columns[key][rows]
+        order = np.argsort(-values if desc else values, kind="stable")
+        picked = rows[order[offset:offset + limit]]
+        return len(rows), [self.fragments[i] for i in picked]
+
+
+def intersect(arrays):
+    """Intersection of sorted row arrays, smallest first; None when no filters."""
+    if not arrays:
+        return None
+    arrays = sorted(arrays, key=len)
+    rows = arrays[0]
+    for other in arrays[1:]:
+        if not len(rows):
+            break
+        rows = np.intersect1d(rows, other, assume_unique=True)
+    return rows
+
+
+class SlateSnapshot:
+    """Immutable cards + legs snapshot; replaced wholesale on reload."""
+
+    def __init__(self, card_sources=None, leg_sources=None):
+        self.card_sources = card_sources or CARD_SOURCES
+        self.leg_sources = leg_sources or LEG_SOURCES
+        self.fingerprints = {}
+        digests = []
+        contents = {}
+        for path, _ in list(self.card_sources) + list(self.leg_sources):
+            data = self._read(path)
+            if data is not None:
+                contents[path] = data
+                digests.append(f"{path}:{self.fingerprints[path][2]}")
+        self.hash = hashlib.sha256("\n".join(digests).encode("utf-8")).hexdigest()[:16]
+        self.loaded_at = time.strftime("%Y-%m-%dT%H:%M:%S")
+
+        cards = []
+        for path, site in self.card_sources:
+            if path in contents:
+                cards.extend(load_cards(path, site, contents[path]))
+        legs = []
+        for path, site in self.leg_sources:
+            if path in contents:
+                legs.extend(load_legs(path, site, contents[path]))
+        for card in cards:
+            card["legs"] = card_leg_ids(card)
+            card["selected"] = card.get("selected", True)
+
+        self.cards = Table(cards, CARD_FIELDS + ["legs"], CARD_NUMERIC, ["Sport", "site", "flexType"])
+        self.cards_by_leg = {}
+        for i, card in enumerate(cards):
+            for leg_id in card["legs"]:
+                self.cards_by_leg.setdefault(leg_id, []).append(i)
+        self.cards_by_leg = {k: np.asarray(v, dtype=np.int64) for k, v in self.cards_by_leg.items()}
+        self.selected_rows = np.flatnonzero([c["selected"] is True for c in cards])
+
+        self.legs = Table(legs, LEG_FIELDS, LEG_NUMERIC, ["Sport", "site"])
+        self.leg_players = [str(leg.get("player", "")).lower() for leg in legs]
+
+    def _read(self, path: str):
+        """
+        The file's bytes (None if missing), fingerprinted from the same read.
+
+        The stat is taken before reading: a write landing mid-read moves the
+        mtime past it, so changed_on_disk re-hashes and reloads.
+        """
+        try:
+            with open(path, "rb") as f:
+                st = os.fstat(f.fileno())
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        self.fingerprints[path] = (st.st_mtime_ns, st.st_size, hashlib.sha256(data).hexdigest())
+        return data
+
+    def changed_on_disk(self) -> bool:
+        """True when any source file's content differs from this snapshot."""
+        for path, _ in list(self.card_sources) + list(self.leg_sources):
+            old = self.fingerprints.get(path)
+            if not os.path.exists(path):
+                if old is not None:
+                    return True
+                continue
+            st = os.stat(path)
+            if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+                continue
+            if old is None or file_digest(path) != old[2]:
+                return True
+        return False
+
+    def meta(self):
+        return {
+            "snapshot": self.hash,
+            "loadedAt": self.loaded_at,
+            "cards": self.cards.size,
+            "legs": self.legs.size,
+            "sports": sorted(self.cards.indexes["Sport"]),
+        }
+
+    def query_cards(self, params):
+        filters = []
+        for field, param in (("Sport", "sport"), ("site", "site"), ("flexType", "flexType")):
+            if params.get(param):
+                filters.append(self.cards.lookup(field, params[param]))
+        if params.get("leg"):
+            filters.append(self.cards_by_leg.get(params["leg"], EMPTY))
+        if params.get("selected") in ("1", "true", "True"):
+            filters.append(self.selected_rows)
+        minimums = {}
+        if params.get("minEv"):
+            minimums["cardEv"] = float(params["minEv"])
+        if params.get("minStake"):
+            minimums["kellyStake"] = float(params["minStake"])
+        return self.cards.select(intersect(filters), minimums, params.get("sort", "-cardEv"),
+                                 *_page(params))
+
+    def query_legs(self, params):
+        filters = []
+        for field, param in (("Sport", "sport"), ("site", "site")):
+            if params.get(param):
+                filters.append(self.legs.lookup(field, params[param]))
+        if params.get("player"):
+            needle = params["player"].lower()
+            filters.append(np.asarray([i for i, p in enumerate(self.leg_players) if needle in p], dtype=np.int64))
+        minimums = {}
+        if params.get("minEdge"):
+            minimums["edge"] = float(params["minEdge"])
+        return self.legs.select(intersect(filters), minimums, params.get("sort", "-legEv"), *_page(params))
+
+
+def _page(params):
+    offset = max(0, int(params.get("offset", 0)))
+    limit = min(MAX_LIMIT, max(1, int(params.get("limit", DEFAULT_LIMIT))))
+    return offset, limit
+
+
+class SnapshotHolder:
+    """Current snapshot reference plus the background reload loop."""
+
+    def __init__(self, poll_seconds: float = DEFAULT_POLL_SECONDS):
+        self.current = SlateSnapshot()
+        self.poll_seconds = poll_seconds
+        self._stop = threading.Event()
+
+    def reload_if_changed(self) -> bool:
+        if not self.current.changed_on_disk():
+            return False
+        started = time.perf_counter()
+        snapshot = SlateSnapshot(self.current.card_sources, self.current.leg_sources)
+        self.current = snapshot  # single reference swap – readers never see a half-built snapshot
+        print(f"Reloaded snapshot {snapshot.hash} ({snapshot.cards.size} cards, {snapshot.legs.size} legs) "
+              f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+        return True
+
+    def watch(self):
+        while not self._stop.wait(self.poll_seconds):
+            try:
+                self.reload_if_changed()
+            except Exception as e:  # a half-written CSV: keep serving the old snapshot
+                print(f"Reload failed, keeping snapshot {self.current.hash}: {e}")
+
+    def start(self):
+        threading.Thread(target=self.watch, daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+
+
+def gzip_etag(etag: str) -> str:
+    """ETag of the gzip-encoded variant of a response (a different byte sequence)."""
+    return etag[:-1] + '-gz"'
+
+
+def make_handler(holder: SnapshotHolder):
+    from http.server import BaseHTTPRequestHandler
+    from urllib.parse import parse_qsl, urlparse
+    import zlib
+
+    class SlateHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            snapshot = holder.current  # pin one snapshot for the whole request
+            url = urlparse(self.path)
+            etag = f'"{snapshot.hash}-{zlib.crc32(self.path.encode("utf-8")):08x}"'
+            # A client revalidates with the tag of the variant it holds
+            held = {tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")}
+            for tag in (etag, gzip_etag(etag)):
+                if tag in held:
+                    self.send_response(304)
+                    self.send_header("ETag", tag)
+                    self.send_header("Vary", "Accept-Encoding")
+                    self.end_headers()
+                    return
+
+            params = dict(parse_qsl(url.query))
+            try:
+                if url.path == "/meta":
+                    body = json.dumps(snapshot.meta())
+                elif url.path in ("/cards", "/legs"):
+                    query = snapshot.query_cards if url.path == "/cards" else snapshot.query_legs
+                    total, fragments = query(params)
+                    body = (f'{{"snapshot":"{snapshot.hash}","total":{total},'
+                            f'"count":{len(fragments)},"items":[{",".join(fragments)}]}}')
+                else:
+                    self._send(404, json.dumps({"error": "not found"}))
+                    return
+            except ValueError as e:
+                self._send(400, json.dumps({"error": str(e)}))
+                return
+            self._send(200, body, etag)
+
+        def _send(self, status: int, body: str, etag: str = None):
+            data = body.encode("utf-8")
+            gzipped = len(data) >= GZIP_MIN_BYTES and "gzip" in self.headers.get("Accept-Encoding", "")
+            if gzipped:
+                import gzip
+
+                data = gzip.compress(data, compresslevel=5)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.send_header("Cache-Control", "no-cache")  # always revalidate via ETag
+            self.send_header("Vary", "Accept-Encoding")
+            if etag:
+                self.send_header("ETag", gzip_etag(etag) if gzipped else etag)
+            if gzipped:
+                self.send_header("Content-Encoding", "gzip")
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):  # keep the console quiet
+            pass
+
+    return SlateHandler
+
+
+def main(host: str = "127.0.0.1", port: int = DEFAULT_PORT, poll_seconds: float = DEFAULT_POLL_SECONDS):
+    from http.server import ThreadingHTTPServer
+
+    started = time.perf_counter()
+    holder = SnapshotHolder(poll_seconds)
+    snapshot = holder.current
+    print(f"Loaded snapshot {snapshot.hash}: {snapshot.cards.size} cards, {snapshot.legs.size} legs "
+          f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+    holder.start()
+    server = ThreadingHTTPServer((host, port), make_handler(holder))
+    print(f"Serving http://{host}:{port}/cards, /legs, /meta (reload poll {poll_seconds:g}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        holder.stop()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Read-only indexed query API over the current cards and legs.")
+    parser.add_argument("--host", default="127.0.0.1", help="Bind address (default: 127.0.0.1).")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"Port (default: {DEFAULT_PORT}).")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help=f"Seconds between CSV change checks (default: {DEFAULT_POLL_SECONDS:g}).")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, host=args.host, port=args.port, poll_seconds=args.poll)
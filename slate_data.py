@@ -0,0 +1,199 @@
+# slate_data.py – typed loaders for the optimizer card / leg CSVs
+#
+# The push scripts pass CSV values through to Sheets as strings. Tools that
+# compute on the slate (dashboard export, calculators, alerts) need the same
+# rows with numbers already parsed, so that parsing lives here once.
+
+import csv
+import io
+import os
+
+PRIZEPICKS_CARDS_CSV = "prizepicks-cards.csv"
+UNDERDOG_CARDS_CSV = "underdog-cards.csv"
+PRIZEPICKS_LEGS_CSV = "prizepicks-legs.csv"
+UNDERDOG_LEGS_CSV = "underdog-legs.csv"
+
+# (path, default site) for every cards CSV the optimizers write
+CARD_SOURCES = [
+    (PRIZEPICKS_CARDS_CSV, "PP"),
+    (UNDERDOG_CARDS_CSV, "UD"),
+]
+
+LEG_SOURCES = [
+    (PRIZEPICKS_LEGS_CSV, "PP"),
+    (UNDERDOG_LEGS_CSV, "UD"),
+]
+
+LEG_ID_KEYS = [f"leg{i}Id" for i in range(1, 7)]
+
+CARD_FLOAT_FIELDS = [
+    "cardEv",
+    "winProbCash",
+    "winProbAny",
+    "avgProb",
+    "avgEdgePct",
+    "kellyMeanReturn",
+    "kellyVariance",
+    "kellyRawFraction",
+    "kellyCappedFraction",
+    "kellyFinalFraction",
+    "kellyStake",
+    "kellyExpectedProfit",
+    "kellyMaxWin",
+    "kellyFrac",
+    "efficiencyScore",
+]
+
+LEG_FLOAT_FIELDS = [
+    "line",
+    "overOdds",
+    "underOdds",
+    "trueProb",
+    "edge",
+    "legEv",
+]
+
+BOOL_FIELDS = ["selected", "kellyIsCapped", "IsWithin24h", "IsNonStandardOdds"]
+
+
+def to_float(value, default: float = 0.0) -> float:
+    """Parse a CSV cell as float; blanks and junk become default."""
+    if value is None or value == "":
+        return default
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return default
+
+
+def to_bool(value) -> bool:
+    return str(value).strip().lower() in ("true", "1", "yes")
+
+
+def card_leg_ids(card):
+    """Non-empty leg IDs of a card row, in leg order."""
+    return [card[k] for k in LEG_ID_KEYS if card.get(k)]
+
+
+def _read_rows(path: str, data: bytes = None):
+    """DictReader rows of path, or of data (the file's bytes, already read) when given."""
+    if data is not None:
+        f = io.StringIO(data.decode("utf-8"), newline="")
+        return [row for row in csv.DictReader(f, restval="") if any(row.values())]
+    if not os.path.exists(path):
+        return []
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row for row in csv.DictReader(f, restval="") if any(row.values())]
+
+
+def read_table(path: str):
+    """
+    Raw (header, rows) of a CSV: rows are lists of strings in header order.
+
+    Unlike csv.DictReader this keeps repeated column names, so a rewrite can
+    reproduce the header exactly whatever the optimizer wrote.
+    """
+    if not os.path.exists(path):
+        return [], []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = [row + [""] * (len(header) - len(row)) for row in reader if any(row)]
+    return header, rows
+
+
+def row_dicts(header, rows):
+    """Dict view of read_table rows (a repeated column reads as its last cell)."""
+    return [dict(zip(header, row)) for row in rows]
+
+
+def merge_row_dicts(header, rows, dicts):
+    """
+    Fold edited row_dicts back into the list rows.
+
+    Columns whose name appears once take the dict value, repeated columns keep
+    their original cells, and dict keys missing from the header become new
+    trailing columns.
+
+    Returns:
+        (header, rows)
+    """
+    seen = {}
+    for name in header:
+        seen[name] = seen.get(name, 0) + 1
+    extra = []
+    for d in dicts:
+        extra.extend(k for k in d if k not in seen and k not in extra)
+    merged_header = list(header) + extra
+    single = [(i, name) for i, name in enumerate(merged_header) if seen.get(name, 0) <= 1]
+
+    merged = []
+    for row, d in zip(rows, dicts):
+        out = list(row) + [""] * len(extra)
+        for i, name in single:
+            out[i] = d.get(name, out[i])
+        merged.append(out)
+    return merged_header, merged
+
+
+def write_table(path: str, header, rows):
+    """Rewrite a CSV atomically (tmp + os.replace) so readers never see a half-written file."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+    os.replace(tmp_path, path)
+
+
+def load_cards(path: str, default_site: str, data: bytes = None):
+    """
+    Load a cards CSV with numeric and boolean fields parsed.
+
+    Blank Sport / site are filled so downstream grouping never sees "".
+    data: the file's bytes when the caller already read them (e.g. to hash).
+    """
+    cards = []
+    for row in _read_rows(path, data):
+        for field in CARD_FLOAT_FIELDS:
+            if field in row:
+                row[field] = to_float(row[field])
+        for field in BOOL_FIELDS:
+            if field in row:
+                row[field] = to_bool(row[field])
+        row["Sport"] = row.get("Sport") or "UNK"
+        row["site"] = row.get("site") or default_site
+        cards.append(row)
+    return cards
+
+
+def load_all_cards(sources=None):
+    """Load every cards CSV in sources (default CARD_SOURCES), PP first."""
+    cards = []
+    for path, site in sources or CARD_SOURCES:
+        cards.extend(load_cards(path, site))
+    return cards
+
+
+def load_legs(path: str, default_site: str, data: bytes = None):
+    """Load a legs CSV with numeric and boolean fields parsed (data: as for load_cards)."""
+    legs = []
+    for row in _read_rows(path, data):
+        for field in LEG_FLOAT_FIELDS:
+            if field in row:
+                row[field] = to_float(row[field])
+        for field in BOOL_FIELDS:
+            if field in row:
+                row[field] = to_bool(row[field])
+        row["Sport"] = row.get("Sport") or "UNK"
+        row["site"] = default_site
+        legs.append(row)
+    return legs
+
+
+def load_all_legs(sources=None):
+    """Load every legs CSV in sources (default LEG_SOURCES), PP first."""
+    legs = []
+    for path, site in sources or LEG_SOURCES:
+        legs.extend(load_legs(path, site))
+    return legs
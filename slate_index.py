@@ -0,0 +1,133 @@
+# slate_index.py – warm in-memory index of the current cards and legs
+#
+# Long-running consumers (the Telegram bot, local services) keep one SlateIndex
+# alive and call refresh() before answering. Files are only re-read when their
+# mtime moves *and* their content hash changes, so the optimizer touching a file
+# without changing it costs one stat + one hash, never a re-parse.
+
+import os
+from bisect import bisect_right
+
+from slate_data import CARD_SOURCES, LEG_SOURCES, card_leg_ids, load_cards, load_legs
+
+
+def file_digest(path: str) -> str:
+    import hashlib  # only paid when a file actually changed
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class SlateIndex:
+    """
+    Cards and legs with lookup indexes:
+
+      cards_by_sport   Sport -> card positions, highest kellyStake first
+      legs_by_id       leg id -> leg row
+      cards_by_leg     leg id -> card positions
+      legs_by_player   lower-cased player -> leg ids
+    """
+
+    def __init__(self, card_sources=None, leg_sources=None):
+        self.card_sources = card_sources or CARD_SOURCES
+        self.leg_sources = leg_sources or LEG_SOURCES
+        self._fingerprints = {}
+        self.cards = []
+        self.legs_by_id = {}
+        self.cards_by_sport = {}
+        self.cards_by_leg = {}
+        self.legs_by_player = {}
+        self._by_stake = []
+        self._stakes_sorted = []
+        self.version = 0
+        self.refresh()
+
+    def _changed(self, path: str) -> bool:
+        """Update the (mtime, size, hash) fingerprint; True if content changed."""
+        if not os.path.exists(path):
+            return self._fingerprints.pop(path, None) is not None
+        st = os.stat(path)
+        old = self._fingerprints.get(path)
+        if old and old[0] == st.st_mtime_ns and old[1] == st.st_size:
+            return False
+        digest = file_digest(path)
+        self._fingerprints[path] = (st.st_mtime_ns, st.st_size, digest)
+        return old is None or old[2] != digest
+
+    def refresh(self) -> bool:
+        """Rebuild indexes if any source file changed. Returns True on rebuild."""
+        paths = [p for p, _ in self.card_sources] + [p for p, _ in self.leg_sources]
+        changed = [self._changed(p) for p in paths]  # no short-circuit: update every fingerprint
+        if self.version and not any(changed):
+            return False
+
+        cards = []
+        for path, site in self.card_sources:
+            cards.extend(load_cards(path, site))
+        legs = []
+        for path, site in self.leg_sources:
+            legs.extend(load_legs(path, site))
+        self._build(cards, legs)
+        self.version += 1
+        return True
+
+    def _build(self, cards, legs):
+        legs_by_id = {}
+        legs_by_player = {}
+        for leg in legs:
+            legs_by_id.setdefault(leg["id"], leg)
+            player = leg.get("player", "").strip().lower()
+            if player:
+                legs_by_player.setdefault(player, []).append(leg["id"])
+
+        order = sorted(range(len(cards)), key=lambda i: cards[i].get("kellyStake", 0.0), reverse=True)
+        cards_by_sport = {}
+        cards_by_leg = {}
+        for i in order:
+            card = cards[i]
+            cards_by_sport.setdefault(card["Sport"], []).append(i)
+            for leg_id in card_leg_ids(card):
+                cards_by_leg.setdefault(leg_id, []).append(i)
+
+        self.cards = cards
+        self.legs_by_id = legs_by_id
+        self.legs_by_player = legs_by_player
+        self.cards_by_sport = cards_by_sport
+        self.cards_by_leg = cards_by_leg
+        self._by_stake = order
+        self._stakes_sorted = sorted(c.get("kellyStake", 0.0) for c in cards)
+
+    def top(self, sport: str = None, n: int = 5):
+        """Highest-kellyStake cards, optionally for one Sport."""
+        positions = self._by_stake if not sport else self.cards_by_sport.get(sport.upper(), [])
+        return [self.cards[i] for i in positions[:n]]
+
+    def cards_with_leg(self, leg_id: str):
+        return [self.cards[i] for i in self.cards_by_leg.get(leg_id, [])]
+
+    def player_leg_ids(self, player: str):
+        """Leg ids for a player: exact (case-insensitive) match, else substring."""
+        key = player.strip().lower()
+        if key in self.legs_by_player:
+            return list(self.legs_by_player[key])
+        return [
+            leg_id
+            for name, leg_ids in self.legs_by_player.items()
+            if key in name
+            for leg_id in leg_ids
+        ]
+
+    def player_exposure(self, player: str):
+        """(cards, total kellyStake) across cards holding any of the player's legs."""
+        positions = set()
+        for leg_id in self.player_leg_ids(player):
+            positions.update(self.cards_by_leg.get(leg_id, []))
+        cards = [self.cards[i] for i in positions]
+        return cards, sum(c.get("kellyStake", 0.0) for c in cards)
+
+    def count_above(self, stake: float) -> int:
+        """Number of cards with kellyStake strictly above stake."""
+        return len(self._stakes_sorted) - bisect_right(self._stakes_sorted, stake)
@@ -0,0 +1,325 @@
+# slate_montecarlo.py – Monte Carlo of the selected slate with same-game correlation
+#
+# cardEv / kellyExpectedProfit describe each card on its own; nothing shows how
+# everything we actually selected behaves together. This samples leg outcomes
+# from trueProb with a one-factor-per-game / one-factor-per-team Gaussian copula
+# (legs in the same game, or on the same Sport + team, move together), settles
+# every selected card against the PP / UD payout tables in one vectorized pass
+# and reports the bankroll distribution, drawdown and ruin probability.
+#
+#   z_leg = √ρg · G_game + √ρt · T_team + √(1 − ρg − ρt) · ε      hit ⇔ z_leg < Φ⁻¹(trueProb)
+#
+# Each leg keeps its own marginal trueProb; ρ only sets how outcomes co-move.
+# A leg's game is its team-vs-opponent pair, looked up by leg ID (= prop ID) in
+# props-with-ev.json (props_table.game_keys_by_id), since the legs CSVs carry no
+# opponent. Legs without one fall back to Sport + gameTime + team, so two games
+# tipping off at the same time never share a factor.
+#
+# A path is --slates-per-path consecutive slates restaked proportionally to the
+# current bankroll (stakes are Kelly fractions). Paths are split into fixed-size
+# chunks, each with its own SeedSequence child, and run on a process pool, so
+# results depend on --seed only, never on --workers.
+#
+# Inside a chunk, slates are settled in batches sized from the slate's shape
+# (games, teams, legs, cards) so one batch's arrays stay within
+# --batch-memory-mb per worker: a few thousand cards no longer means a
+# multi-hundred-MB n × K × 6 gather in every process.
+#
+# Run:  python slate_montecarlo.py [--slates 1000000] [--slates-per-path 20] [--workers N] [--seed 7]
+#                                  [--batch-memory-mb 64]
+
+import argparse
+import math
+import os
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from kelly_portfolio import load_bankroll
+from leg_calculator import PAYOUTS
+from profiling import add_profile_arguments, run_profiled
+from props_table import PROPS_WITH_EV_JSON, game_key, game_keys_by_id, known_team, load_props_table
+from slate_data import card_leg_ids, load_all_cards, load_all_legs
+
+DEFAULT_SLATES = 1_000_000
+DEFAULT_SLATES_PER_PATH = 20
+
+# Share of a leg's latent variance explained by its game / its team
+DEFAULT_RHO_GAME = 0.10
+DEFAULT_RHO_TEAM = 0.20
+
+# A path is ruined once the bankroll falls below this fraction of the start
+DEFAULT_RUIN_FRACTION = 0.5
+
+DEFAULT_SEED = 20260214
+
+# Paths per pool task (fixed so results do not depend on worker count)
+CHUNK_PATHS = 2000
+
+# Memory for one vectorized batch of slates, per worker; batch size is derived
+# from it and the slate's shape (batch_slates), clamped to these bounds
+DEFAULT_BATCH_MEMORY_MB = 64
+MIN_BATCH_SLATES = 64
+MAX_BATCH_SLATES = 8192
+
+MAX_PICKS = 6
+PROB_EPS = 1e-6
+
+
+def build_model(cards, legs, bankroll: float, rho_game: float, rho_team: float, game_keys=None):
+    """
+    Arrays describing the slate (game_keys: leg ID -> team-vs-opponent key):
+
+      thresholds  (L,)   Φ⁻¹(trueProb) per leg
+      game_idx    (L,)   game factor column (n_games = no game)
+      team_idx    (L,)   team factor column (n_teams = no team)
+      a_game, a_team, a_eps  (L,) factor loadings
+      leg_idx     (K, 6) leg column per pick (L = empty pick, never hits)
+      pay_table   (K, 7) payout multiplier by number of hits
+      stake_frac  (K,)   kellyStake / bankroll
+    """
+    if rho_game < 0 or rho_team < 0 or rho_game + rho_team >= 1:
+        raise ValueError("need rho_game, rho_team >= 0 and rho_game + rho_team < 1")
+
+    legs_by_id = {}
+    for leg in legs:
+        legs_by_id.setdefault(leg["id"], leg)
+
+    leg_pos = {}
+    leg_rows = []
+    card_rows = []
+    skipped = 0
+    for card in cards:
+        ids = card_leg_ids(card)
+        table = PAYOUTS.get(card.get("site"), {}).get(card.get("flexType"))
+        if not ids or table is None or any(i not in legs_by_id for i in ids):
+            skipped += 1
+            continue
+        cols = []
+        for leg_id in ids[:MAX_PICKS]:
+            if leg_id not in leg_pos:
+                leg_pos[leg_id] = len(leg_rows)
+                leg_rows.append(legs_by_id[leg_id])
+            cols.append(leg_pos[leg_id])
+        card_rows.append((cols, table, card.get("kellyStake", 0.0)))
+
+    n_legs = len(leg_rows)
+    games, teams = {}, {}
+    game_idx = np.empty(n_legs, dtype=np.int64)
+    team_idx = np.empty(n_legs, dtype=np.int64)
+    thresholds = np.empty(n_legs)
+    normal = NormalDist()
+    for i, leg in enumerate(leg_rows):
+        p = min(max(leg.get("trueProb", 0.0), PROB_EPS), 1 - PROB_EPS)
+        thresholds[i] = normal.inv_cdf(p)
+        team = (leg.get("team") or "").strip()
+        team_known = known_team(team)
+        game = leg_game_key(leg, game_keys, team if team_known else "")
+        game_idx[i] = games.setdefault((leg["Sport"], game), len(games)) if game else -1
+        team_idx[i] = teams.setdefault((leg["Sport"], team), len(teams)) if team_known else -1
+
+    has_game = game_idx >= 0
+    has_team = team_idx >= 0
+    a_game = np.where(has_game, math.sqrt(rho_game), 0.0)
+    a_team = np.where(has_team, math.sqrt(rho_team), 0.0)
+    a_eps = np.sqrt(1 - a_game**2 - a_team**2)
+
+    n_cards = len(card_rows)
+    leg_idx = np.full((n_cards, MAX_PICKS), n_legs, dtype=np.int64)
+    pay_table = np.zeros((n_cards, MAX_PICKS + 1))
+    stake_frac = np.empty(n_cards)
+    for k, (cols, table, stake) in enumerate(card_rows):
+        leg_idx[k, :len(cols)] = cols
+        for hits, multiplier in table.items():
+            pay_table[k, hits] = multiplier
+        stake_frac[k] = stake / bankroll
+
+    return {
+        "thresholds": thresholds,
+        "game_idx": np.where(has_game, game_idx, len(games)),
+        "team_idx": np.where(has_team, team_idx, len(teams)),
+        "n_games": len(games),
+        "n_teams": len(teams),
+        "a_game": a_game,
+        "a_team": a_team,
+        "a_eps": a_eps,
+        "leg_idx": leg_idx,
+        "pay_table": pay_table,
+        "stake_frac": stake_frac,
+        "skipped": skipped,
+    }
+
+
+def leg_game_key(leg, game_keys, team: str):
+    """
+    Game a leg belongs to: its team-vs-opponent pair when known, else its team
+    at its gameTime (never gameTime alone, which merges simultaneous games).
+    """
+    opponent = (leg.get("opponent") or "").strip()
+    if known_team(team) and known_team(opponent):
+        return game_key(team, opponent)
+    key = game_keys.get(leg["id"]) if game_keys else None
+    if key and all(known_team(side) for side in key.split("_vs_")):
+        return key
+    game_time = leg.get("gameTime") or ""
+    return f"{game_time}@{team}" if game_time and team else ""
+
+
+def batch_slates(model, memory_mb: float = DEFAULT_BATCH_MEMORY_MB) -> int:
+    """
+    Slates per vectorized batch so one batch's arrays fit in memory_mb.
+
+    Per slate: float64 game / team factors, ~4 float64 (L,) temporaries for
+    the latent z, the int8 hits, and per card the int8 (6,) gather plus int8
+    hit count and float64 multiplier.
+    """
+    n_legs = len(model["thresholds"])
+    n_cards = len(model["stake_frac"])
+    per_slate = 8 * (model["n_games"] + model["n_teams"] + 2) + 33 * (n_legs + 1) + (MAX_PICKS + 1 + 8) * n_cards
+    return int(min(MAX_BATCH_SLATES, max(MIN_BATCH_SLATES, memory_mb * 2**20 // per_slate)))
+
+
+def simulate_returns(rng, model, n: int):
+    """Slate return (P&L / bankroll) for n independent slates."""
+    thresholds = model["thresholds"]
+    n_legs = len(thresholds)
+    # One extra zero column so "no game" / "no team" legs index a constant factor.
+    game = np.zeros((n, model["n_games"] + 1))
+    game[:, :-1] = rng.standard_normal((n, model["n_games"]))
+    team = np.zeros((n, model["n_teams"] + 1))
+    team[:, :-1] = rng.standard_normal((n, model["n_teams"]))
+
+    z = rng.standard_normal((n, n_legs)) * model["a_eps"]
+    z += game[:, model["game_idx"]] * model["a_game"]
+    z += team[:, model["team_idx"]] * model["a_team"]
+
+    hits = np.zeros((n, n_legs + 1), dtype=np.int8)  # last column: empty pick
+    hits[:, :n_legs] = z < thresholds
+
+    card_hits = hits[:, model["leg_idx"]].sum(axis=2, dtype=np.int8)     # (n, K)
+    multiplier = model["pay_table"][np.arange(card_hits.shape[1]), card_hits]  # (n, K)
+    return (multiplier - 1) @ model["stake_frac"]
+
+
+def path_stats(returns, slates_per_path: int, ruin_fraction: float):
+    """Final wealth, max drawdown and ruin flag per path (wealth starts at 1)."""
+    growth = np.maximum(1 + returns.reshape(-1, slates_per_path), 0.0)
+    wealth = np.cumprod(growth, axis=1)
+    peak = np.maximum.accumulate(np.maximum(wealth, 1.0), axis=1)
+    drawdown = 1 - wealth / peak
+    return wealth[:, -1], drawdown.max(axis=1), wealth.min(axis=1) < ruin_fraction
+
+
+def run_chunk(seed_seq, model, n_paths: int, slates_per_path: int, ruin_fraction: float, batch: int):
+    """One pool task: n_paths paths from its own SeedSequence child, batch slates at a time."""
+    rng = np.random.default_rng(seed_seq)
+    total = n_paths * slates_per_path
+    returns = np.empty(total)
+    for start in range(0, total, batch):
+        stop = min(start + batch, total)
+        returns[start:stop] = simulate_returns(rng, model, stop - start)
+    final, max_dd, ruined = path_stats(returns, slates_per_path, ruin_fraction)
+    return returns.astype(np.float32), final, max_dd, ruined
+
+
+def simulate(model, n_paths: int, slates_per_path: int, ruin_fraction: float, seed: int, workers: int,
+             batch: int = MAX_BATCH_SLATES):
+    """Run every chunk (on a process pool when workers > 1) and concatenate in chunk order."""
+    sizes = [CHUNK_PATHS] * (n_paths // CHUNK_PATHS)
+    if n_paths % CHUNK_PATHS:
+        sizes.append(n_paths % CHUNK_PATHS)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    args = [(s, model, size, slates_per_path, ruin_fraction, batch) for s, size in zip(seeds, sizes)]
+
+    if workers <= 1 or len(args) == 1:
+        results = [run_chunk(*a) for a in args]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(run_chunk, *zip(*args)))
+
+    return tuple(np.concatenate(parts) for parts in zip(*results))
+
+
+def main(slates: int = DEFAULT_SLATES, slates_per_path: int = DEFAULT_SLATES_PER_PATH,
+         rho_game: float = DEFAULT_RHO_GAME, rho_team: float = DEFAULT_RHO_TEAM,
+         ruin_fraction: float = DEFAULT_RUIN_FRACTION, seed: int = DEFAULT_SEED,
+         workers: int = None, all_cards: bool = False, batch_memory_mb: float = DEFAULT_BATCH_MEMORY_MB):
+    bankroll = load_bankroll()
+    cards = load_all_cards()
+    if not all_cards:
+        cards = [c for c in cards if c.get("selected", True) is True and c.get("kellyStake", 0.0) > 0]
+    game_keys = None
+    if os.path.exists(PROPS_WITH_EV_JSON):
+        table, _ = load_props_table(PROPS_WITH_EV_JSON)
+        game_keys = game_keys_by_id(table)
+    model = build_model(cards, load_all_legs(), bankroll, rho_game, rho_team, game_keys)
+
+    n_cards = len(model["stake_frac"])
+    if not n_cards:
+        print("No stakeable cards with known legs to simulate.")
+        return
+    total_stake = model["stake_frac"].sum() * bankroll
+    print(f"Bankroll ${bankroll:,.2f}; {n_cards} cards (${total_stake:,.2f} staked), "
+          f"{len(model['thresholds'])} legs in {model['n_games']} games / {model['n_teams']} teams"
+          + (f"; {model['skipped']} cards skipped (unknown legs or slip)" if model["skipped"] else ""))
+
+    n_paths = max(1, slates // slates_per_path)
+    workers = workers or os.cpu_count() or 1
+    batch = batch_slates(model, batch_memory_mb)
+    started = time.perf_counter()
+    returns, final, max_dd, ruined = simulate(model, n_paths, slates_per_path, ruin_fraction, seed, workers, batch)
+    elapsed = time.perf_counter() - started
+    print(f"Simulated {len(returns):,} slates ({n_paths:,} paths × {slates_per_path}) "
+          f"on {workers} worker(s) in {elapsed:.1f}s, {batch:,} slates per batch "
+          f"(ρ game {rho_game}, ρ team {rho_team}, seed {seed})")
+
+    pnl = returns.astype(np.float64) * bankroll
+    p5, p50, p95 = np.percentile(pnl, [5, 50, 95])
+    print("\nSingle slate P&L")
+    print(f"  mean ${pnl.mean():,.2f}  std ${pnl.std():,.2f}  P(loss) {np.mean(pnl < 0):.1%}")
+    print(f"  5% ${p5:,.2f}   median ${p50:,.2f}   95% ${p95:,.2f}")
+
+    f5, f50, f95 = np.percentile(final * bankroll, [5, 50, 95])
+    d50, d95 = np.percentile(max_dd, [50, 95])
+    print(f"\nBankroll after {slates_per_path} slates (restaked proportionally)")
+    print(f"  5% ${f5:,.2f}   median ${f50:,.2f}   95% ${f95:,.2f}   P(below start) {np.mean(final < 1):.1%}")
+    print(f"  max drawdown: median {d50:.1%}, 95th pct {d95:.1%}")
+    print(f"  P(ruin: bankroll < {ruin_fraction:.0%} of start) {ruined.mean():.2%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Monte Carlo of the selected slate with same-game correlation.")
+    parser.add_argument("--slates", type=int, default=DEFAULT_SLATES,
+                        help=f"Total simulated slates (default: {DEFAULT_SLATES:,}).")
+    parser.add_argument("--slates-per-path", type=int, default=DEFAULT_SLATES_PER_PATH,
+                        help=f"Consecutive slates per bankroll path (default: {DEFAULT_SLATES_PER_PATH}).")
+    parser.add_argument("--rho-game", type=float, default=DEFAULT_RHO_GAME,
+                        help=f"Latent correlation share for legs in the same game (default: {DEFAULT_RHO_GAME}).")
+    parser.add_argument("--rho-team", type=float, default=DEFAULT_RHO_TEAM,
+                        help=f"Additional share for legs on the same team (default: {DEFAULT_RHO_TEAM}).")
+    parser.add_argument("--ruin-fraction", type=float, default=DEFAULT_RUIN_FRACTION,
+                        help=f"Ruin = bankroll below this fraction of start (default: {DEFAULT_RUIN_FRACTION}).")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help=f"Root seed (default: {DEFAULT_SEED}).")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: CPU count).")
+    parser.add_argument("--batch-memory-mb", type=float, default=DEFAULT_BATCH_MEMORY_MB,
+                        help=f"Memory per worker for one batch of slates (default: {DEFAULT_BATCH_MEMORY_MB}).")
+    parser.add_argument("--all-cards", action="store_true",
+                        help="Simulate every staked card, not only selected ones.")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(
+        args,
+        main,
+        slates=args.slates,
+        slates_per_path=args.slates_per_path,
+        rho_game=args.rho_game,
+        rho_team=args.rho_team,
+        ruin_fraction=args.ruin_fraction,
+        seed=args.seed,
+        workers=args.workers,
+        all_cards=args.all_cards,
+        batch_memory_mb=args.batch_memory_mb,
+    )
@@ -0,0 +1,507 @@
+# snapshot_generations.py – complete, pinned generations of the optimizer outputs
+#
+# The optimizer rewrites prizepicks-cards.csv, underdog-legs.csv, ... in place,
+# so a consumer reading them while the next sport's run is writing can see a
+# truncated file, and the pipeline has to stay strictly sequential. This keeps
+# immutable copies instead:
+#
+#   .cache/generations/
+#     CURRENT                     run id of the newest complete generation
+#     <run id>/manifest.json      run id, created, {file: {size, sha256}}
+#     <run id>/*.csv              the snapshot files
+#     <run id>/pins/*.pin         one per consumer currently reading it
+#
+# publish copies the outputs into a temp dir and checks the copies form one
+# complete snapshot before writing manifest.json last, renaming the dir into
+# place and only then moving CURRENT:
+#
+#   - every file keeps the same size and mtime from before the first copy to
+#     after the last one, and a file modified less than QUIET_SECONDS ago is
+#     waited out first (a writer still appending keeps moving its mtime)
+#   - every runTimestamp in a site's cards CSV also appears in its legs CSV,
+#     so a generation never pairs one run's cards with another run's legs;
+#     once the legs are stamped, unstamped cards rows are rejected as well
+#   - when the producer wrote snapshot-manifest.json, every copy matches it
+#
+# A directory without a manifest is never a generation.
+#
+# Only the readers are decoupled so far: kelly_portfolio.py still rescales
+# the live cards CSVs in place, so it has to finish before publish runs and
+# the producer and its consumers cannot yet run concurrently end to end.
+#
+# merge --sports NBA,NHL runs after an optimizer pass limited to those sports
+# (game_scheduler.py): the optimizer rewrites every output with only the sports
+# it ran, so this puts the other sports' rows back from CURRENT. Everything
+# downstream (Kelly caps, the next generation, unfiltered Sheets targets) then
+# sees the whole slate rather than the last fire's sports.
+#
+# Consumers wrap one push or alert cycle in pin(): the generation's files are
+# verified against its manifest and a pin file keeps prune() from deleting it
+# until the cycle ends. prune() keeps the newest N generations plus anything
+# pinned or CURRENT.
+#
+# Run:  python snapshot_generations.py publish [--run-id ID] [--keep 5]
+#       python snapshot_generations.py merge --sports NBA,NHL
+#       python snapshot_generations.py list | verify [RUN_ID] | prune [--keep 5]
+
+import argparse
+import json
+import os
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+
+from profiling import add_profile_arguments, run_profiled
+from slate_data import CARD_SOURCES, LEG_SOURCES, read_table, write_table
+from slate_index import file_digest
+
+GENERATIONS_DIR = os.path.join(".cache", "generations")
+CURRENT_FILE = "CURRENT"
+MANIFEST_FILE = "manifest.json"
+PINS_DIR = "pins"
+
+# Optional manifest written by whichever step last rewrites the CSVs, once they
+# are complete (a stale one makes publish wait until --timeout):
+# {"runId": "...", "files": {"prizepicks-cards.csv": {"size": 123, "sha256": "..."}}}
+PRODUCER_MANIFEST = "snapshot-manifest.json"
+
+SNAPSHOT_FILES = [path for path, _ in CARD_SOURCES + LEG_SOURCES]
+
+DEFAULT_KEEP = 5
+
+# Pins older than this belong to a consumer that died mid-cycle
+PIN_TTL_SECONDS = 6 * 3600
+
+DEFAULT_TIMEOUT_SECONDS = 120.0
+RETRY_SECONDS = 1.0
+
+# Files modified more recently than this may still be mid-write
+QUIET_SECONDS = 2.0
+
+# Column every optimizer row carries, identical within one run
+RUN_COLUMN = "runTimestamp"
+
+
+class IncompleteGeneration(Exception):
+    """The source files never formed a complete, consistent snapshot."""
+
+
+def new_run_id() -> str:
+    return time.strftime("%Y%m%dT%H%M%S") + f"-{uuid.uuid4().hex[:6]}"
+
+
+def _entry(path: str):
+    return {"size": os.path.getsize(path), "sha256": file_digest(path)}
+
+
+def _write_json(path: str, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _write_text(path: str, text: str):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(text + "\n")
+    os.replace(tmp_path, path)
+
+
+class Generation:
+    """One published snapshot directory and its manifest."""
+
+    def __init__(self, path: str, manifest):
+        self.dir = path
+        self.manifest = manifest
+        self.run_id = manifest["runId"]
+
+    @classmethod
+    def open(cls, path: str):
+        """The generation at path, or None if it has no (readable) manifest."""
+        try:
+            with open(os.path.join(path, MANIFEST_FILE), encoding="utf-8") as f:
+                return cls(path, json.load(f))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def path(self, name: str) -> str:
+        """This generation's copy of an output file (e.g. "prizepicks-cards.csv")."""
+        return os.path.join(self.dir, os.path.basename(name))
+
+    def sources(self, sources):
+        """[(path, site)] source lists (CARD_SOURCES, LEG_SOURCES) re-pointed at this generation."""
+        return [(self.path(path), site) for path, site in sources]
+
+    def verify(self, checksums: bool = True):
+        """Names of files whose size (and sha256) no longer match the manifest."""
+        bad = []
+        for name, expected in self.manifest["files"].items():
+            path = self.path(name)
+            if not os.path.exists(path) or os.path.getsize(path) != expected["size"]:
+                bad.append(name)
+            elif checksums and file_digest(path) != expected["sha256"]:
+                bad.append(name)
+        return bad
+
+
+def list_generations(root: str = GENERATIONS_DIR):
+    """Complete generations, oldest first."""
+    if not os.path.isdir(root):
+        return []
+    generations = []
+    for name in os.listdir(root):
+        if name.startswith("."):
+            continue  # in-progress temp dirs
+        gen = Generation.open(os.path.join(root, name))
+        if gen is not None:
+            generations.append(gen)
+    return sorted(generations, key=lambda g: (g.manifest.get("created", ""), g.run_id))
+
+
+def current_generation(root: str = GENERATIONS_DIR):
+    """Generation named by CURRENT, falling back to the newest complete one."""
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            gen = Generation.open(os.path.join(root, f.read().strip()))
+        if gen is not None:
+            return gen
+    except OSError:
+        pass
+    generations = list_generations(root)
+    return generations[-1] if generations else None
+
+
+def _producer_expectations(source_dir: str):
+    path = os.path.join(source_dir, PRODUCER_MANIFEST)
+    if not os.path.exists(path):
+        return None, None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest.get("runId"), manifest.get("files", {})
+
+
+def _stat_all(files, source_dir: str):
+    """name -> (size, mtime_ns) for the files that exist."""
+    stats = {}
+    for name in files:
+        try:
+            st = os.stat(os.path.join(source_dir, name))
+        except FileNotFoundError:
+            continue
+        stats[name] = (st.st_size, st.st_mtime_ns)
+    return stats
+
+
+def _run_stamps(path: str):
+    """
+    Distinct RUN_COLUMN values (first such column); rows without a stamp, or
+    every row when the column is missing, show up as "".
+    """
+    header, rows = read_table(path)
+    if RUN_COLUMN not in header:
+        return {""} if rows else set()
+    idx = header.index(RUN_COLUMN)
+    return {row[idx] if idx < len(row) else "" for row in rows}
+
+
+def _check_same_run(tmp_dir: str, names):
+    """
+    Raise IncompleteGeneration when a site's cards copy holds a run its legs
+    copy does not, or unstamped rows next to stamped legs (merged outputs
+    legitimately hold several runs, one per sport).
+    """
+    legs_by_site = {site: os.path.basename(path) for path, site in LEG_SOURCES}
+    for path, site in CARD_SOURCES:
+        cards, legs = os.path.basename(path), legs_by_site.get(site)
+        if cards not in names or legs not in names:
+            continue
+        cards_runs, legs_runs = _run_stamps(os.path.join(tmp_dir, cards)), _run_stamps(os.path.join(tmp_dir, legs))
+        stamped = sorted(legs_runs - {""})
+        if not stamped:
+            continue  # legs from a producer that does not stamp runs: nothing to compare
+        if "" in cards_runs:
+            raise IncompleteGeneration(f"{cards} has rows without {RUN_COLUMN} but {legs} is from run {', '.join(stamped)}")
+        orphans = sorted(cards_runs - legs_runs)
+        if orphans:
+            raise IncompleteGeneration(f"{cards} has rows from run {', '.join(orphans)} missing from {legs}")
+
+
+def _copy_snapshot(files, source_dir: str, tmp_dir: str):
+    """
+    Copy files into tmp_dir and return their manifest entries.
+
+    Raises IncompleteGeneration when any file changed during the copy pass,
+    the copies mix runs, or they do not match the producer manifest.
+    """
+    _, expected = _producer_expectations(source_dir)
+    before = _stat_all(files, source_dir)
+    for name in expected or {}:
+        if name in files and name not in before:
+            raise IncompleteGeneration(f"{name} is listed in {PRODUCER_MANIFEST} but missing")
+    if not before:
+        raise IncompleteGeneration("no snapshot files found")
+
+    # Wait out a recent write; a writer still busy moves the mtime and fails the check below
+    quiet = QUIET_SECONDS - (time.time() - max(mtime for _, mtime in before.values()) / 1e9)
+    if quiet > 0:
+        time.sleep(quiet)
+
+    for name in before:
+        shutil.copyfile(os.path.join(source_dir, name), os.path.join(tmp_dir, os.path.basename(name)))
+
+    after = _stat_all(files, source_dir)
+    changed = sorted(name for name in set(before) | set(after) if before.get(name) != after.get(name))
+    if changed:
+        raise IncompleteGeneration(f"{', '.join(changed)} changed during the copy")
+
+    entries = {}
+    for name, (size, _) in before.items():
+        entry = _entry(os.path.join(tmp_dir, os.path.basename(name)))
+        if entry["size"] != size:
+            raise IncompleteGeneration(f"{name}: copied {entry['size']} of {size} bytes")
+        if expected and name in expected and (
+            expected[name].get("size") != entry["size"] or expected[name].get("sha256") != entry["sha256"]
+        ):
+            raise IncompleteGeneration(f"{name} does not match {PRODUCER_MANIFEST} yet")
+        entries[os.path.basename(name)] = entry
+    _check_same_run(tmp_dir, entries)
+    return entries
+
+
+def publish(run_id: str = None, keep: int = DEFAULT_KEEP, root: str = GENERATIONS_DIR,
+            source_dir: str = ".", files=None, timeout: float = DEFAULT_TIMEOUT_SECONDS):
+    """
+    Copy the current outputs into a new complete generation and make it CURRENT.
+
+    Retries until the files form a consistent snapshot or timeout seconds pass.
+    """
+    files = files or SNAPSHOT_FILES
+    producer_run_id, _ = _producer_expectations(source_dir)
+    run_id = run_id or producer_run_id or new_run_id()
+    final_dir = os.path.join(root, run_id)
+    if os.path.exists(final_dir):
+        raise FileExistsError(f"generation {run_id} already exists")
+
+    tmp_dir = os.path.join(root, f".tmp-{run_id}")
+    deadline = time.monotonic() + timeout
+    while True:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        try:
+            entries = _copy_snapshot(files, source_dir, tmp_dir)
+            break
+        except IncompleteGeneration as e:
+            if time.monotonic() >= deadline:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+                raise
+            print(f"Waiting for a complete snapshot: {e}")
+            time.sleep(RETRY_SECONDS)
+
+    _write_json(os.path.join(tmp_dir, MANIFEST_FILE), {
+        "runId": run_id,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "files": entries,
+    })
+    os.replace(tmp_dir, final_dir)
+    _write_text(os.path.join(root, CURRENT_FILE), run_id)
+    prune(keep, root)
+    return Generation.open(final_dir)
+
+
+def _realign(row, old_header, header):
+    """A row of old_header re-ordered into header (by name; the n-th repeat maps to the n-th)."""
+    if old_header == header:
+        return row
+    positions = {}
+    for i, name in enumerate(old_header):
+        positions.setdefault(name, []).append(i)
+    out = []
+    seen = {}
+    for name in header:
+        n = seen[name] = seen.get(name, -1) + 1
+        idx = positions.get(name, [])
+        out.append(row[idx[n]] if n < len(idx) else "")
+    return out
+
+
+def merge_sports(sports, root: str = GENERATIONS_DIR, source_dir: str = ".", files=None):
+    """
+    Rewrite the live outputs so rows of sports other than `sports` come from CURRENT.
+
+    Rows of `sports` (and rows without a Sport) are kept from the live file,
+    first; every other sport's rows are carried over from the CURRENT
+    generation's copy. Files without a Sport column are left alone.
+
+    Returns:
+        {file: (rows kept, rows carried over)}; empty when nothing is published yet
+    """
+    base = current_generation(root)
+    if base is None:
+        return {}
+    wanted = {s.strip().upper() for s in sports if s.strip()}
+    counts = {}
+    for name in files or SNAPSHOT_FILES:
+        live = os.path.join(source_dir, name)
+        header, rows = read_table(live)
+        old_header, old_rows = read_table(base.path(name))
+        header = header or old_header
+        if "Sport" not in header or "Sport" not in old_header:
+            continue
+        sport, old_sport = header.index("Sport"), old_header.index("Sport")
+        kept = [row for row in rows if not row[sport] or row[sport].upper() in wanted]
+        carried = [
+            _realign(row, old_header, header)
+            for row in old_rows
+            if row[old_sport] and row[old_sport].upper() not in wanted
+        ]
+        write_table(live, header, kept + carried)
+        counts[name] = (len(kept), len(carried))
+    _restamp_producer_manifest(source_dir, counts)
+    return counts
+
+
+def _restamp_producer_manifest(source_dir: str, names):
+    """Point the producer manifest at the merged files so publish still accepts them."""
+    path = os.path.join(source_dir, PRODUCER_MANIFEST)
+    if not names or not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    files = manifest.setdefault("files", {})
+    for name in names:
+        if name in files:
+            files[name] = _entry(os.path.join(source_dir, name))
+    _write_json(path, manifest)
+
+
+def _live_pins(gen: Generation, now: float):
+    pins_dir = os.path.join(gen.dir, PINS_DIR)
+    if not os.path.isdir(pins_dir):
+        return []
+    live = []
+    for name in os.listdir(pins_dir):
+        try:
+            if now - os.path.getmtime(os.path.join(pins_dir, name)) < PIN_TTL_SECONDS:
+                live.append(name)
+        except OSError:
+            pass  # unpinned meanwhile
+    return live
+
+
+def prune(keep: int = DEFAULT_KEEP, root: str = GENERATIONS_DIR):
+    """Delete generations beyond the newest keep, sparing CURRENT and pinned ones."""
+    generations = list_generations(root)
+    current = current_generation(root)
+    now = time.time()
+    removed = []
+    for gen in generations[:max(0, len(generations) - keep)]:
+        if current is not None and gen.run_id == current.run_id:
+            continue
+        if _live_pins(gen, now):
+            continue
+        shutil.rmtree(gen.dir, ignore_errors=True)
+        removed.append(gen.run_id)
+    # Temp dirs left by a publish that crashed
+    for name in os.listdir(root) if os.path.isdir(root) else []:
+        path = os.path.join(root, name)
+        if name.startswith(".tmp-") and now - os.path.getmtime(path) > PIN_TTL_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+@contextmanager
+def pin(run_id: str = None, root: str = GENERATIONS_DIR, checksums: bool = True):
+    """
+    Pin one generation (CURRENT by default) for the duration of a cycle.
+
+    Yields the Generation; raises IncompleteGeneration if there is none or its
+    files do not match the manifest.
+    """
+    gen = Generation.open(os.path.join(root, run_id)) if run_id else current_generation(root)
+    if gen is None:
+        raise IncompleteGeneration(f"no complete generation {run_id or 'published'} under {root}")
+    pins_dir = os.path.join(gen.dir, PINS_DIR)
+    os.makedirs(pins_dir, exist_ok=True)
+    pin_path = os.path.join(pins_dir, f"{os.getpid()}-{uuid.uuid4().hex[:8]}.pin")
+    with open(pin_path, "w", encoding="utf-8") as f:
+        f.write(time.strftime("%Y-%m-%dT%H:%M:%S\n"))
+    try:
+        bad = gen.verify(checksums=checksums)
+        if bad:
+            raise IncompleteGeneration(f"generation {gen.run_id} does not match its manifest: {', '.join(bad)}")
+        yield gen
+    finally:
+        try:
+            os.remove(pin_path)
+        except OSError:
+            pass
+
+
+def main(command: str = "list", run_id: str = None, keep: int = DEFAULT_KEEP,
+         timeout: float = DEFAULT_TIMEOUT_SECONDS, root: str = GENERATIONS_DIR, sports=None):
+    if command == "publish":
+        started = time.perf_counter()
+        try:
+            gen = publish(run_id, keep=keep, root=root, timeout=timeout)
+        except IncompleteGeneration as e:
+            raise SystemExit(f"No complete snapshot within {timeout:g}s: {e}")
+        except FileExistsError as e:
+            raise SystemExit(f"Not publishing: {e} (pass a new --run-id, or the producer has not finished a new run)")
+        total = sum(e["size"] for e in gen.manifest["files"].values())
+        print(f"Published generation {gen.run_id}: {len(gen.manifest['files'])} files, "
+              f"{total / 1024:,.0f} KiB in {(time.perf_counter() - started) * 1000:.0f} ms")
+    elif command == "merge":
+        if not sports:
+            raise SystemExit("merge needs --sports (the sports the optimizer just ran)")
+        counts = merge_sports(sports.split(","), root=root)
+        if not counts:
+            print("No generation published yet; outputs left as written")
+        for name, (kept, carried) in counts.items():
+            print(f"{name}: {kept} rows from this run, {carried} carried over from CURRENT")
+    elif command == "list":
+        current = current_generation(root)
+        now = time.time()
+        for gen in list_generations(root):
+            marker = "*" if current is not None and gen.run_id == current.run_id else " "
+            pins = len(_live_pins(gen, now))
+            print(f"{marker} {gen.run_id}  {gen.manifest.get('created', '?')}  "
+                  f"{len(gen.manifest['files'])} files" + (f"  {pins} pin(s)" if pins else ""))
+    elif command == "verify":
+        gen = Generation.open(os.path.join(root, run_id)) if run_id else current_generation(root)
+        if gen is None:
+            raise SystemExit(f"No generation {run_id or 'published'} under {root}")
+        bad = gen.verify()
+        print(f"{gen.run_id}: " + (f"MISMATCH {', '.join(bad)}" if bad else "ok"))
+        if bad:
+            raise SystemExit(1)
+    elif command == "prune":
+        removed = prune(keep, root)
+        print(f"Removed {len(removed)} generation(s)" + (f": {', '.join(removed)}" if removed else ""))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Publish, pin and prune complete snapshots of the optimizer outputs.")
+    parser.add_argument("command", nargs="?", default="list", choices=["publish", "merge", "list", "verify", "prune"])
+    parser.add_argument("run_id", nargs="?", help="Generation to verify (default: CURRENT).")
+    parser.add_argument("--run-id", dest="publish_run_id",
+                        help=f"Run id for publish (default: {PRODUCER_MANIFEST} runId, else a timestamp).")
+    parser.add_argument("--keep", type=int, default=DEFAULT_KEEP,
+                        help=f"Generations kept besides pinned / CURRENT (default: {DEFAULT_KEEP}).")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT_SECONDS,
+                        help=f"Seconds publish waits for a complete snapshot (default: {DEFAULT_TIMEOUT_SECONDS:g}).")
+    parser.add_argument("--sports", help="merge: comma-separated sports the optimizer just ran (e.g. NBA,NHL).")
+    parser.add_argument("--root", default=GENERATIONS_DIR, help=f"Generations directory (default: {GENERATIONS_DIR}).")
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(
+        args,
+        main,
+        command=args.command,
+        run_id=args.publish_run_id or args.run_id,
+        keep=args.keep,
+        timeout=args.timeout,
+        root=args.root,
+        sports=args.sports,
+    )
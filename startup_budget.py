@@ -0,0 +1,156 @@
+# startup_budget.py – import-time budget check for the Python entry points
+#
+# Runs `python -X importtime -c "import <module>"` for every entry point,
+# parses the importtime table from stderr and compares the module's cumulative
+# import time against its budget. Heavy dependencies (Google client stack,
+# requests, numpy) must stay behind the code paths that need them, except in
+# the numpy entry points, whose budgets include it; a regression
+# shows up here as the offending package in the "heaviest imports" list.
+#
+# Run:  python startup_budget.py [--repeat 5] [--module sheets_push_cards ...]
+# Exits 1 if any entry point is over budget.
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Cumulative import time budget per entry point, in milliseconds.
+STARTUP_BUDGETS_MS = {
+    "sheets_push_cards": 30,
+    "sheets_push_legs": 30,
+    "sheets_push_underdog_cards": 30,
+    "sheets_push_underdog_legs": 30,
+    "sheets_shards": 30,
+    "fix_sheets_formulas": 30,
+    "telegram_kelly": 30,
+    "export_dashboard_shards": 40,  # hashlib + json are needed on every run
+    "leg_calculator": 30,
+    "legs_diff": 30,
+    "sheets_publish": 40,  # threading + datetime are needed on every run
+    "game_scheduler": 30,
+    "snapshot_generations": 40,  # shutil + uuid are needed on every run
+    # numpy (~70–100 ms alone) is what these compute with on every run
+    "slate_api": 150,
+    "kelly_portfolio": 150,
+    "kelly_sweep": 150,
+    "slate_montecarlo": 150,
+    "props_table": 150,
+    "card_matrix": 150,
+}
+
+# "import time: self [us] | cumulative | imported package"
+IMPORTTIME_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+REPO_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr: str):
+    """Parse -X importtime output into (name, depth, self_us, cumulative_us) tuples."""
+    entries = []
+    for line in stderr.splitlines():
+        m = IMPORTTIME_LINE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, name = m.groups()
+        # Top-level imports are indented by one space, each nesting level by two more.
+        depth = (len(indent) - 1) // 2
+        entries.append((name, depth, int(self_us), int(cumulative_us)))
+    return entries
+
+
+def module_breakdown(entries, module: str):
+    """
+    Cumulative time of module and its direct children.
+
+    importtime prints children before their parent, so the children of the
+    depth-0 module line are the depth-1 lines immediately preceding it.
+    """
+    for i, (name, depth, _, cumulative_us) in enumerate(entries):
+        if name == module and depth == 0:
+            children = []
+            j = i - 1
+            while j >= 0 and entries[j][1] > 0:
+                if entries[j][1] == 1:
+                    children.append((entries[j][0], entries[j][3]))
+                j -= 1
+            return cumulative_us, sorted(children, key=lambda c: c[1], reverse=True)
+    return None, []
+
+
+def measure(module: str, repeat: int):
+    """Median cumulative import time (us) of module over repeat fresh interpreters."""
+    samples = []
+    children = []
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+        )
+        if proc.returncode != 0:
+            last = proc.stderr.strip().splitlines()[-1:] or ["unknown error"]
+            raise RuntimeError(f"import {module} failed: {last[0]}")
+        cumulative_us, children = module_breakdown(parse_importtime(proc.stderr), module)
+        if cumulative_us is None:
+            raise RuntimeError(f"import {module}: no importtime line found")
+        samples.append(cumulative_us)
+    return statistics.median(samples), children
+
+
+def main(modules=None, repeat: int = 5, top: int = 5):
+    modules = modules or list(STARTUP_BUDGETS_MS)
+    over_budget = []
+
+    print(f"{'entry point':<30} {'import ms':>10} {'budget ms':>10}")
+    for module in modules:
+        budget_ms = STARTUP_BUDGETS_MS.get(module)
+        try:
+            median_us, children = measure(module, repeat)
+        except RuntimeError as e:
+            print(f"{module:<30} ERROR: {e}")
+            over_budget.append(module)
+            continue
+
+        median_ms = median_us / 1000
+        status = "ok"
+        if budget_ms is not None and median_ms > budget_ms:
+            status = "OVER"
+            over_budget.append(module)
+        budget_str = f"{budget_ms}" if budget_ms is not None else "-"
+        print(f"{module:<30} {median_ms:>10.1f} {budget_str:>10}  {status}")
+        if status == "OVER":
+            for name, cumulative_us in children[:top]:
+                print(f"    {name:<40} {cumulative_us / 1000:>8.1f} ms")
+
+    if over_budget:
+        print(f"\n{len(over_budget)} entry point(s) over startup budget: {', '.join(over_budget)}")
+        return 1
+    print("\nAll entry points within startup budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check import-time budgets of the Python entry points.")
+    parser.add_argument(
+        "--module",
+        action="append",
+        help="Entry point module to check (repeatable; default: all budgeted entry points).",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=5,
+        help="Fresh interpreters per module; the median is compared to the budget (default: 5).",
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=5,
+        help="Heaviest direct imports listed for modules over budget (default: 5).",
+    )
+    args = parser.parse_args()
+    sys.exit(main(modules=args.module, repeat=args.repeat, top=args.top))
@@ -3,12 +3,22 @@
 Telegram Kelly Alerts - Sends notifications for high Kelly stake opportunities
 """
 
-import requests
-import pandas as pd
-import json
+import argparse
 import os
+import time
 from datetime import datetime
 
+from profiling import add_profile_arguments, run_profiled
+from slate_data import card_leg_ids, load_all_legs, load_cards
+from slate_index import SlateIndex
+
+SITE_NAMES = {"PP": "PrizePicks", "UD": "Underdog"}
+
+# Bot mode: getUpdates long-poll timeout (seconds) and reply size limits
+BOT_POLL_TIMEOUT = 30
+BOT_MAX_TOP = 20
+BOT_CARDS_PER_REPLY = 5
+
 class TelegramKellyAlerts:
     def __init__(self):
         # Load configuration from environment or .env file
@@ -22,65 +32,109 @@ class TelegramKellyAlerts:
         # Data files
         self.underdog_file = "underdog-cards.csv"
         self.prizepicks_file = "prizepicks-cards.csv"
+        self.leg_sources = None  # slate_data.LEG_SOURCES unless a generation is pinned
+
+        # Urgency mode: skip started games, alert earliest-locking cards first
+        self.urgency = False
+
+        # Only alert these sports (None = all); set by game_scheduler.py per fire
+        self.sports = None
         
     def load_cards(self):
-        """Load cards from CSV files"""
+        """Load cards from CSV files (a few hundred rows – plain csv, no pandas)"""
         cards = []
         
         try:
             # Load Underdog cards
-            if os.path.exists(self.underdog_file):
-                df_ud = pd.read_csv(self.underdog_file)
-                df_ud['site'] = 'Underdog'
-                cards.append(df_ud)
+            for card in load_cards(self.underdog_file, "UD"):
+                card['site'] = SITE_NAMES["UD"]
+                cards.append(card)
                 
             # Load PrizePicks cards  
-            if os.path.exists(self.prizepicks_file):
-                df_pp = pd.read_csv(self.prizepicks_file)
-                df_pp['site'] = 'PrizePicks'
-                cards.append(df_pp)
+            for card in load_cards(self.prizepicks_file, "PP"):
+                card['site'] = SITE_NAMES["PP"]
+                cards.append(card)
                 
         except Exception as e:
             print(f"Error loading CSV files: {e}")
-            return pd.DataFrame()
+            return []
             
-        if cards:
-            return pd.concat(cards, ignore_index=True)
-        return pd.DataFrame()
+        return cards
     
-    def filter_high_kelly(self, df):
-        """Filter cards with Kelly stakes above threshold"""
-        if df.empty or 'kellyStake' not in df.columns:
-            return pd.DataFrame()
-            
-        # Convert kellyStake to numeric if it's not already
-        df['kellyStake'] = pd.to_numeric(df['kellyStake'], errors='coerce')
-        
-        # Filter high Kelly opportunities
-        high_kelly = df[df['kellyStake'] > self.kelly_threshold].copy()
-        
-        # Sort by Kelly stake (highest first)
-        high_kelly = high_kelly.sort_values('kellyStake', ascending=False)
-        
+    def filter_high_kelly(self, cards):
+        """Filter cards with Kelly stakes above threshold, highest stake first"""
+        high_kelly = [
+            card for card in cards
+            if isinstance(card.get('kellyStake'), float) and card['kellyStake'] > self.kelly_threshold
+            and (self.sports is None or str(card.get('Sport', '')).upper() in self.sports)
+        ]
+        high_kelly.sort(key=lambda card: card['kellyStake'], reverse=True)
         return high_kelly
     
+    def order_by_urgency(self, cards):
+        """Drop cards with a started leg; earliest lock bucket first, stake order kept inside a bucket"""
+        from push_urgency import LOCK_BUCKET_LABELS, card_lock_time, leg_lock_times, urgency_chunks
+
+        lock_times = leg_lock_times(load_all_legs(self.leg_sources))
+        chunks, dropped = urgency_chunks(cards, lambda card: card_lock_time(card_leg_ids(card), lock_times))
+        if dropped:
+            print(f"⏭️ Skipping {dropped} cards with games already started")
+        ordered = []
+        for bucket, bucket_cards in chunks:
+            for card in bucket_cards:
+                card['lockBucket'] = LOCK_BUCKET_LABELS[bucket]
+                ordered.append(card)
+        return ordered
+
+    def fold_duplicates(self, cards):
+        """Collapse cards with identical leg sets (same slip on both sites or as power and flex) into the first one"""
+        from card_matrix import CardMatrix  # numpy: keep it off the startup path
+
+        leg_lists = [card_leg_ids(card) for card in cards]
+        # Cards without leg IDs would all be the same all-PAD row; never fold those
+        keyed = [i for i, legs in enumerate(leg_lists) if legs]
+        if len(keyed) < 2:
+            return cards
+        matrix = CardMatrix.from_leg_lists([("alerts", [leg_lists[i] for i in keyed])])
+        inverse, counts = matrix.duplicates()
+        group_of = dict(zip(keyed, inverse.tolist()))
+        kept, first = [], {}
+        for i, card in enumerate(cards):
+            group = group_of.get(i)
+            if group is not None and group in first:
+                first[group]['twins'].append(card)
+                continue
+            card['twins'] = []
+            kept.append(card)
+            if group is not None:
+                first[group] = card
+        folded = sum(int(c) - 1 for c in counts if c > 1)
+        if folded:
+            print(f"🔁 Folded {folded} cards repeating another card's legs")
+        return kept
+
     def format_alert_message(self, card):
         """Format a single card as Telegram message"""
+        from html import escape  # messages go out with parse_mode=HTML
+
         try:
-            sport = card.get('sport', 'Unknown')
+            sport = escape(str(card.get('Sport', 'Unknown')))
             kelly_stake = card.get('kellyStake', 0)
             card_ev = card.get('cardEv', 0) * 100  # Convert to percentage
-            site = card.get('site', 'Unknown')
-            kelly_frac = card.get('kellyFrac', 'N/A')
+            site = escape(str(card.get('site', 'Unknown')))
+            kelly_frac = escape(str(card.get('kellyFrac', 'N/A')))
             
             # Get leg info
-            legs = []
-            for i in range(1, 7):  # Check leg1Id through leg6Id
-                leg_id = card.get(f'leg{i}Id')
-                if leg_id and pd.notna(leg_id):
-                    legs.append(str(leg_id))
+            legs = card_leg_ids(card)
             
-            leg_info = '-'.join(legs[:3]) if legs else 'N/A'
+            leg_info = escape('-'.join(legs[:3])) if legs else 'N/A'
+            
+            # Cards folded into this one by fold_duplicates
+            twins = [
+                f"{twin.get('site', '?')} {twin.get('flexType', '')} ${twin.get('kellyStake', 0):.2f}"
+                for twin in card.get('twins', [])
+            ]
+            twin_info = f"\n🔁 Same legs: {escape(', '.join(twins))}" if twins else ""
             
             emoji = "🚨" if kelly_stake > 100 else "⚡"
             
@@ -91,7 +145,7 @@ class TelegramKellyAlerts:
 💰 Kelly: ${kelly_stake:.2f} ({kelly_frac})
 📈 EV: {card_ev:.1f}%
 🎯 Site: {site}
-🎲 Legs: {leg_info}
+🎲 Legs: {leg_info}{twin_info}
 
 ⏰ {datetime.now().strftime('%I:%M %p')}
             """.strip()
@@ -102,14 +156,18 @@ class TelegramKellyAlerts:
             print(f"Error formatting message: {e}")
             return f"🚨 High Kelly Alert - Error formatting card data"
     
-    def send_message(self, message):
-        """Send message to Telegram"""
+    def send_message(self, message, html=True):
+        """Send message to Telegram (html=False sends plain text, e.g. bot replies)"""
+        import requests  # only needed once we actually talk to Telegram
+
         try:
             payload = {
                 'chat_id': self.chat_id,
                 'text': message,
-                'parse_mode': 'HTML'
             }
+            if html:
+                # Every interpolated value must be html.escape'd by the caller
+                payload['parse_mode'] = 'HTML'
             
             response = requests.post(f"{self.base_url}/sendMessage", data=payload)
             
@@ -126,18 +184,22 @@ class TelegramKellyAlerts:
     
     def send_alerts(self):
         """Main function to check and send alerts"""
+        from html import escape
+
         print(f"🔍 Checking for high Kelly opportunities at {datetime.now().strftime('%I:%M %p')}")
         
         # Load cards
-        df = self.load_cards()
-        if df.empty:
+        cards = self.load_cards()
+        if not cards:
             print("❌ No cards data found")
             return
         
         # Filter high Kelly cards
-        high_kelly = self.filter_high_kelly(df)
+        high_kelly = self.fold_duplicates(self.filter_high_kelly(cards))
+        if self.urgency:
+            high_kelly = self.order_by_urgency(high_kelly)
         
-        if high_kelly.empty:
+        if not high_kelly:
             print(f"✅ No high Kelly opportunities found (threshold: ${self.kelly_threshold})")
             return
         
@@ -153,28 +215,28 @@ Top 3 opportunities:
 """
         
         # Add top 3 cards to summary
-        for i, (_, card) in enumerate(high_kelly.head(3).iterrows()):
-            sport = card.get('sport', 'Unknown')
+        for i, card in enumerate(high_kelly[:3]):
+            sport = escape(str(card.get('Sport', 'Unknown')))
             kelly = card.get('kellyStake', 0)
             ev = card.get('cardEv', 0) * 100
-            summary += f"{i+1}. {sport}: ${kelly:.2f} ({ev:.1f}% EV)\n"
+            lock = f" [{card['lockBucket']}]" if 'lockBucket' in card else ""
+            summary += f"{i+1}. {sport}: ${kelly:.2f} ({ev:.1f}% EV){lock}\n"
         
         summary += f"\n⏰ {datetime.now().strftime('%I:%M %p')}"
         
         self.send_message(summary)
         
         # Send individual alerts for very high Kelly (> $100)
-        very_high_kelly = high_kelly[high_kelly['kellyStake'] > 100]
+        very_high_kelly = [card for card in high_kelly if card['kellyStake'] > 100]
         
-        if not very_high_kelly.empty:
+        if very_high_kelly:
             print(f"🚨 Sending {len(very_high_kelly)} individual alerts for very high Kelly")
             
-            for _, card in very_high_kelly.iterrows():
+            for card in very_high_kelly:
                 message = self.format_alert_message(card)
                 self.send_message(message)
                 
                 # Small delay between messages to avoid spamming
-                import time
                 time.sleep(1)
     
     def test_connection(self):
@@ -192,10 +254,202 @@ Ready for tonight's NCAAB games! 🏀
         
         return self.send_message(test_message)
 
+    # ── Bot mode ──────────────────────────────────────────────
+    # Commands are answered from a warm SlateIndex; CSVs are only re-read
+    # when a file's mtime and content hash change.
+
+    def card_line(self, card):
+        """One-line card summary for bot replies"""
+        site = SITE_NAMES.get(card.get('site'), card.get('site', '?'))
+        legs = '-'.join(card_leg_ids(card)) or 'N/A'
+        return (
+            f"{card.get('Sport', '?')} {site} {card.get('flexType', '')}: "
+            f"${card.get('kellyStake', 0):.2f} ({card.get('cardEv', 0) * 100:.1f}% EV) [{legs}]"
+        )
+
+    def cmd_top(self, args):
+        sport = None
+        n = BOT_CARDS_PER_REPLY
+        for arg in args:
+            if arg.isdigit():
+                n = min(int(arg), BOT_MAX_TOP)
+            elif arg.upper() != 'ALL':
+                sport = arg.upper()
+        cards = self.index.top(sport, n)
+        if not cards:
+            return f"No cards for {sport or 'any sport'}"
+        lines = [f"📊 Top {len(cards)} {sport or 'ALL'} by Kelly stake"]
+        lines += [f"{i + 1}. {self.card_line(card)}" for i, card in enumerate(cards)]
+        return "\n".join(lines)
+
+    def prop_row(self, leg_id):
+        """props-with-ev.json row for a leg (leg IDs are prop IDs), or None"""
+        from props_table import PROPS_WITH_EV_JSON, load_props_table
+
+        try:
+            st = os.stat(PROPS_WITH_EV_JSON)
+        except OSError:
+            return None
+        fingerprint = (st.st_mtime_ns, st.st_size)
+        if getattr(self, '_props_fingerprint', None) != fingerprint:
+            self._props, _ = load_props_table(PROPS_WITH_EV_JSON)
+            self._props_fingerprint = fingerprint
+        rows = self._props.where("id", leg_id)
+        return self._props.row(rows[0]) if len(rows) else None
+
+    def cmd_card(self, args):
+        if not args:
+            return "Usage: /card <legId>"
+        leg_id = args[0]
+        leg = self.index.legs_by_id.get(leg_id)
+        cards = self.index.cards_with_leg(leg_id)
+        if leg is None and not cards:
+            return f"Leg {leg_id} not found"
+        lines = []
+        if leg is not None:
+            lines.append(
+                f"🎲 {leg_id}: {leg.get('player', '')} {leg.get('stat', '')} {leg.get('line', '')} "
+                f"(p={leg.get('trueProb', 0):.3f}, edge={leg.get('edge', 0) * 100:.1f}%)"
+            )
+        prop = self.prop_row(leg_id)
+        if prop is not None:
+            lines.append(
+                f"🏟️ {prop['team'] or '?'} vs {prop['opponent'] or '?'} at {prop['commenceTime'] or '?'}, "
+                f"{prop['bookKey'] or '?'} implied {prop['impliedProb']:.3f}"
+            )
+        lines.append(f"In {len(cards)} card(s)")
+        lines += [f"• {self.card_line(card)}" for card in cards[:BOT_CARDS_PER_REPLY]]
+        return "\n".join(lines)
+
+    def cmd_exposure(self, args):
+        if not args:
+            return "Usage: /exposure <player>"
+        player = ' '.join(args)
+        cards, total = self.index.player_exposure(player)
+        if not cards:
+            return f"No cards include {player}"
+        by_sport = {}
+        for card in cards:
+            by_sport[card['Sport']] = by_sport.get(card['Sport'], 0) + card.get('kellyStake', 0)
+        breakdown = ', '.join(f"{sport} ${stake:.2f}" for sport, stake in sorted(by_sport.items()))
+        return f"👤 {player}: {len(cards)} card(s), ${total:.2f} total Kelly ({breakdown})"
+
+    def card_matrix(self):
+        """CardMatrix over self.index.cards, rebuilt when the index is"""
+        from card_matrix import CardMatrix
+
+        if getattr(self, '_matrix_version', None) != self.index.version:
+            self._matrix = CardMatrix.from_leg_lists([("index", [card_leg_ids(c) for c in self.index.cards])])
+            self._matrix_version = self.index.version
+        return self._matrix
+
+    def cmd_overlap(self, args):
+        if not args:
+            return "Usage: /overlap <legId> [legId ...]"
+        leg_ids = list(dict.fromkeys(args))
+        matrix = self.card_matrix()
+        cards, shared = matrix.shared_counts([matrix.interner.lookup(leg_id) for leg_id in leg_ids])
+        if not len(cards):
+            return f"No cards hold {', '.join(leg_ids)}"
+        # Most shared legs first, then the index's stake order
+        order = sorted(range(len(cards)), key=lambda i: (-shared[i], -self.index.cards[cards[i]].get('kellyStake', 0)))
+        full = int((shared == len(leg_ids)).sum())
+        lines = [f"🧩 {len(cards)} card(s) hold any of {len(leg_ids)} leg(s), {full} hold all"]
+        lines += [
+            f"• {shared[i]}/{len(leg_ids)} {self.card_line(self.index.cards[cards[i]])}"
+            for i in order[:BOT_CARDS_PER_REPLY]
+        ]
+        return "\n".join(lines)
+
+    def cmd_threshold(self, args):
+        if args:
+            try:
+                self.kelly_threshold = float(args[0].lstrip('$'))
+            except ValueError:
+                return "Usage: /threshold <amount>"
+        count = self.index.count_above(self.kelly_threshold)
+        return f"🔔 Threshold ${self.kelly_threshold:.2f}: {count} card(s) above"
+
+    def cmd_help(self, args):
+        return (
+            "/top [SPORT] [N] – highest Kelly cards\n"
+            "/card <legId> – leg details and cards using it\n"
+            "/exposure <player> – Kelly exposure to a player\n"
+            "/overlap <legId> [legId ...] – cards sharing these legs\n"
+            "/threshold [amount] – show or set alert threshold"
+        )
+
+    def handle_command(self, text):
+        """Dispatch one bot command and return the reply text"""
+        parts = text.strip().split()
+        command = parts[0].split('@')[0].lower()
+        handler = {
+            '/top': self.cmd_top,
+            '/card': self.cmd_card,
+            '/exposure': self.cmd_exposure,
+            '/overlap': self.cmd_overlap,
+            '/threshold': self.cmd_threshold,
+            '/help': self.cmd_help,
+            '/start': self.cmd_help,
+        }.get(command)
+        if handler is None:
+            return f"Unknown command {command}. Try /help"
+        self.index.refresh()
+        return handler(parts[1:])
+
+    def get_updates(self, offset):
+        """Long-poll Telegram for new messages"""
+        import requests
+
+        response = requests.get(
+            f"{self.base_url}/getUpdates",
+            params={'offset': offset, 'timeout': BOT_POLL_TIMEOUT},
+            timeout=BOT_POLL_TIMEOUT + 10,
+        )
+        response.raise_for_status()
+        return response.json().get('result', [])
 
-def main():
+    def run_bot(self):
+        """Answer slate commands from the configured chat until interrupted"""
+        self.index = SlateIndex(
+            card_sources=[(self.prizepicks_file, "PP"), (self.underdog_file, "UD")],
+        )
+        print(f"🤖 Bot mode: {len(self.index.cards)} cards, {len(self.index.legs_by_id)} legs indexed")
+
+        offset = None
+        while True:
+            try:
+                updates = self.get_updates(offset)
+            except KeyboardInterrupt:
+                raise
+            except Exception as e:
+                print(f"❌ getUpdates failed: {e}")
+                time.sleep(5)
+                continue
+
+            for update in updates:
+                offset = update['update_id'] + 1
+                message = update.get('message') or {}
+                text = message.get('text', '')
+                if str(message.get('chat', {}).get('id')) != str(self.chat_id) or not text.startswith('/'):
+                    continue
+                started = time.perf_counter()
+                try:
+                    reply = self.handle_command(text)
+                except Exception as e:  # one bad command must not stop the polling loop
+                    print(f"❌ {text} failed: {e}")
+                    reply = f"Command failed: {e}"
+                print(f"💬 {text} ({(time.perf_counter() - started) * 1000:.2f} ms)")
+                # Replies quote user input, leg IDs and player names: send as plain text
+                self.send_message(reply, html=False)
+
+
+def main(bot: bool = False, urgency: bool = False, generation: str = None, sports=None):
     """Main execution"""
     alerts = TelegramKellyAlerts()
+    alerts.urgency = urgency
+    if sports:
+        alerts.sports = {s.upper() for s in sports}
     
     # Check if bot token and chat ID are configured
     if alerts.bot_token == 'YOUR_BOT_TOKEN' or alerts.chat_id == 'YOUR_CHAT_ID':
@@ -210,16 +464,59 @@ def main():
         print("   export TELEGRAM_CHAT_ID='your_chat_id'")
         return
     
+    if bot:
+        try:
+            alerts.run_bot()
+        except KeyboardInterrupt:
+            print("👋 Bot stopped")
+        return
+
     # Test connection
     print("🔧 Testing Telegram connection...")
     if alerts.test_connection():
         print("✅ Telegram connection successful")
         
         # Send alerts
-        alerts.send_alerts()
+        if generation is None:
+            alerts.send_alerts()
+            return
+
+        from slate_data import LEG_SOURCES
+        from snapshot_generations import pin
+
+        with pin(None if generation == "current" else generation) as gen:
+            print(f"📌 Pinned generation {gen.run_id}")
+            alerts.underdog_file = gen.path(alerts.underdog_file)
+            alerts.prizepicks_file = gen.path(alerts.prizepicks_file)
+            alerts.leg_sources = gen.sources(LEG_SOURCES)
+            alerts.send_alerts()
     else:
         print("❌ Telegram connection failed")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Send Telegram alerts for high Kelly stake cards.")
+    parser.add_argument(
+        "--bot",
+        action="store_true",
+        help="Run as a long-polling command bot (/top, /card, /exposure, /overlap, /threshold).",
+    )
+    parser.add_argument(
+        "--urgency",
+        action="store_true",
+        help="Skip cards whose games have started and alert the earliest-locking cards first.",
+    )
+    parser.add_argument(
+        "--generation",
+        nargs="?",
+        const="current",
+        help="Read a pinned snapshot generation (default: CURRENT) instead of the live CSVs.",
+    )
+    parser.add_argument(
+        "--sport",
+        action="append",
+        help="Only alert cards of this sport (repeatable).",
+    )
+    add_profile_arguments(parser)
+    args = parser.parse_args()
+    run_profiled(args, main, bot=args.bot, urgency=args.urgency, generation=args.generation, sports=args.sport)
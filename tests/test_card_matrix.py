@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from card_matrix import PAD, CardMatrix
+from telegram_kelly import TelegramKellyAlerts
+
+
+def _brute_shared(lists, query):
+    return {i: len(set(legs) & set(query)) for i, legs in enumerate(lists) if set(legs) & set(query)}
+
+
+def test_rows_are_canonical_and_duplicates_group_across_sources():
+    matrix = CardMatrix.from_leg_lists([
+        ("PP", [["a", "b", "c"], ["d", "e"]]),
+        ("UD", [["c", "a", "b"], ["a", "b", "c", "d"]]),
+    ])
+    assert (matrix.legs[0] == matrix.legs[2]).all()
+    assert (matrix.legs[1][:4] == PAD).all()
+
+    inverse, counts = matrix.duplicates()
+    assert inverse[0] == inverse[2]
+    assert len(set(inverse.tolist())) == 3
+    assert sorted(counts.tolist()) == [1, 1, 2]
+    assert [sorted(g.tolist()) for g in matrix.duplicate_groups()] == [[0, 2]]
+    assert matrix.describe(2) == "UD#0"
+
+
+def test_too_many_legs_is_rejected():
+    with pytest.raises(ValueError):
+        CardMatrix.from_leg_lists([("PP", [list("abcdefg")])])
+
+
+def test_csr_and_sharing_match_brute_force():
+    rng = np.random.default_rng(3)
+    legs = [f"leg{i}" for i in range(30)]
+    lists = [[str(leg) for leg in rng.choice(legs, rng.integers(2, 7), replace=False)] for _ in range(400)]
+    matrix = CardMatrix.from_leg_lists([("PP", lists)])
+
+    for leg in legs:
+        expected = [i for i, card in enumerate(lists) if leg in card]
+        assert matrix.cards_with_leg(leg).tolist() == expected
+    assert matrix.cards_with_leg("missing").size == 0
+    assert matrix.leg_counts().sum() == sum(len(card) for card in lists)
+
+    for card in (0, 17, 399):
+        cards, shared = matrix.sharing(card, k=3)
+        expected = {i: n for i, n in _brute_shared(lists, lists[card]).items() if n >= 3 and i != card}
+        assert dict(zip(cards.tolist(), shared.tolist())) == expected
+        assert list(shared) == sorted(shared, reverse=True)
+
+
+def test_alerts_fold_cards_with_the_same_legs():
+    alerts = TelegramKellyAlerts()
+    cards = [
+        {"site": "PrizePicks", "flexType": "5P", "kellyStake": 120.0, "leg1Id": "a", "leg2Id": "b"},
+        {"site": "Underdog", "flexType": "5F", "kellyStake": 90.0, "leg1Id": "b", "leg2Id": "a"},
+        {"site": "Underdog", "flexType": "5F", "kellyStake": 80.0, "leg1Id": "a", "leg2Id": "c"},
+    ]
+    folded = alerts.fold_duplicates(cards)
+    assert [card["kellyStake"] for card in folded] == [120.0, 80.0]
+    assert folded[0]["twins"] == [cards[1]]
+    assert "Same legs: Underdog 5F $90.00" in alerts.format_alert_message(folded[0])
+
+
+def test_alerts_never_fold_cards_without_leg_ids():
+    alerts = TelegramKellyAlerts()
+    cards = [
+        {"site": "PrizePicks", "flexType": "3P", "kellyStake": 70.0},
+        {"site": "PrizePicks", "flexType": "5P", "kellyStake": 60.0, "leg1Id": "a", "leg2Id": "b"},
+        {"site": "Underdog", "flexType": "3F", "kellyStake": 50.0, "leg1Id": ""},
+        {"site": "Underdog", "flexType": "5F", "kellyStake": 40.0, "leg1Id": "b", "leg2Id": "a"},
+    ]
+    folded = alerts.fold_duplicates(cards)
+    assert [card["kellyStake"] for card in folded] == [70.0, 60.0, 50.0]
+    assert folded[0]["twins"] == [] and folded[2]["twins"] == []
+    assert folded[1]["twins"] == [cards[3]]
+
+
+def test_overlap_command_ranks_cards_by_shared_legs():
+    class Index:
+        version = 1
+        cards = [
+            {"Sport": "NBA", "site": "PP", "kellyStake": 10.0, "leg1Id": "a", "leg2Id": "x"},
+            {"Sport": "NBA", "site": "UD", "kellyStake": 5.0, "leg1Id": "a", "leg2Id": "b"},
+            {"Sport": "NBA", "site": "UD", "kellyStake": 50.0, "leg1Id": "y", "leg2Id": "z"},
+        ]
+
+    alerts = TelegramKellyAlerts()
+    alerts.index = Index()
+    reply = alerts.cmd_overlap(["a", "b", "a"])
+    lines = reply.splitlines()
+    assert lines[0] == "🧩 2 card(s) hold any of 2 leg(s), 1 hold all"
+    assert lines[1].startswith("• 2/2 NBA Underdog")
+    assert lines[2].startswith("• 1/2 NBA PrizePicks")
+    assert alerts.cmd_overlap(["nope"]) == "No cards hold nope"
@@ -0,0 +1,28 @@
+import json
+import os
+
+from export_dashboard_shards import MANIFEST_NAME, export
+
+
+def _card(sport, site, ev, stake, selected=False):
+    return {"Sport": sport, "site": site, "flexType": "5F", "cardEv": ev, "kellyStake": stake,
+            "selected": selected, "runTimestamp": "t1", "leg1Id": "a"}
+
+
+def test_unchanged_shards_keep_their_file_and_the_manifest_carries_summaries(tmp_path):
+    out = str(tmp_path)
+    cards = [_card("NBA", "PP", 0.10, 20.0, True), _card("NBA", "PP", 0.05, 10.0), _card("NHL", "UD", 0.02, 5.0)]
+    manifest, written = export(cards, out_dir=out)
+    assert written == 2
+    assert sorted(os.listdir(out)) == sorted([MANIFEST_NAME] + [e["file"] for e in manifest["shards"].values()])
+    assert manifest["shards"]["NBA/PP"]["summary"] == {
+        "cards": 2, "selected": 1, "totalStake": 30.0, "avgEv": 0.075, "maxEv": 0.1}
+    assert manifest["summary"]["cards"] == 3
+
+    nba_file = manifest["shards"]["NBA/PP"]["file"]
+    cards[2]["kellyStake"] = 6.0
+    manifest, written = export(cards, out_dir=out)
+    assert written == 1
+    assert manifest["shards"]["NBA/PP"]["file"] == nba_file
+    with open(os.path.join(out, nba_file), encoding="utf-8") as f:
+        assert [c["cardEv"] for c in json.load(f)["cards"]] == [0.10, 0.05]
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta, timezone
+
+import game_scheduler
+from game_scheduler import COALESCE_SECONDS, GameScheduler, cycle_commands
+
+T0 = datetime(2026, 2, 14, 18, 0, tzinfo=timezone.utc)
+
+
+class FakeClock:
+    def __init__(self, now=T0):
+        self.now = now
+        self.slept = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.slept.append(seconds)
+        self.now += timedelta(seconds=seconds)
+
+
+def _scheduler(clock, locks, sports=("NBA", "NHL", "MLB")):
+    cycles = []
+    scheduler = GameScheduler(sports, run_cycle=lambda batch, refresh: cycles.append((batch, refresh)),
+                              load_locks=lambda now: locks, clock=clock, sleep=clock.sleep)
+    return scheduler, cycles
+
+
+def test_timers_within_the_coalesce_window_fire_together():
+    clock = FakeClock()
+    scheduler, _ = _scheduler(clock, {})
+    scheduler.schedule("NBA", T0 + timedelta(minutes=5))
+    scheduler.schedule("NHL", T0 + timedelta(minutes=5, seconds=COALESCE_SECONDS))
+    scheduler.schedule("MLB", T0 + timedelta(minutes=5, seconds=COALESCE_SECONDS + 1))
+
+    assert scheduler.next_batch() == ["NBA", "NHL"]
+    assert clock.slept == [300]
+    assert scheduler.next_batch() == ["MLB"]
+
+
+def test_superseded_timers_are_skipped_when_popped():
+    clock = FakeClock()
+    scheduler, _ = _scheduler(clock, {})
+    scheduler.schedule("NBA", T0 + timedelta(minutes=1))
+    scheduler.schedule("NHL", T0 + timedelta(minutes=30))
+    scheduler.schedule("NBA", T0 + timedelta(minutes=20))  # re-planned later: the 1-minute entry is dead
+
+    assert scheduler.next_batch() == ["NBA"]
+    assert clock.now == T0 + timedelta(minutes=20)
+    assert scheduler.next_batch() == ["NHL"]
+    assert scheduler.next_batch() == []
+
+
+def test_replan_only_moves_a_timer_earlier_unless_it_fired():
+    clock = FakeClock()
+    lock = T0 + timedelta(hours=3)
+    scheduler, _ = _scheduler(clock, {"NBA": [lock]})
+    scheduler.locks = {"NBA": [lock]}
+    scheduler.schedule("NBA", T0 + timedelta(minutes=5))
+
+    scheduler.replan("NBA", T0)  # plan says 15 min: keep the earlier timer
+    assert scheduler.due["NBA"] == T0 + timedelta(minutes=5)
+    scheduler.replan("NBA", T0, fired=True)
+    assert scheduler.due["NBA"] == T0 + timedelta(minutes=15)
+
+
+def test_run_fires_every_sport_first_then_replans_the_batch():
+    clock = FakeClock()
+    locks = {"NBA": [T0 + timedelta(minutes=20)], "NHL": [T0 + timedelta(hours=30)]}
+    scheduler, cycles = _scheduler(clock, locks, sports=("NBA", "NHL"))
+    scheduler.run(max_cycles=2)
+
+    assert cycles[0] == (["NBA", "NHL"], game_scheduler.REFRESH_MINUTES[0])
+    # NBA locks within 30 min, so it is back after 2 min; NHL (30 h out) waits hours
+    assert cycles[1] == (["NBA"], game_scheduler.REFRESH_MINUTES[0])
+    assert clock.now == T0 + timedelta(minutes=2)
+
+
+def test_cycle_merges_before_anything_reads_the_outputs():
+    commands = cycle_commands(["NBA", "NHL"], 5)
+    labels = [label for label, _ in commands]
+    assert labels == ["optimizer", "merge", "kelly caps", "snapshot", "legs", "sheets", "alerts"]
+    argv = dict(commands)
+    assert argv["merge"][1:] == ["snapshot_generations.py", "merge", "--sports", "NBA,NHL"]
+    assert argv["sheets"][argv["sheets"].index("--dataset") + 1] == "cards"
+    assert argv["sheets"][-4:] == ["--sport", "NBA", "--sport", "NHL"]
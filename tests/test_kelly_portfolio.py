@@ -0,0 +1,107 @@
+import csv
+
+import numpy as np
+
+import kelly_portfolio
+from kelly_portfolio import build_groups, project_stakes, rescale
+from slate_data import merge_row_dicts, read_table, row_dicts, write_table
+
+
+def _exposure(stakes, card_idx, group_idx, n_groups):
+    return np.bincount(group_idx, weights=stakes[card_idx], minlength=n_groups)
+
+
+def test_projection_respects_every_cap_and_never_grows_a_stake():
+    rng = np.random.default_rng(7)
+    n = 300
+    sports = rng.choice(["NBA", "NHL", "NFL"], n)
+    players = [set(rng.choice([f"p{i}" for i in range(40)], rng.integers(2, 6), replace=False)) for _ in range(n)]
+    card_idx, group_idx, caps, _ = build_groups(sports, players, 1000.0, 0.30, 0.15, 0.05)
+    stakes = rng.uniform(1, 40, n)
+
+    after = project_stakes(stakes, card_idx, group_idx, caps)
+
+    assert np.all(after <= stakes + 1e-9)
+    assert np.all(after >= 0)
+    assert np.all(_exposure(after, card_idx, group_idx, caps.size) <= caps * (1 + 1e-9))
+
+
+def test_projection_leaves_a_portfolio_within_caps_untouched():
+    card_idx, group_idx, caps, _ = build_groups(["NBA", "NHL"], [{"a"}, {"b"}], 1000.0, 0.30, 0.15, 0.05)
+    stakes = np.array([10.0, 20.0])
+    assert np.allclose(project_stakes(stakes, card_idx, group_idx, caps), stakes)
+
+
+def _write_cards(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def test_unselected_cards_take_their_groups_haircut(tmp_path):
+    header = ["Sport", "leg1Id", "leg2Id", "kellyStake", "selected"]
+    path = tmp_path / "cards.csv"
+    # Two selected NBA cards (40 + 40) against a 50 sport cap -> haircut 0.625;
+    # the unselected NBA card on the same player takes it too.
+    _write_cards(path, header, [
+        ["NBA", "L1", "L2", "40", "True"],
+        ["NBA", "L3", "L4", "40", "True"],
+        ["NBA", "L1", "L5", "30", "False"],
+    ])
+    tables = kelly_portfolio.load_card_rows([(str(path), "PP")])
+    players = {f"L{i}": f"p{i}" for i in range(1, 6)}
+
+    _, before, after, selected, *_ = rescale(tables, 1000.0, 1.0, 0.05, 1.0, players)
+
+    assert selected.tolist() == [True, True, False]
+    assert np.isclose(after[:2].sum(), 50.0)
+    assert np.isclose(after[2], 30.0 * 50.0 / 80.0)
+
+
+def test_unselected_card_is_never_above_a_group_cap(tmp_path):
+    header = ["Sport", "leg1Id", "kellyStake", "selected"]
+    path = tmp_path / "cards.csv"
+    _write_cards(path, header, [["MLB", "L9", "500", "False"]])
+    tables = kelly_portfolio.load_card_rows([(str(path), "PP")])
+
+    _, _, after, *_ = rescale(tables, 1000.0, 0.30, 0.15, 0.05, {"L9": "p9"})
+
+    assert np.isclose(after[0], 50.0)  # player cap 0.05 x 1000
+
+
+def test_rewrite_keeps_repeated_columns(tmp_path):
+    header = ["Sport", "leg1Id", "runTimestamp", "kellyStake", "runTimestamp"]
+    path = tmp_path / "underdog-cards.csv"
+    _write_cards(path, header, [["NBA", "L1", "2026-02-14T15:00", "10", "2026-02-14T15:05"]])
+
+    header, raw = read_table(str(path))
+    dicts = row_dicts(header, raw)
+    dicts[0]["kellyStake"] = "7.50"
+    dicts[0]["kellyStakeUnconstrained"] = "10.00"
+    write_table(str(path), *merge_row_dicts(header, raw, dicts))
+
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == ["Sport", "leg1Id", "runTimestamp", "kellyStake", "runTimestamp", "kellyStakeUnconstrained"]
+    assert rows[1] == ["NBA", "L1", "2026-02-14T15:00", "7.50", "2026-02-14T15:05", "10.00"]
+
+
+def test_main_rewrites_cards_in_place(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    header = ["Sport", "site", "leg1Id", "kellyStake", "kellyFrac", "runTimestamp"]
+    _write_cards(tmp_path / "underdog-cards.csv", header, [
+        ["NBA", "UD", "L1", "100", "0.25", "t1"],
+    ])
+
+    kelly_portfolio.main(max_total=0.30, max_sport=0.05, max_player=1.0)
+    kelly_portfolio.main(max_total=0.30, max_sport=0.05, max_player=1.0)  # idempotent rerun
+
+    header, raw = read_table("underdog-cards.csv")
+    assert header[:6] == ["Sport", "site", "leg1Id", "kellyStake", "kellyFrac", "runTimestamp"]
+    row = dict(zip(header, raw[0]))
+    assert row["runTimestamp"] == "t1"
+    assert row["kellyStake"] == "50.00"  # sport cap 0.05 x default bankroll 1000
+    assert row["kellyFinalFraction"] == "0.050000"
+    assert row["kellyFrac"] == "0.25"  # the per-sport Kelly multiplier, not a stake fraction
+    assert row["kellyStakeUnconstrained"] == "100.00"
@@ -0,0 +1,82 @@
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import numpy as np
+import pytest
+
+import kelly_sweep
+from kelly_sweep import card_arrays, fraction_tensor, stake_tensor, sweep, write_stakes
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_alert_counts_match_the_brute_force_stake_tensor():
+    rng = np.random.default_rng(7)
+    capped = rng.uniform(0.001, 0.1, 300)
+    card_ev = rng.uniform(0.03, 0.2, 300)
+    win_mult = rng.uniform(2, 30, 300)
+    bankrolls = np.array([500.0, 1000.0, 2500.0, 20000.0])
+    multipliers = np.array([0.1, 0.5, 1.0])
+    caps = np.array([0.02, 0.05])
+
+    result = sweep(capped, card_ev, win_mult, bankrolls, multipliers, caps, threshold=50.0)
+    stakes = stake_tensor(fraction_tensor(capped, multipliers, caps), bankrolls)
+    np.testing.assert_array_equal(result["alerts"], (stakes > 50.0).sum(axis=-1))
+    np.testing.assert_allclose(result["exposure"], stakes.sum(axis=-1))
+    np.testing.assert_allclose(result["expected_profit"], stakes @ card_ev)
+
+
+def test_stakes_out_round_trips_and_refuses_huge_grids(tmp_path, monkeypatch):
+    capped = np.array([0.02, 0.08])
+    bankrolls, multipliers, caps = np.array([1000.0, 2000.0]), np.array([0.5]), np.array([0.05])
+    path = tmp_path / "stakes.npz"
+    write_stakes(str(path), capped, bankrolls, multipliers, caps)
+    saved = np.load(path)
+    np.testing.assert_allclose(saved["stakes"][:, 0, 0], [[10.0, 40.0], [20.0, 80.0]])
+    np.testing.assert_array_equal(saved["bankrolls"], bankrolls)
+
+    monkeypatch.setattr(kelly_sweep, "MAX_STAKE_TENSOR_MB", 0)
+    with pytest.raises(ValueError, match="narrow the grid"):
+        write_stakes(str(path), capped, bankrolls, multipliers, caps)
+
+
+def test_defaults_match_the_optimizer_config():
+    with open(os.path.join(ROOT, "src", "kelly_mean_variance.ts"), encoding="utf-8") as f:
+        source = f.read()
+    config = dict(re.findall(r"^\s+(\w+): ([\d.]+),", source.split("DEFAULT_KELLY_CONFIG")[1], re.M))
+    assert float(config["globalKellyMultiplier"]) == kelly_sweep.CURRENT_MULTIPLIER
+    assert float(config["maxPerCardFraction"]) == kelly_sweep.CURRENT_CAP
+    assert float(config["minCardEv"]) == kelly_sweep.DEFAULT_MIN_CARD_EV
+    assert float(config["maxRawKellyFraction"]) == kelly_sweep.DEFAULT_MAX_RAW_FRACTION
+
+
+NODE_SCRIPT = """
+const k = require(process.argv[1]);
+const out = [];
+for (const [mult, cap] of [[0.25, 0.05], [0.5, 0.02], [1.0, 0.05]]) {
+  const cfg = {...k.DEFAULT_KELLY_CONFIG, bankroll: 1500, globalKellyMultiplier: mult, maxPerCardFraction: cap};
+  for (const p of [0.56, 0.62, 0.75]) {
+    const dist = {0: (1 - p) ** 2, 1: 2 * p * (1 - p), 2: p * p};
+    const r = k.computeKellyForCard(0.05, dist, "2P", "prizepicks", cfg);
+    out.push({mult, cap, capped: r.cappedKellyFraction, stake: r.recommendedStake});
+  }
+}
+console.log(JSON.stringify(out));
+"""
+
+
+@pytest.mark.skipif(shutil.which("node") is None or not os.path.exists(os.path.join(ROOT, "dist", "kelly_mean_variance.js")),
+                    reason="needs node and the built dist/kelly_mean_variance.js")
+def test_stakes_match_kelly_mean_variance():
+    module = os.path.join(ROOT, "dist", "kelly_mean_variance.js")
+    results = json.loads(subprocess.run(["node", "-e", NODE_SCRIPT, module], capture_output=True,
+                                        text=True, check=True).stdout)
+    staked = [r for r in results if r["stake"] > 0]
+    assert staked
+    for r in staked:
+        capped, _, _ = card_arrays([{"kellyCappedFraction": r["capped"], "cardEv": 0.05}])
+        stake = stake_tensor(fraction_tensor(capped, np.array([r["mult"]]), np.array([r["cap"]])), np.array([1500.0]))
+        assert stake[0, 0, 0, 0] == pytest.approx(r["stake"])
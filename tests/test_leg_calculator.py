@@ -0,0 +1,64 @@
+import os
+import re
+
+import pytest
+
+from leg_calculator import PP_PAYOUTS, UD_PAYOUTS, LegCalculator, structure_metrics
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _read(*parts):
+    with open(os.path.join(ROOT, *parts), encoding="utf-8") as f:
+        return f.read()
+
+
+def _ladder(text):
+    """'{ 6: 25, 5: 2, 4: 0.4 }' -> {6: 25.0, 5: 2.0, 4: 0.4}"""
+    return {int(k): float(v) for k, v in re.findall(r"(\d+):\s*([\d.]+)", text)}
+
+
+def test_pp_payouts_match_engine_interface():
+    block = _read("src", "engine_interface.ts").split("const PP_PAYOUTS")[1].split("};")[0]
+    ts = {flex: _ladder(ladder) for flex, ladder in re.findall(r"'(\d[PF])':\s*(\{[^}]*\})", block)}
+    assert ts == {flex: {k: float(v) for k, v in ladder.items()} for flex, ladder in PP_PAYOUTS.items()}
+
+
+def test_ud_payouts_match_underdog_structures():
+    source = _read("src", "config", "underdog_structures.ts")
+    ts = {
+        f"{size}{'P' if kind == 'STD' else 'F'}": _ladder(ladder)
+        for size, kind, ladder in re.findall(r"id: 'UD_(\d)[PF]_(STD|FLX)'.*?payouts: (\{[^}]*\})", source, re.S)
+    }
+    for flex, ladder in UD_PAYOUTS.items():
+        assert ts[flex] == {k: float(v) for k, v in ladder.items()}, flex
+
+
+def test_metrics_follow_the_binomial_model():
+    # 2P at 3x breaks even at p = 1/sqrt(3)
+    ev, cash, _ = structure_metrics("PP", "2P", round(3 ** -0.5, 4))
+    assert ev == pytest.approx(0.0, abs=1e-3)
+    ev, cash, any_ = structure_metrics("UD", "6F", 0.6)
+    p = [0.6 ** k * 0.4 ** (6 - k) for k in range(7)]
+    assert ev == pytest.approx(25 * p[6] + 2.6 * 6 * p[5] - 1 + 0.25 * 15 * p[4])
+    assert cash == pytest.approx(p[6] + 6 * p[5])
+    assert any_ == pytest.approx(p[6] + 6 * p[5] + 15 * p[4])
+
+
+def test_pricing_reuses_the_cached_avg_prob(tmp_path):
+    path = tmp_path / "legs.csv"
+    path.write_text("Sport,id,player,stat,line,trueProb\n"
+                    "NBA,a,A,pts,20.5,0.55551\nNBA,b,B,reb,7.5,0.55549\n", encoding="utf-8")
+    calculator = LegCalculator(sources=[(str(path), "PP")])
+    structure_metrics.cache_clear()
+
+    first = calculator.price(["a", "b"])
+    hits = structure_metrics.cache_info().hits
+    again = calculator.price(["b", "a"])  # same rounded avgProb
+    assert structure_metrics.cache_info().hits == hits + len(again["structures"]) * len(again["structures"]["PP"])
+    assert first["structures"] == again["structures"]
+    assert [s["structure"] for s in first["structures"]["PP"]] == ["2P"]
+    assert first["structures"]["PP"][0]["avgProb"] == 0.5555
+
+    with pytest.raises(ValueError):
+        calculator.price(list("abcdefg"))
@@ -0,0 +1,164 @@
+import os
+
+import pytest
+
+import legs_diff
+from legs_diff import diff_legs, format_digest, repush_changed, repush_diff, row_keys, target_diff
+
+HEADER = ["Sport", "id", "player", "stat", "line", "trueProb"]
+
+
+class FakeValues:
+    """Records Sheets values() calls; get() answers with the sheet's id column."""
+
+    def __init__(self, sheet_ids):
+        self.sheet_ids = sheet_ids
+        self.calls = []
+
+    def _record(self, name, **kwargs):
+        self.calls.append((name, kwargs))
+        return name, kwargs
+
+    def get(self, **kwargs):
+        return self._record("get", **kwargs)
+
+    def clear(self, **kwargs):
+        return self._record("clear", **kwargs)
+
+    def update(self, **kwargs):
+        return self._record("update", **kwargs)
+
+    def batchUpdate(self, **kwargs):
+        return self._record("batchUpdate", **kwargs)
+
+
+class FakeService:
+    def __init__(self, sheet_ids=()):
+        self._values = FakeValues([[i] for i in sheet_ids])
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self._values
+
+
+def _execute_for(service):
+    def run(request):
+        name, _ = request
+        return {"values": service._values.sheet_ids} if name == "get" else {}
+    return run
+
+
+def _legs(rows):
+    return {row[1]: dict(zip(HEADER, row)) for row in rows}
+
+
+def test_target_diff_follows_the_target_filter():
+    old_rows = [["NBA", "a", "A", "pts", "20.5", "0.5"], ["NHL", "b", "B", "sog", "2.5", "0.5"]]
+    new_rows = [["NBA", "a", "A", "pts", "21.5", "0.5"], ["NBA", "c", "C", "reb", "7.5", "0.6"]]
+    diff = diff_legs(_legs(old_rows), _legs(new_rows))
+
+    rows, nba = target_diff("legs", diff, _legs(old_rows), new_rows, 1, {"Sport": ["NBA"]})
+    assert rows == new_rows
+    assert nba == {"added": ["c"], "removed": [], "changed": {"a": diff["changed"]["a"]}}
+
+    _, nhl = target_diff("legs", diff, _legs(old_rows), new_rows, 1, {"Sport": ["NHL"]})
+    assert nhl == {"added": [], "removed": ["b"], "changed": {}}
+
+    rows, ud_only = target_diff("legs", diff, _legs(old_rows), new_rows, 1, {"site": ["UD"]})
+    assert rows == [] and not any(ud_only.values())
+
+
+def test_partial_repush_updates_rows_in_place_and_appends_new_legs():
+    rows = [["NBA", "x", "X", "ast", "4.5", "0.5"], ["NBA", "a", "A", "pts", "21.5", "0.5"],
+            ["NBA", "c", "C", "reb", "7.5", "0.6"]]
+    diff = {"added": ["c"], "removed": [], "changed": {"a": [("line", "20.5", "21.5", 1.0)]}}
+    service = FakeService(sheet_ids=["x", "a"])
+
+    mode = repush_changed(service, "sid", "Legs", "P", HEADER, rows, diff, _execute_for(service))
+
+    assert mode == "partial"
+    (get, get_args), (name, batch) = service._values.calls
+    assert get_args["range"] == "Legs!B2:B"
+    assert batch["body"]["data"] == [
+        {"range": "Legs!A3:P3", "values": [rows[1]]},
+        {"range": "Legs!A4", "values": [rows[2]]},
+    ]
+
+
+def test_a_new_row_order_rewrites_the_whole_tab():
+    # legEv moved: UD-Legs now sorts a above x
+    rows = [["NBA", "a", "A", "pts", "21.5", "0.7"], ["NBA", "x", "X", "ast", "4.5", "0.5"]]
+    diff = {"added": [], "removed": [], "changed": {"a": [("legEv", "0.01", "0.09", 0.08)]}}
+    service = FakeService(sheet_ids=["x", "a"])
+    assert repush_changed(service, "sid", "UD-Legs", "Q", HEADER, rows, diff, _execute_for(service)) == "full"
+    assert [name for name, _ in service._values.calls] == ["get", "update", "clear"]
+    assert service._values.calls[2][1]["range"] == "UD-Legs!A4:Q"
+
+
+def test_rows_changed_outside_the_tracked_fields_are_repushed():
+    old = [["NBA", "a", "A", "pts", "20.5", "0.5", "2026-02-14T19:00Z"], ["NBA", "b", "B", "reb", "7.5", "0.5", "t"]]
+    new = [["NBA", "a", "A", "pts", "20.5", "0.5", "2026-02-14T19:30Z"], ["NBA", "b", "B", "reb", "7.5", "0.5", "t"]]
+    header = HEADER + ["gameTime"]
+    diff = diff_legs(_legs(old), _legs(new))
+    assert not any(diff.values())
+
+    widened = repush_diff(diff, row_keys(header, old), row_keys(header, new))
+    assert widened["changed"] == {"a": []}
+    assert set(repush_diff(diff, None, row_keys(header, new))["changed"]) == {"a", "b"}
+
+
+def test_removed_legs_or_a_forced_push_rewrite_the_whole_tab():
+    rows = [["NBA", "a", "A", "pts", "21.5", "0.5"]]
+    for diff, full in (({"added": [], "removed": ["b"], "changed": {}}, False),
+                       ({"added": [], "removed": [], "changed": {}}, True)):
+        service = FakeService()
+        assert repush_changed(service, "sid", "UD-Legs", "Q", HEADER, rows, diff, _execute_for(service),
+                              full=full) == "full"
+        assert [name for name, _ in service._values.calls] == ["update", "clear"]
+        assert service._values.calls[1][1]["range"] == "UD-Legs!A3:Q"
+
+    service = FakeService()
+    assert repush_changed(service, "sid", "Legs", "P", HEADER, rows, {"added": [], "removed": [], "changed": {}},
+                          _execute_for(service)) == "none"
+    assert service._values.calls == []
+
+
+def test_digest_escapes_html():
+    old = _legs([["NBA", "a", "A <b>&", "pts", "20.5", "0.5"]])
+    new = _legs([["NBA", "a", "A <b>&", "pts", "21.5", "0.5"]])
+    digest = format_digest({"PP": diff_legs(old, new)}, {"PP": new})
+    assert "A &lt;b&gt;&amp; pts: line 20.5 → 21.5" in digest
+    assert "<b>" not in digest
+
+
+def _write_legs(path, rows):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(",".join(HEADER) + "\n")
+        f.writelines(",".join(row) + "\n" for row in rows)
+
+
+def test_failed_repush_keeps_the_snapshot_for_the_next_run(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(legs_diff, "LEG_SOURCES", [("legs.csv", "PP")])
+    calls = []
+
+    def repush_targets(diffs, tables, old_by_site, targets_path, names, values=None):
+        calls.append(diffs)
+        return ["main"] if len(calls) == 2 else []
+
+    monkeypatch.setattr(legs_diff, "repush_targets", repush_targets)
+
+    _write_legs("legs.csv", [["NBA", "a", "A", "pts", "20.5", "0.5"]])
+    assert legs_diff.run_diff(repush=True) is None
+    assert calls == [None]  # no baseline: every tab rewritten in full
+    saved = os.path.getmtime(legs_diff.SNAPSHOT_PATH)
+
+    _write_legs("legs.csv", [["NBA", "a", "A", "pts", "21.5", "0.5"]])
+    with pytest.raises(legs_diff.RepushFailed):
+        legs_diff.run_diff(repush=True)
+    assert os.path.getmtime(legs_diff.SNAPSHOT_PATH) == saved
+
+    diffs = legs_diff.run_diff(repush=True)
+    assert list(diffs["PP"]["changed"]) == ["a"]
@@ -0,0 +1,57 @@
+import argparse
+import time
+
+import profiling
+from profiling import add_profile_arguments, collapsed_stacks
+
+
+class FakeStats:
+    """pstats.Stats stand-in: .stats maps func -> (cc, nc, tt, ct, callers)."""
+
+    def __init__(self, stats):
+        self.stats = stats
+
+
+def _layered_graph(layers):
+    """Two functions per layer, each called by both of the layer above: 2**layers call paths."""
+    stats = {("m.py", 1, "root"): (1, 1, 0.001, 1.0, {})}
+    above = [("m.py", 1, "root")]
+    for layer in range(layers):
+        funcs = [("m.py", 10 * layer + k, f"f{layer}_{k}") for k in range(2)]
+        ct = 1.0 / 2
+        for func in funcs:
+            callers = {caller: (1, 1, 0.0, ct / len(above)) for caller in above}
+            stats[func] = (1, 1, 0.001, ct, callers)
+        above = funcs
+    return FakeStats(stats)
+
+
+def test_collapsed_stacks_stay_bounded_on_a_wide_call_graph():
+    stats = _layered_graph(40)
+    started = time.perf_counter()
+    lines = collapsed_stacks(stats)
+    assert time.perf_counter() - started < 5
+    assert len(lines) < 1 / profiling.COLLAPSED_MIN_FRACTION * profiling.COLLAPSED_MAX_DEPTH
+    total_us = sum(int(line.rsplit(" ", 1)[1]) for line in lines)
+    assert total_us > 0
+    assert all(line.startswith("m.py:1(root)") for line in lines)
+
+
+def test_collapsed_stacks_split_self_time_by_caller():
+    a, b, leaf = ("m.py", 1, "a"), ("m.py", 2, "b"), ("m.py", 3, "leaf")
+    stats = FakeStats({
+        a: (1, 1, 0.0, 0.3, {}),
+        b: (1, 1, 0.0, 0.1, {}),
+        leaf: (2, 2, 0.4, 0.4, {a: (1, 1, 0.3, 0.3), b: (1, 1, 0.1, 0.1)}),
+    })
+    assert sorted(collapsed_stacks(stats)) == ["m.py:1(a);m.py:3(leaf) 300000", "m.py:2(b);m.py:3(leaf) 100000"]
+
+
+def test_profile_flag_does_not_swallow_a_positional():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("leg_id")
+    add_profile_arguments(parser)
+    args = parser.parse_args(["--profile", "legA"])
+    assert (args.profile, args.leg_id, args.profile_out) == (True, "legA", profiling.PROFILE_DIR)
+    args = parser.parse_args(["legA", "--profile-out", "out"])
+    assert (args.profile, args.profile_out) == (False, "out")
@@ -0,0 +1,72 @@
+import json
+import os
+
+import numpy as np
+
+import props_table
+from props_table import PropsTable, game_keys_by_id, iter_json_array, load_props_table
+from telegram_kelly import TelegramKellyAlerts
+
+PROPS = [
+    {"id": "101", "playerName": "A", "team": "BOS", "opponent": "LAL", "commenceTime": "2026-01-01T00:00:00Z",
+     "bookKey": "fanduel", "line": 20.5, "impliedProb": 0.52},
+    {"id": 102, "playerName": "B", "team": "LAL", "opponent": "BOS", "line": 7},
+    {"id": "103", "playerName": "C", "team": "NYK", "opponent": None, "ev": 0.03},
+]
+
+
+def _write(path, records):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=1)
+
+
+def test_streaming_parse_matches_json_load_across_buffer_boundaries(tmp_path):
+    path = tmp_path / "props.json"
+    _write(path, PROPS * 50)
+    assert list(iter_json_array(str(path), chunk_size=7)) == PROPS * 50
+
+
+def test_table_rows_and_game_keys():
+    table = PropsTable.from_records(PROPS)
+    assert len(table) == 3
+    assert table.row(1)["id"] == "102"
+    assert table.row(1)["line"] == 7.0
+    assert np.isnan(table.row(0)["ev"])
+    assert table.where("team", "LAL").tolist() == [1]
+    assert game_keys_by_id(table) == {"101": "BOS_vs_LAL", "102": "BOS_vs_LAL"}
+
+
+def test_persisted_table_is_reused_until_the_file_changes(tmp_path):
+    path = tmp_path / "props.json"
+    cache = tmp_path / "cache"
+    _write(path, PROPS)
+    assert load_props_table(str(path), cache_root=str(cache))[1] == "ingested"
+    table, status = load_props_table(str(path), cache_root=str(cache))
+    assert status == "cached"
+    assert table.column("opponent") == ["LAL", "BOS", ""]
+    assert np.allclose(table.column("line"), [20.5, 7.0, np.nan], equal_nan=True)
+
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert load_props_table(str(path), cache_root=str(cache))[1] == "rehashed"
+
+    _write(path, PROPS[:2])
+    table, status = load_props_table(str(path), cache_root=str(cache))
+    assert (status, len(table)) == ("ingested", 2)
+
+
+def test_card_command_shows_the_prop_game(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(props_table, "PROPS_WITH_EV_JSON", "props.json")
+    _write(tmp_path / "props.json", PROPS)
+
+    class Index:
+        legs_by_id = {"101": {"player": "A", "stat": "points", "line": 20.5, "trueProb": 0.55, "edge": 0.03}}
+
+        def cards_with_leg(self, leg_id):
+            return []
+
+    alerts = TelegramKellyAlerts()
+    alerts.index = Index()
+    lines = alerts.cmd_card(["101"]).splitlines()
+    assert lines[1] == "🏟️ BOS vs LAL at 2026-01-01T00:00:00Z, fanduel implied 0.520"
@@ -0,0 +1,111 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import sheets_publish
+from sheets_publish import (RateLimiter, chunk_ends, load_targets, publish_target, tail_ranges, target_chunks,
+                            urgency_snapshot)
+
+NOW = datetime(2026, 2, 14, 18, 0, tzinfo=timezone.utc)
+
+
+class FakeService:
+    """Records Sheets calls as (method, kwargs); spreadsheets().get() lists the existing tabs."""
+
+    def __init__(self, tabs=()):
+        self.tabs = list(tabs)
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def __getattr__(self, method):
+        def call(**kwargs):
+            self.calls.append((method, kwargs))
+            return method, kwargs
+        return call
+
+    def execute(self, request):
+        method, _ = request
+        if method == "get":
+            return {"sheets": [{"properties": {"title": t, "sheetId": i}} for i, t in enumerate(self.tabs)]}
+        return {}
+
+
+TARGET = {"name": "main", "spreadsheetId": "sid", "tabs": {"legs": "Legs", "cards": "Cards_Data"}}
+
+
+def _leg(leg_id, minutes):
+    row = ["NBA", leg_id] + [""] * 13
+    row[14] = (NOW + timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return row
+
+
+def test_publish_writes_before_clearing_only_the_leftover_rows():
+    service = FakeService(tabs=["Legs", "Cards_Data"])
+    payload = {"Legs": ("legs", [_leg("a", 60), _leg("b", 90)]), "Cards_Data": ("cards", [])}
+    publish_target(service, TARGET, payload, service.execute)
+
+    methods = [m for m, _ in service.calls]
+    assert methods == ["get", "batchUpdate", "batchClear"]
+    assert service.calls[2][1]["body"]["ranges"] == ["Legs!A4:P", "Cards_Data!A2:AF"]
+
+
+def test_urgency_chunks_stack_and_the_tail_starts_below_them():
+    snapshot = {"legs": [_leg("late", 600), _leg("soon", 20), _leg("gone", -5), _leg("mid", 100)], "cards": []}
+    plan = target_chunks(TARGET, urgency_snapshot(snapshot, now=NOW))
+
+    ranges = [(d["range"], [row[1] for row in d["values"]]) for _, data in plan for d in data]
+    assert ranges == [("Legs!A2", ["soon"]), ("Legs!A3", ["mid"]), ("Legs!A4", ["late"])]
+    assert tail_ranges(TARGET, chunk_ends(plan)) == ["Legs!A5:P", "Cards_Data!A2:AF"]
+
+
+def _targets(tmp_path, targets):
+    path = tmp_path / "targets.json"
+    path.write_text(json.dumps({"targets": targets}), encoding="utf-8")
+    return str(path)
+
+
+def test_load_targets_fans_out_by_name_sport_and_dataset(tmp_path):
+    path = _targets(tmp_path, [
+        {"name": "main", "tabs": {"legs": "Legs", "cards": "Cards"}},
+        {"name": "nba", "filter": {"Sport": ["NBA"]}, "tabs": {"legs": "Legs"}},
+        {"name": "nhl", "filter": {"Sport": ["NHL"]}, "tabs": {"cards": "Cards"}},
+        {"name": "off", "enabled": False, "tabs": {"legs": "Legs"}},
+    ])
+    names = lambda targets: [t["name"] for t in targets]
+
+    assert names(load_targets(path)) == ["main", "nba", "nhl"]
+    assert names(load_targets(path, names={"nba", "off"})) == ["nba"]
+    assert names(load_targets(path, sports=["nba"])) == ["main", "nba"]
+    trimmed = load_targets(path, datasets={"cards"})
+    assert names(trimmed) == ["main", "nhl"] and trimmed[0]["tabs"] == {"cards": "Cards"}
+
+    bad = _targets(tmp_path, [{"name": "x", "tabs": {"props": "Props"}}])
+    with pytest.raises(ValueError, match="unknown dataset"):
+        load_targets(bad)
+
+
+def test_rate_limiter_spaces_calls(monkeypatch):
+    clock = {"now": 100.0}
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        clock["now"] += seconds
+
+    monkeypatch.setattr(sheets_publish.time, "monotonic", lambda: clock["now"])
+    monkeypatch.setattr(sheets_publish.time, "sleep", sleep)
+    limiter = RateLimiter(per_minute=60)
+    for _ in range(3):
+        limiter.acquire()
+    assert slept == [1.0, 1.0]
+
+    clock["now"] += 5.0  # idle long enough: no wait, no burst credit either
+    limiter.acquire()
+    limiter.acquire()
+    assert slept == [1.0, 1.0, 1.0]
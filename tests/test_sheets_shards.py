@@ -0,0 +1,81 @@
+import csv
+import gzip
+from datetime import datetime
+
+from sheets_shards import push_shards, rotate_shards, route_rows
+
+NOW = datetime(2026, 2, 20, 9, 0)
+
+
+class FakeService:
+    """Records Sheets calls; get() lists tabs and batchGet() returns each requested shard's values."""
+
+    def __init__(self, tabs):
+        self.tabs = tabs  # title -> values
+        self.calls = []
+
+    def spreadsheets(self):
+        return self
+
+    def values(self):
+        return self
+
+    def __getattr__(self, method):
+        def call(**kwargs):
+            self.calls.append((method, kwargs))
+            return method, kwargs
+        return call
+
+    def execute(self, request):
+        method, kwargs = request
+        if method == "get":
+            return {"sheets": [{"properties": {"title": t, "sheetId": i}} for i, t in enumerate(self.tabs)]}
+        if method == "batchGet":
+            return {"valueRanges": [{"values": self.tabs[r.split("!")[0]]} for r in kwargs["ranges"]]}
+        return {}
+
+
+def _row(sport, date):
+    return [sport, f"{date}T15:00:00 ET", "card"]
+
+
+def test_rows_route_to_sport_date_shards_in_order():
+    rows = [_row("NBA", "2026-02-14"), _row("NHL", "2026-02-14"), _row("", "2026-02-15"), ["NBA", ""]]
+    shards = route_rows(rows, "sport-date")
+    assert list(shards) == ["Cards_NBA_2026-02-14", "Cards_NHL_2026-02-14", "Cards_UNK_2026-02-15",
+                            "Cards_NBA_undated"]
+    assert route_rows(rows, "sport")["Cards_NBA"] == [rows[0], rows[3]]
+
+
+def test_push_only_touches_this_runs_shards_and_records_them():
+    service = FakeService({"Cards_NBA_2026-02-14": []})
+    state = {"shards": {"Cards_NHL_2026-02-01": {"location": "sheet"}}, "lastRotation": ""}
+    shards = route_rows([_row("NBA", "2026-02-14"), _row("NBA", "2026-02-14")], "sport-date")
+    push_shards(service, "sid", shards, service.execute, state=state, now=NOW)
+
+    clear = next(kwargs for method, kwargs in service.calls if method == "batchClear")
+    assert clear["body"]["ranges"] == ["Cards_NBA_2026-02-14!A2:AF"]
+    assert state["shards"]["Cards_NBA_2026-02-14"]["rows"] == 2
+    assert "Cards_NHL_2026-02-01" in state["shards"]
+
+
+def test_stale_shards_are_archived_once_a_day(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    service = FakeService({"Cards_NBA_2026-02-01": [["Sport"], ["NBA"]], "Cards_NBA_2026-02-19": [["Sport"]]})
+    state = {"lastRotation": "", "shards": {
+        "Cards_NBA_2026-02-01": {"location": "sheet", "lastPush": "2026-02-01T10:00:00"},
+        "Cards_NBA_2026-02-19": {"location": "sheet", "lastPush": "2026-02-19T10:00:00"},
+    }}
+    written = rotate_shards(service, "sid", state, service.execute, archive_after_days=7, now=NOW)
+
+    assert len(written) == 1
+    with gzip.open(written[0], "rt", newline="", encoding="utf-8") as f:
+        assert list(csv.reader(f)) == [["Sport"], ["NBA"]]
+    assert state["shards"]["Cards_NBA_2026-02-01"]["location"].startswith("archive/shards/")
+    assert state["shards"]["Cards_NBA_2026-02-19"]["location"] == "sheet"
+    delete = next(kwargs for method, kwargs in service.calls if method == "batchUpdate")
+    assert delete["body"]["requests"] == [{"deleteSheet": {"sheetId": 0}}]
+
+    service.calls.clear()
+    assert rotate_shards(service, "sid", state, service.execute, archive_after_days=0, now=NOW) == []
+    assert service.calls == []
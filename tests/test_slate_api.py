@@ -0,0 +1,76 @@
+import gzip
+import hashlib
+import json
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import slate_api
+from slate_api import SlateSnapshot, SnapshotHolder, make_handler
+
+CARDS_HEADER = "Sport,site,flexType,cardEv,kellyStake,leg1Id,leg2Id\n"
+
+
+def _cards(n, ev="0.05"):
+    return CARDS_HEADER + "".join(f"NBA,PP,2P,{ev},{10 + i},a{i},b{i}\n" for i in range(n))
+
+
+def test_snapshot_hashes_the_bytes_it_parses(tmp_path, monkeypatch):
+    path = tmp_path / "cards.csv"
+    old = _cards(3)
+    path.write_text(old, encoding="utf-8")
+    load_cards = slate_api.load_cards
+
+    def rewrite_then_parse(p, site, data=None):
+        # The optimizer replaces the file between the snapshot's read and its parse
+        path.write_text(_cards(5, ev="0.09"), encoding="utf-8")
+        return load_cards(p, site, data)
+
+    monkeypatch.setattr(slate_api, "load_cards", rewrite_then_parse)
+    snapshot = SlateSnapshot(card_sources=[(str(path), "PP")], leg_sources=[(str(tmp_path / "legs.csv"), "PP")])
+
+    assert snapshot.cards.size == 3
+    assert snapshot.fingerprints[str(path)][2] == hashlib.sha256(old.encode("utf-8")).hexdigest()
+    assert snapshot.changed_on_disk()
+
+
+@pytest.fixture
+def server(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "cards.csv").write_text(_cards(40), encoding="utf-8")
+    holder = SnapshotHolder()
+    holder.current = SlateSnapshot(card_sources=[("cards.csv", "PP")], leg_sources=[("legs.csv", "PP")])
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(holder))
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _get(url, **headers):
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, headers=headers)) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_gzip_and_identity_bodies_carry_distinct_etags(server):
+    url = server + "/cards?limit=40"
+    status, headers, body = _get(url)
+    assert status == 200 and "Content-Encoding" not in headers
+    plain = headers["ETag"]
+    assert json.loads(body)["count"] == 40
+
+    status, headers, body = _get(url, **{"Accept-Encoding": "gzip"})
+    assert headers["Content-Encoding"] == "gzip"
+    zipped = headers["ETag"]
+    assert zipped == plain[:-1] + '-gz"'
+    assert json.loads(gzip.decompress(body))["count"] == 40
+
+    for tag in (plain, zipped):
+        status, headers, _ = _get(url, **{"If-None-Match": tag})
+        assert (status, headers["ETag"]) == (304, tag)
+    assert _get(url, **{"If-None-Match": '"stale"'})[0] == 200
@@ -0,0 +1,75 @@
+import numpy as np
+
+import slate_montecarlo
+from props_table import PropsTable, game_keys_by_id
+from slate_montecarlo import batch_slates, build_model, leg_game_key, simulate, simulate_returns
+
+
+def _leg(leg_id, team, game_time="2026-01-01T00:00:00Z", prob=0.55, **extra):
+    return {"id": leg_id, "Sport": "NBA", "team": team, "gameTime": game_time, "trueProb": prob, **extra}
+
+
+def _card(site, flex, *leg_ids, stake=10.0):
+    card = {"site": site, "flexType": flex, "kellyStake": stake}
+    card.update({f"leg{i + 1}Id": leg_id for i, leg_id in enumerate(leg_ids)})
+    return card
+
+
+def test_simultaneous_games_get_separate_factors():
+    legs = [_leg("a", "BOS"), _leg("b", "LAL"), _leg("c", "NYK"), _leg("d", "MIA", opponent="NYK")]
+    game_keys = {"a": "BOS_vs_LAL", "b": "BOS_vs_LAL"}
+    model = build_model([_card("PP", "4F", "a", "b", "c", "d")], legs, 1000.0, 0.1, 0.2, game_keys)
+    game_idx = model["game_idx"]
+    assert game_idx[0] == game_idx[1]       # same game via the props lookup
+    assert game_idx[2] != game_idx[0]       # same tip-off, other game
+    assert game_idx[3] != game_idx[2]       # MIA vs NYK is a game; lone NYK falls back to its team
+    assert model["n_games"] == 3
+
+
+def test_game_key_prefers_the_opponent_then_props_then_team_at_time():
+    assert leg_game_key(_leg("a", "LAL", opponent="BOS"), None, "LAL") == "BOS_vs_LAL"
+    assert leg_game_key(_leg("a", "LAL"), {"a": "BOS_vs_LAL"}, "LAL") == "BOS_vs_LAL"
+    assert leg_game_key(_leg("a", "LAL"), {}, "LAL") == "2026-01-01T00:00:00Z@LAL"
+    assert leg_game_key(_leg("a", ""), {}, "") == ""
+
+
+def test_unk_props_do_not_merge_every_game():
+    # props-with-ev.json currently carries team == opponent == "UNK" on every prop
+    props = PropsTable.from_records([
+        {"id": leg_id, "team": "UNK", "opponent": "UNK"} for leg_id in ("a", "b", "c")
+    ] + [{"id": "d", "team": "", "opponent": "BOS"}])
+    game_keys = game_keys_by_id(props)
+    assert game_keys == {}
+
+    legs = [_leg("a", "BOS"), _leg("b", "LAL"), _leg("c", "NYK", opponent="UNK"), _leg("d", "UNK")]
+    model = build_model([_card("PP", "4F", "a", "b", "c", "d")], legs, 1000.0, 0.1, 0.2, game_keys)
+    assert leg_game_key(legs[2], {"c": "UNK_vs_UNK"}, "NYK") == "2026-01-01T00:00:00Z@NYK"
+    assert len(set(model["game_idx"][:3].tolist())) == 3
+    assert model["n_games"] == 3  # the team-less leg gets no game factor
+
+
+def test_batch_size_shrinks_with_the_card_count():
+    legs = [_leg(str(i), f"T{i % 10}") for i in range(60)]
+    small = build_model([_card("PP", "2P", "0", "1")], legs, 1000.0, 0.1, 0.2)
+    cards = [_card("UD", "6F", *[str((i + j) % 60) for j in range(6)]) for i in range(5000)]
+    big = build_model(cards, legs, 1000.0, 0.1, 0.2)
+    assert batch_slates(small) == slate_montecarlo.MAX_BATCH_SLATES
+    assert batch_slates(big, 16) < batch_slates(big, 64) < slate_montecarlo.MAX_BATCH_SLATES
+    assert batch_slates(big, 0.001) == slate_montecarlo.MIN_BATCH_SLATES
+
+
+def test_independent_legs_reproduce_the_exact_expected_return():
+    legs = [_leg("a", "BOS", prob=0.6), _leg("b", "LAL", prob=0.55)]
+    model = build_model([_card("PP", "2P", "a", "b", stake=100.0)], legs, 1000.0, 0.0, 0.0)
+    returns = simulate_returns(np.random.default_rng(1), model, 200_000)
+    expected = 0.1 * (0.6 * 0.55 * 3 - 1)
+    assert abs(returns.mean() - expected) < 0.003
+
+
+def test_results_depend_on_the_seed_not_the_worker_count():
+    legs = [_leg("a", "BOS"), _leg("b", "LAL"), _leg("c", "BOS", prob=0.6)]
+    model = build_model([_card("PP", "3F", "a", "b", "c")], legs, 1000.0, 0.1, 0.2)
+    one = simulate(model, 2500, 4, 0.5, seed=3, workers=1, batch=100)
+    two = simulate(model, 2500, 4, 0.5, seed=3, workers=2, batch=100)
+    for a, b in zip(one, two):
+        assert np.array_equal(a, b)
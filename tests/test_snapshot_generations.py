@@ -0,0 +1,169 @@
+import json
+import os
+import shutil
+import time
+
+import pytest
+
+import snapshot_generations as sg
+
+PP_CARDS = "prizepicks-cards.csv"
+PP_LEGS = "prizepicks-legs.csv"
+FILES = [PP_CARDS, PP_LEGS]
+
+
+@pytest.fixture(autouse=True)
+def no_quiet_wait(monkeypatch):
+    monkeypatch.setattr(sg, "QUIET_SECONDS", 0.0)
+
+
+def _write_outputs(src, run="2026-02-14T15:00:00 ET", legs_run=None):
+    (src / PP_CARDS).write_text(f"Sport,leg1Id,runTimestamp\nNBA,a,{run}\n", encoding="utf-8")
+    (src / PP_LEGS).write_text(f"Sport,id,runTimestamp\nNBA,a,{legs_run or run}\n", encoding="utf-8")
+
+
+def _publish(src, root, run_id, **kwargs):
+    return sg.publish(run_id, root=str(root), source_dir=str(src), files=FILES, **kwargs)
+
+
+def test_publish_writes_a_verified_generation_and_moves_current(tmp_path):
+    src, root = tmp_path / "src", tmp_path / "gens"
+    src.mkdir()
+    _write_outputs(src)
+    gen = _publish(src, root, "r1")
+    assert sorted(gen.manifest["files"]) == FILES
+    assert gen.verify() == []
+    assert sg.current_generation(str(root)).run_id == "r1"
+    assert not [n for n in os.listdir(root) if n.startswith(".tmp-")]
+
+    with open(gen.path(PP_CARDS), "a", encoding="utf-8") as f:
+        f.write("NBA,b,x\n")
+    assert gen.verify() == [PP_CARDS]
+
+
+def test_a_file_rewritten_during_the_copy_pass_is_rejected(tmp_path, monkeypatch):
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_outputs(src)
+    copy = shutil.copyfile
+
+    def copy_then_touch(a, b):
+        result = copy(a, b)
+        if a.endswith(PP_LEGS):
+            # The legs copy is fine, but the cards file (already copied) is rewritten meanwhile
+            st = os.stat(src / PP_CARDS)
+            os.utime(src / PP_CARDS, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        return result
+
+    monkeypatch.setattr(sg.shutil, "copyfile", copy_then_touch)
+    with pytest.raises(sg.IncompleteGeneration, match="changed during the copy"):
+        _publish(src, tmp_path / "gens", "r1", timeout=0)
+    assert not os.path.exists(tmp_path / "gens" / "r1")
+
+
+def test_cards_and_legs_from_different_runs_are_rejected(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_outputs(src, run="run-2", legs_run="run-1")
+    with pytest.raises(sg.IncompleteGeneration, match="rows from run run-2 missing from"):
+        _publish(src, tmp_path / "gens", "r1", timeout=0)
+
+
+@pytest.mark.parametrize("cards", ["Sport,leg1Id,runTimestamp\nNBA,a,\n", "Sport,leg1Id\nNBA,a\n"])
+def test_unstamped_cards_next_to_stamped_legs_are_rejected(tmp_path, cards):
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_outputs(src, run="run-1")
+    (src / PP_CARDS).write_text(cards, encoding="utf-8")
+    with pytest.raises(sg.IncompleteGeneration, match="without runTimestamp but prizepicks-legs.csv is from run run-1"):
+        _publish(src, tmp_path / "gens", "r1", timeout=0)
+
+
+def test_producer_manifest_must_match(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_outputs(src)
+    (src / sg.PRODUCER_MANIFEST).write_text(json.dumps({
+        "runId": "prod-1",
+        "files": {PP_CARDS: {"size": 1, "sha256": "0"}},
+    }), encoding="utf-8")
+    with pytest.raises(sg.IncompleteGeneration, match="does not match"):
+        _publish(src, tmp_path / "gens", None, timeout=0)
+
+    entry = sg._entry(str(src / PP_CARDS))
+    (src / sg.PRODUCER_MANIFEST).write_text(json.dumps({"runId": "prod-1", "files": {PP_CARDS: entry}}),
+                                            encoding="utf-8")
+    assert _publish(src, tmp_path / "gens", None).run_id == "prod-1"
+
+
+def test_reused_run_id_exits_cleanly(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    _write_outputs(tmp_path)
+    sg.main("publish", run_id="r1", root="gens")
+    with pytest.raises(SystemExit, match="generation r1 already exists"):
+        sg.main("publish", run_id="r1", root="gens")
+
+
+def test_prune_spares_current_and_pinned_generations(tmp_path):
+    src, root = tmp_path / "src", tmp_path / "gens"
+    src.mkdir()
+    _write_outputs(src)
+    for i in range(4):
+        _publish(src, root, f"r{i}", keep=10)
+
+    with sg.pin("r0", root=str(root)) as gen:
+        assert gen.run_id == "r0"
+        removed = sg.prune(keep=1, root=str(root))
+    assert sorted(removed) == ["r1", "r2"]
+    assert sorted(g.run_id for g in sg.list_generations(str(root))) == ["r0", "r3"]
+
+    # An expired pin (its consumer died) no longer protects the generation
+    pins = root / "r0" / sg.PINS_DIR
+    stale = pins / "dead.pin"
+    stale.write_text("x", encoding="utf-8")
+    old = time.time() - sg.PIN_TTL_SECONDS - 60
+    os.utime(stale, (old, old))
+    assert sg.prune(keep=1, root=str(root)) == ["r0"]
+    assert sg.current_generation(str(root)).run_id == "r3"
+
+
+def test_pin_refuses_a_generation_that_no_longer_matches(tmp_path):
+    src, root = tmp_path / "src", tmp_path / "gens"
+    src.mkdir()
+    _write_outputs(src)
+    gen = _publish(src, root, "r1")
+    (root / "r1" / PP_LEGS).write_text("truncated", encoding="utf-8")
+    with pytest.raises(sg.IncompleteGeneration, match=PP_LEGS):
+        with sg.pin(root=str(root)):
+            pass
+    assert os.listdir(os.path.join(gen.dir, sg.PINS_DIR)) == []
+
+
+def test_merge_carries_other_sports_over_from_current(tmp_path):
+    src, root = tmp_path / "src", tmp_path / "gens"
+    src.mkdir()
+    (src / PP_CARDS).write_text("Sport,leg1Id,runTimestamp\nNBA,a,run-1\nNHL,h,run-1\n", encoding="utf-8")
+    (src / PP_LEGS).write_text("Sport,id,runTimestamp\nNBA,a,run-1\nNHL,h,run-1\n", encoding="utf-8")
+    _publish(src, root, "r1")
+
+    # An NBA-only run: the optimizer dropped NHL, and the legs columns moved
+    (src / PP_CARDS).write_text("Sport,leg1Id,runTimestamp\nNBA,b,run-2\n", encoding="utf-8")
+    (src / PP_LEGS).write_text("id,Sport,runTimestamp\nb,NBA,run-2\n", encoding="utf-8")
+    counts = sg.merge_sports(["nba"], root=str(root), source_dir=str(src), files=FILES)
+
+    assert counts == {PP_CARDS: (1, 1), PP_LEGS: (1, 1)}
+    assert (src / PP_CARDS).read_text(encoding="utf-8").splitlines() == [
+        "Sport,leg1Id,runTimestamp", "NBA,b,run-2", "NHL,h,run-1"]
+    assert (src / PP_LEGS).read_text(encoding="utf-8").splitlines() == [
+        "id,Sport,runTimestamp", "b,NBA,run-2", "h,NHL,run-1"]
+    # Two runs in one file are fine as long as the legs hold every cards run
+    assert _publish(src, root, "r2").verify() == []
+
+
+def test_merge_without_a_generation_leaves_outputs_alone(tmp_path):
+    src = tmp_path / "src"
+    src.mkdir()
+    _write_outputs(src)
+    before = (src / PP_CARDS).read_text(encoding="utf-8")
+    assert sg.merge_sports(["NHL"], root=str(tmp_path / "gens"), source_dir=str(src), files=FILES) == {}
+    assert (src / PP_CARDS).read_text(encoding="utf-8") == before
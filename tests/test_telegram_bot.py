@@ -0,0 +1,44 @@
+import os
+
+from slate_index import SlateIndex
+from telegram_kelly import TelegramKellyAlerts
+
+CARDS = ("Sport,site,flexType,cardEv,kellyStake,leg1Id,leg2Id\n"
+         "NBA,PP,2P,0.08,60,a,b\nNBA,PP,2P,0.05,30,a,c\nNHL,PP,2P,0.06,90,h,i\n")
+LEGS = ("Sport,id,player,stat,line,trueProb,edge\n"
+        "NBA,a,Jayson Tatum,pts,27.5,0.58,0.05\nNBA,b,Jaylen Brown,reb,6.5,0.56,0.03\n"
+        "NBA,c,Derrick White,ast,4.5,0.55,0.02\nNHL,h,David Pastrnak,sog,4.5,0.57,0.04\n")
+
+
+def _index(tmp_path):
+    (tmp_path / "cards.csv").write_text(CARDS, encoding="utf-8")
+    (tmp_path / "legs.csv").write_text(LEGS, encoding="utf-8")
+    return SlateIndex(card_sources=[(str(tmp_path / "cards.csv"), "PP")],
+                      leg_sources=[(str(tmp_path / "legs.csv"), "PP")])
+
+
+def test_index_rebuilds_only_when_content_changes(tmp_path):
+    index = _index(tmp_path)
+    assert index.version == 1 and not index.refresh()
+
+    path = tmp_path / "cards.csv"
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))  # touched, same bytes
+    assert not index.refresh()
+
+    path.write_text(CARDS + "NBA,PP,2P,0.07,75,b,c\n", encoding="utf-8")
+    assert index.refresh() and index.version == 2
+    assert [c["kellyStake"] for c in index.top("nba")] == [75.0, 60.0, 30.0]
+
+
+def test_bot_commands_answer_from_the_index(tmp_path):
+    bot = TelegramKellyAlerts()
+    bot.index = _index(tmp_path)
+
+    top = bot.handle_command("/top NBA 1").splitlines()
+    assert top == ["📊 Top 1 NBA by Kelly stake", "1. NBA PrizePicks 2P: $60.00 (8.0% EV) [a-b]"]
+    assert bot.handle_command("/exposure tatum") == "👤 tatum: 2 card(s), $90.00 total Kelly (NBA $90.00)"
+    assert bot.handle_command("/threshold $50") == "🔔 Threshold $50.00: 2 card(s) above"
+    assert bot.kelly_threshold == 50.0
+    assert bot.handle_command("/card zz") == "Leg zz not found"
+    assert bot.handle_command("/nope").startswith("Unknown command /nope")
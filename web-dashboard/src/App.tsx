@@ -1,30 +1,62 @@
 import { useEffect, useState } from 'react'
-import Papa from 'papaparse'
-import type { Card } from './types'
+import type { Card, ShardManifest, ShardSummary } from './types'
 import './index.css'
 
+const SHARD_BASE = '/data/shards'
+
+// The exporter's per-shard summaries combined for one sport (all sites)
+function sportSummary(manifest: ShardManifest, sport: string): ShardSummary {
+  const parts = Object.entries(manifest.shards)
+    .filter(([key]) => key.startsWith(`${sport}/`))
+    .map(([, entry]) => entry.summary)
+  const cards = parts.reduce((n, s) => n + s.cards, 0)
+  return {
+    cards,
+    selected: parts.reduce((n, s) => n + s.selected, 0),
+    totalStake: parts.reduce((n, s) => n + s.totalStake, 0),
+    avgEv: cards ? parts.reduce((n, s) => n + s.avgEv * s.cards, 0) / cards : 0,
+    maxEv: parts.reduce((m, s) => Math.max(m, s.maxEv), 0),
+  }
+}
+
 function App() {
   const [cards, setCards] = useState<Card[]>([])
+  const [manifest, setManifest] = useState<ShardManifest | null>(null)
   const [sportFilter, setSportFilter] = useState('All')
+  const [loadError, setLoadError] = useState<string | null>(null)
+  const [loadedAt, setLoadedAt] = useState<Date | null>(null)
 
   useEffect(() => {
-    const fetchCsv = () => {
-      Papa.parse('/data/underdog-cards.csv', {
-        download: true,
-        header: true,
-        dynamicTyping: true,
-        complete: (results: any) => {
-          const rows = (results.data || []).filter((row: any) => row && row.sport)
-          setCards(rows as Card[])
-        },
-      })
+    // manifest.json is revalidated every time; shard files are content-hashed,
+    // so unchanged shards come straight from the browser cache.
+    const fetchJson = async (url: string, init?: RequestInit) => {
+      const res = await fetch(url, init)
+      if (!res.ok) throw new Error(`${url}: HTTP ${res.status}`)
+      return res.json()
+    }
+
+    // Any failed manifest or shard fetch keeps the previously loaded cards
+    // on screen and reports the error instead of showing a partial slate.
+    const fetchShards = async () => {
+      try {
+        const next: ShardManifest = await fetchJson(`${SHARD_BASE}/manifest.json`, { cache: 'no-cache' })
+        const shards = await Promise.all(
+          Object.values(next.shards).map((entry) => fetchJson(`${SHARD_BASE}/${entry.file}`))
+        )
+        setCards(shards.flatMap((shard) => shard.cards as Card[]))
+        setManifest(next)
+        setLoadError(null)
+        setLoadedAt(new Date())
+      } catch (err) {
+        setLoadError(err instanceof Error ? err.message : String(err))
+      }
     }
 
     // Initial load
-    fetchCsv()
+    fetchShards()
 
     // Auto-refresh every 60s
-    const intervalId = window.setInterval(fetchCsv, 60_000)
+    const intervalId = window.setInterval(fetchShards, 60_000)
 
     return () => window.clearInterval(intervalId)
   }, [])
@@ -33,6 +65,8 @@ function App() {
     .filter((c) => sportFilter === 'All' || c.sport === sportFilter)
     .sort((a, b) => b.kellyStake - a.kellyStake)
 
+  const summary = manifest && (sportFilter === 'All' ? manifest.summary : sportSummary(manifest, sportFilter))
+
   return (
     <div className="min-h-screen bg-gray-900 text-white p-8">
       <h1 className="text-4xl font-bold mb-8">Props Kelly Dashboard</h1>
@@ -51,6 +85,19 @@ function App() {
         <option>NCAAF</option>
       </select>
 
+      {loadError && (
+        <div className="mb-4 p-3 rounded bg-red-900 text-red-100">
+          Refresh failed ({loadError}) – showing the last loaded cards.
+        </div>
+      )}
+
+      {summary && (
+        <p className="mb-4 text-sm">
+          {summary.cards} cards · {summary.selected} selected · ${summary.totalStake.toFixed(2)} staked ·
+          avg EV {(summary.avgEv * 100).toFixed(1)}% · best {(summary.maxEv * 100).toFixed(1)}%
+        </p>
+      )}
+
       <div className="overflow-x-auto">
         <table className="w-full border-collapse">
           <thead>
@@ -90,7 +137,7 @@ function App() {
       </div>
 
       <p className="mt-8 text-sm opacity-75">
-        Last update: {new Date().toLocaleString()} | Auto-refresh 60s
+        Last update: {loadedAt ? loadedAt.toLocaleString() : 'never'} | Auto-refresh 60s
       </p>
     </div>
   )
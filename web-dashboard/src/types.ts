@@ -14,3 +14,19 @@ export interface Card {
   leg6Id: string;
   runTimestamp: string;
 }
+
+export interface ShardSummary {
+  cards: number;
+  selected: number;
+  totalStake: number;
+  avgEv: number;
+  maxEv: number;
+}
+
+export interface ShardManifest {
+  generatedAt: string;
+  runTimestamp: string;
+  summary: ShardSummary;
+  shards: Record<string, { file: string; hash: string; summary: ShardSummary }>;
+  retired: string[];
+}